@@ -0,0 +1,168 @@
+"""Benchmark the Client against a local mock of the Yale API.
+
+Measures login, `Client.update_devices`, `Device.update_state`, bulk
+lock/unlock, `Device.parse_config`, response decoding with every codec
+installed and client snapshots for several fleet sizes and prints the
+throughput and p50/p99 latency of each scenario.
+
+Usage::
+
+    python benchmarks/bench_client.py --devices 1 100 10000 --latency 0
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable
+from typing import Callable
+from typing import List
+
+from mock_server import make_device
+from mock_server import MockYaleServer
+from pyyaledoorman import Client
+from pyyaledoorman.codec import JSONCodec
+from pyyaledoorman.codec import MsgspecCodec
+from pyyaledoorman.codec import OrjsonCodec
+from pyyaledoorman.device import Device
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return the `fraction` percentile of `samples`."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, devices: int, samples: List[float], ops: int) -> None:
+    """Print one result line.
+
+    Arguments:
+        name: Name of the scenario.
+        devices: Number of devices on the account.
+        samples: Duration of every iteration, in seconds.
+        ops: Number of operations per iteration, used for the throughput.
+    """
+    total = sum(samples)
+    throughput = ops * len(samples) / total if total else float("inf")
+    print(
+        f"{name:18} {devices:>7} {throughput:>14.1f} "
+        f"{percentile(samples, 0.5) * 1000:>10.3f} "
+        f"{percentile(samples, 0.99) * 1000:>10.3f}"
+    )
+
+
+async def measure(
+    iterations: int, func: Callable[[], Awaitable[object]]
+) -> List[float]:
+    """Return the duration of `iterations` sequential calls of `func`."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench_parse_config(devices: int, iterations: int) -> None:
+    """Benchmark applying a panel snapshot to `devices` Devices."""
+    records = [make_device(i) for i in range(devices)]
+    client = Client("bench", "bench", "bench")
+    fleet = [Device(client, record) for record in records]
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        for device, record in zip(fleet, records):
+            device.parse_config(record)
+        samples.append(time.perf_counter() - start)
+    report("parse_config", devices, samples, devices)
+    await client.close()
+
+
+def bench_codecs(devices: int, iterations: int) -> None:
+    """Benchmark decoding a `device_status` response with every codec installed."""
+    data = json.dumps(
+        {"code": "000", "data": [make_device(i) for i in range(devices)]}
+    ).encode()
+    for codec_class in (JSONCodec, OrjsonCodec, MsgspecCodec):
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            codec.decode_device_status(data, ("data",))
+            samples.append(time.perf_counter() - start)
+        report(f"decode {codec.name}", devices, samples, devices)
+
+
+async def bench_snapshot(devices: int, iterations: int) -> None:
+    """Benchmark dumping and restoring the state of a fleet of `devices`."""
+    client = Client("bench", "bench", "bench")
+    client._apply_device_status([make_device(i) for i in range(devices)])
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        snapshot = client.dump_snapshot()
+        samples.append(time.perf_counter() - start)
+    report("dump_snapshot", devices, samples, devices)
+    samples = []
+    for _ in range(iterations):
+        restored = Client("bench", "bench", "bench")
+        start = time.perf_counter()
+        restored.restore_snapshot(snapshot)
+        samples.append(time.perf_counter() - start)
+    report("restore_snapshot", devices, samples, devices)
+    await client.close()
+
+
+async def bench(devices: int, latency: float, iterations: int, stream: bool) -> None:
+    """Run all network scenarios for one fleet size."""
+    bulk_iterations = max(1, min(iterations, 100_000 // max(devices, 1)))
+    async with MockYaleServer(devices, latency) as server:
+        client = Client(
+            "bench",
+            "bench",
+            "bench",
+            base_url=server.base_url,
+            stream_device_status=stream,
+        )
+        try:
+            report("login", devices, await measure(iterations, client.login), 1)
+            samples = await measure(iterations, client.update_devices)
+            report("update_devices", devices, samples, devices)
+            device = client.devices[0]
+            samples = await measure(iterations, device.update_state)
+            report("update_state", devices, samples, 1)
+            samples = await measure(
+                bulk_iterations, lambda: client.lock_all(concurrency=50)
+            )
+            report("lock_all", devices, samples, devices)
+            samples = await measure(
+                bulk_iterations, lambda: client.unlock_all("123456", concurrency=50)
+            )
+            report("unlock_all", devices, samples, devices)
+        finally:
+            await client.close()
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument(
+        "--stream", action="store_true", help="decode device states incrementally"
+    )
+    args = parser.parse_args()
+    print(f"{'scenario':18} {'devices':>7} {'ops/s':>14} {'p50 ms':>10} {'p99 ms':>10}")
+    for devices in args.devices:
+        asyncio.run(bench_parse_config(devices, args.iterations))
+        bench_codecs(devices, args.iterations)
+        asyncio.run(bench_snapshot(devices, args.iterations))
+        asyncio.run(bench(devices, args.latency / 1000, args.iterations, args.stream))
+
+
+if __name__ == "__main__":
+    main()
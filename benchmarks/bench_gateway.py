@@ -0,0 +1,175 @@
+"""Load test the gateway against a local mock of the Yale API.
+
+Many concurrent readers fetch the device states from one `Gateway`, half of
+them revalidating with `If-None-Match`, followed by bursts of concurrent
+lock commands for one device. Prints the throughput and p50/p99 latency of
+the readers and how many requests reached the mock API. Finally many
+viewers subscribe to `/events` and the time for a change to reach all of
+them is measured.
+
+Usage::
+
+    python benchmarks/bench_gateway.py --devices 100 --readers 200 --requests 50
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict
+from typing import List
+
+import aiohttp
+from aiohttp import web
+from bench_client import percentile
+from mock_server import MockYaleServer
+from pyyaledoorman import Client
+from pyyaledoorman.gateway import Gateway
+from pyyaledoorman.poller import Poller
+
+
+async def reader(
+    session: aiohttp.ClientSession,
+    url: str,
+    requests: int,
+    revalidate: bool,
+    samples: List[float],
+    statuses: Dict[int, int],
+) -> None:
+    """Fetch `url` `requests` times, recording latencies and status codes."""
+    etag = None
+    for _ in range(requests):
+        headers = {"If-None-Match": etag} if revalidate and etag else {}
+        start = time.perf_counter()
+        async with session.get(url, headers=headers) as resp:
+            await resp.read()
+            etag = resp.headers.get("ETag")
+        samples.append(time.perf_counter() - start)
+        statuses[resp.status] = statuses.get(resp.status, 0) + 1
+
+
+async def viewer(
+    session: aiohttp.ClientSession, url: str, ready: asyncio.Event, seen: List[float]
+) -> None:
+    """Follow the event stream at `url` until a device is unlocked."""
+    async with session.get(url) as resp:
+        async for line in resp.content:
+            if line == b"event: devices\n":
+                ready.set()
+            elif line == b"event: unlocked\n":
+                seen.append(time.perf_counter())
+                return
+
+
+async def fan_out(
+    session: aiohttp.ClientSession, url: str, device_id: str, viewers: int
+) -> None:
+    """Measure how long an unlock takes to reach `viewers` subscribers."""
+    seen: List[float] = []
+    events: List[asyncio.Event] = [asyncio.Event() for _ in range(viewers)]
+    tasks = [
+        asyncio.ensure_future(viewer(session, f"{url}/events", ready, seen))
+        for ready in events
+    ]
+    await asyncio.gather(*(ready.wait() for ready in events))
+    start = time.perf_counter()
+    async with session.post(
+        f"{url}/devices/{device_id}/unlock", json={"pincode": "123456"}
+    ) as resp:
+        await resp.read()
+    await asyncio.gather(*tasks)
+    delays = [t - start for t in seen]
+    print(
+        f"events: {viewers} viewers "
+        f"p50 {percentile(delays, 0.5) * 1000:.3f} ms "
+        f"max {max(delays) * 1000:.3f} ms"
+    )
+
+
+async def bench(
+    devices: int,
+    latency: float,
+    readers: int,
+    requests: int,
+    bursts: int,
+    viewers: int,
+) -> None:
+    """Run the load test for one fleet size."""
+    async with MockYaleServer(devices, latency) as server:
+        client = Client("bench", "bench", "bench", base_url=server.base_url)
+        gateway = Gateway(client, Poller(client, interval=1.0))
+        runner = web.AppRunner(gateway.make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        connector = aiohttp.TCPConnector(limit=max(readers, viewers) + 1)
+        try:
+            async with aiohttp.ClientSession(connector=connector) as session:
+                while not client.devices:
+                    await asyncio.sleep(0.01)
+                samples: List[float] = []
+                statuses: Dict[int, int] = {}
+                start = time.perf_counter()
+                await asyncio.gather(
+                    *(
+                        reader(
+                            session,
+                            f"{url}/devices",
+                            requests,
+                            i % 2 == 0,
+                            samples,
+                            statuses,
+                        )
+                        for i in range(readers)
+                    )
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    f"reads:  {len(samples) / elapsed:>10.1f} req/s "
+                    f"p50 {percentile(samples, 0.5) * 1000:.3f} ms "
+                    f"p99 {percentile(samples, 0.99) * 1000:.3f} ms "
+                    f"200: {statuses.get(200, 0)} 304: {statuses.get(304, 0)}"
+                )
+                lock_url = f"{url}/devices/{client.devices[0].device_id}/lock"
+
+                async def lock() -> None:
+                    async with session.post(lock_url) as resp:
+                        await resp.read()
+
+                before = server.requests.get("/api/panel/device_control/", 0)
+                for _ in range(bursts):
+                    await asyncio.gather(*(lock() for _ in range(readers)))
+                sent = server.requests.get("/api/panel/device_control/", 0) - before
+                print(f"locks:  {bursts * readers} requested, {sent} sent upstream")
+                device_id = client.devices[0].device_id
+                await fan_out(session, url, device_id, viewers)
+                print(f"upstream requests by path: {server.requests}")
+        finally:
+            await runner.cleanup()
+            await client.close()
+
+
+def main() -> None:
+    """Parse the arguments and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--readers", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--viewers", type=int, default=1000)
+    args = parser.parse_args()
+    for devices in args.devices:
+        print(f"devices: {devices}")
+        asyncio.run(
+            bench(
+                devices,
+                args.latency / 1000,
+                args.readers,
+                args.requests,
+                args.bursts,
+                args.viewers,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measure the cold import time of pyyaledoorman.
+
+Runs ``python -X importtime -c "import pyyaledoorman"`` a number of times in
+fresh interpreters and reports the median cumulative import time of the
+package and of the heaviest modules it pulls in.
+
+Usage::
+
+    python benchmarks/bench_import.py [runs]
+"""
+import statistics
+import subprocess  # noqa: S404
+import sys
+from typing import Dict
+from typing import List
+
+
+def _import_times() -> Dict[str, int]:
+    """Return the cumulative import time in microseconds per module."""
+    stderr = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", "import pyyaledoorman"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    times: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.strip() == "imported package":
+            continue
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            continue
+    return times
+
+
+def main(runs: int = 20) -> None:
+    """Print the median cumulative import times over `runs` interpreters."""
+    samples: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        for name, cumulative in _import_times().items():
+            samples.setdefault(name, []).append(cumulative)
+    medians = {name: statistics.median(values) for name, values in samples.items()}
+    ranked = sorted(medians.items(), key=lambda item: item[1], reverse=True)
+    for name, median in ranked[:10]:
+        print(f"{name:30} {median / 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,100 @@
+"""Measure the memory used per Device for large fleets.
+
+Builds fleets of `Device` objects from `device_status` records and prints the
+bytes allocated per device, with and without keeping the raw API payloads.
+The records themselves are freed before measuring, like after a real
+`Client.update_devices` call.
+
+Then measures the bytes allocated and retained per device by one refresh
+with `Device.parse_config`, from dicts and from typed `DeviceRecord`
+objects if the default codec supports them, for unchanged devices and for
+devices whose lock and door state changed.
+
+Usage::
+
+    python benchmarks/bench_memory.py --devices 1000 10000 100000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import tracemalloc
+from typing import Any
+from typing import List
+from typing import Tuple
+
+from mock_server import make_device
+from pyyaledoorman import Client
+from pyyaledoorman.device import Device
+
+
+async def measure(devices: int, keep_raw_payload: bool) -> float:
+    """Return the bytes allocated per device for a fleet of `devices`."""
+    client = Client("bench", "bench", "bench", keep_raw_payload=keep_raw_payload)
+    # Decode the records like the client does, so no strings are shared
+    # between them unless the Device interns them.
+    payload = json.dumps([make_device(i) for i in range(devices)])
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fleet: List[Device] = [Device(client, record) for record in json.loads(payload)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del fleet
+    await client.close()
+    return used / devices
+
+
+async def measure_refresh(
+    devices: int, typed: bool, changed: bool
+) -> Tuple[float, float]:
+    """Return the bytes allocated and retained per device by one refresh."""
+    client = Client("bench", "bench", "bench")
+    records = [make_device(i) for i in range(devices)]
+    fleet = [Device(client, record) for record in records]
+    if changed:
+        for record in records:
+            record["status_open"] = ["device_status.unlock"]
+            record["minigw_lock_status"] = "20"
+    # Decode the refresh like the client does, outside of the measurement.
+    payload = json.dumps({"code": "000", "message": "OK!", "data": records})
+    refresh: List[Any] = client.codec.decode_device_status(
+        payload.encode(), ("data",), typed
+    )["devices"]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for device, record in zip(fleet, refresh):
+        device.parse_config(record)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del refresh
+    await client.close()
+    return (peak - before) / devices, (current - before) / devices
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    print(f"{'devices':>7} {'bytes/device':>14} {'with raw payload':>18}")
+    for devices in args.devices:
+        compact = asyncio.run(measure(devices, keep_raw_payload=False))
+        raw = asyncio.run(measure(devices, keep_raw_payload=True))
+        print(f"{devices:>7} {compact:>14.0f} {raw:>18.0f}")
+    print()
+    print(f"{'refresh':18} {'devices':>7} {'peak B/device':>14} {'kept B/device':>14}")
+    for devices in args.devices:
+        for typed in (False, True):
+            for changed in (False, True):
+                peak, kept = asyncio.run(measure_refresh(devices, typed, changed))
+                name = ("record" if typed else "dict") + (
+                    " changed" if changed else " unchanged"
+                )
+                print(f"{name:18} {devices:>7} {peak:>14.1f} {kept:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
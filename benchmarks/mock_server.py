@@ -0,0 +1,166 @@
+"""Local stand-in for the Yale API, used by the benchmarks.
+
+Serves the endpoints used by pyyaledoorman for a configurable number of
+devices, with an optional artificial latency per request. Response bodies
+are encoded once up front, so the server itself adds as little overhead as
+possible to the measurements.
+
+Usage as a standalone server::
+
+    python benchmarks/mock_server.py --devices 100 --latency 20 --port 8080
+"""
+import argparse
+import asyncio
+import json
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from aiohttp import web
+
+LOGIN_DATA = {
+    "scope": "google_profile groups basic_profile write read",
+    "expires_in": 259200,
+    "access_token": "benchaccesstoken",
+    "refresh_token": "benchrefreshtoken",
+    "token_type": "Bearer",
+}
+CONFIG_DATA = "01FF000001000000000000000000001E000100"
+
+
+def make_device(index: int, area: str = "1") -> Dict[str, Any]:
+    """Return a device record like the ones in `device_status` responses."""
+    address = f"RF:{index:06d}"
+    return {
+        "area": area,
+        "no": str(index),
+        "address": address,
+        "type": "device_type.door_lock",
+        "name": f"door {index}",
+        "status1": "device_status.lock",
+        "rssi": "9",
+        "mac": "00:bb:cc:dd:ff:aa",
+        "minigw_protocol": "DM",
+        "minigw_syncing": "0",
+        "minigw_configuration_data": CONFIG_DATA,
+        "minigw_product_data": "21020120",
+        "minigw_lock_status": "35",
+        "minigw_number_of_credentials_supported": "10",
+        "bypass": "0",
+        "device_id": address,
+        "status_temp_format": "C",
+        "type_no": "72",
+        "device_group": "002",
+        "status_fault": [],
+        "status_open": ["device_status.lock"],
+        "trigger_by_zone": [],
+    }
+
+
+def _ok(data: Any = None) -> Dict[str, Any]:
+    body: Dict[str, Any] = {"result": True, "code": "000", "message": "OK!"}
+    if data is not None:
+        body["data"] = data
+    return body
+
+
+class MockYaleServer:
+    """Serve a fake Yale API on localhost.
+
+    Arguments:
+        devices: Number of devices on the account.
+        latency: Seconds every request is delayed by.
+        port: Port to listen on, `0` picks a free one.
+    """
+
+    def __init__(self, devices: int = 100, latency: float = 0.0, port: int = 0):
+        """Initialize the `MockYaleServer`."""
+        self.latency = latency
+        self.port = port
+        self.requests: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.set_devices(devices)
+
+    def set_devices(self, count: int) -> None:
+        """Replace the devices on the account with `count` new ones."""
+        records: List[Dict[str, Any]] = [make_device(i) for i in range(count)]
+        self._bodies = {
+            "token": json.dumps(LOGIN_DATA).encode(),
+            "device_status": json.dumps(_ok(records)).encode(),
+            "cycle": json.dumps(_ok({"device_status": records})).encode(),
+            "ok": json.dumps(_ok()).encode(),
+            "config": json.dumps(_ok({"configuration": CONFIG_DATA})).encode(),
+        }
+
+    @property
+    def base_url(self) -> str:
+        """Return the URL to pass as `base_url` to the `Client`."""
+        return f"http://127.0.0.1:{self.port}"
+
+    def _handler(self, body: str) -> Any:
+        async def handle(request: web.Request) -> web.Response:
+            self.requests[request.path] = self.requests.get(request.path, 0) + 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            await request.read()
+            return web.Response(
+                body=self._bodies[body], content_type="application/json"
+            )
+
+        return handle
+
+    def make_app(self) -> web.Application:
+        """Return the aiohttp application serving the fake API."""
+        app = web.Application()
+        app.router.add_post("/o/token/", self._handler("token"))
+        app.router.add_get("/api/panel/device_status/", self._handler("device_status"))
+        app.router.add_get("/api/panel/cycle/", self._handler("cycle"))
+        app.router.add_post("/api/panel/device_control/", self._handler("ok"))
+        app.router.add_post("/api/minigw/unlock/", self._handler("ok"))
+        app.router.add_get("/api/minigw/lock/config/", self._handler("config"))
+        app.router.add_post("/api/minigw/lock/config/", self._handler("ok"))
+        return app
+
+    async def start(self) -> str:
+        """Start serving.
+
+        Returns:
+            The base URL of the server.
+        """
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockYaleServer":
+        """Start the server when entering the async context manager."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Stop the server when leaving the async context manager."""
+        await self.stop()
+
+
+def main() -> None:
+    """Run the mock server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    server = MockYaleServer(args.devices, args.latency / 1000, args.port)
+    web.run_app(server.make_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 """Yale Doorman client library."""
 from .client import Client
 from .device import Device
+from .pool import ClientPool
+from .sync import SyncClient
 
-__all__ = ["Client", "Device"]
+__all__ = ["Client", "ClientPool", "Device", "SyncClient"]
@@ -0,0 +1,142 @@
+"""TTL cache for responses of the Yale API read endpoints."""
+import asyncio
+import logging
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+from .const import STATUS_CODES
+
+_LOGGER = logging.getLogger(__name__)
+
+Response = Tuple[int, Any]
+Key = Tuple[str, str]
+
+DEFAULT_TTLS: Mapping[str, float] = {
+    "/api/panel/cycle/": 5.0,
+    "/api/panel/device_status/": 5.0,
+    "/api/minigw/lock/config/": 60.0,
+}
+
+
+class ResponseCache:
+    """Cache GET responses per account and endpoint for a configurable time.
+
+    Responses are kept apart by account, so one cache may be shared between
+    Clients of different accounts, e.g. in a `ClientPool`, without serving
+    the devices of one account to another. Concurrent requests for the same
+    account and endpoint share one API call. Within
+    `stale_while_revalidate` seconds after a response expired, the stale
+    response is served while it is refreshed in the background. Only
+    successful responses are cached. Cached bodies are shared between
+    callers and must not be modified.
+
+    Arguments:
+        ttls: Seconds responses are fresh, per endpoint. Other endpoints are
+            not cached. Defaults to `DEFAULT_TTLS`.
+        stale_while_revalidate: Seconds an expired response may still be served.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        stale_while_revalidate: float = 0.0,
+    ) -> None:
+        """Initialize the `ResponseCache`."""
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: Dict[Key, Tuple[float, Response]] = {}
+        self._inflight: Dict[Key, "asyncio.Future[Response]"] = {}
+        self._generation = 0
+
+    def invalidate(
+        self, endpoint: Optional[str] = None, account: Optional[str] = None
+    ) -> None:
+        """Drop cached responses.
+
+        Responses of requests already in flight are not cached, and later
+        requests do not join them.
+
+        Arguments:
+            endpoint: Only drop the responses of this endpoint.
+            account: Only drop the responses of this account.
+        """
+        self._generation += 1
+        if endpoint is None and account is None:
+            self._entries.clear()
+            self._inflight.clear()
+            return
+        for entries in (self._entries, self._inflight):
+            for key in [
+                key
+                for key in entries
+                if endpoint in (None, key[1]) and account in (None, key[0])
+            ]:
+                del entries[key]
+
+    async def get(
+        self,
+        endpoint: str,
+        fetch: Callable[[], Awaitable[Response]],
+        account: str = "",
+    ) -> Response:
+        """Return the response of `endpoint`, from cache or by calling `fetch`.
+
+        Arguments:
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+            fetch: Requests the endpoint from the API.
+            account: The account the response belongs to, e.g. the username.
+
+        Returns:
+            The HTTP status and the decoded response body.
+        """
+        ttl = self.ttls.get(endpoint)
+        if ttl is None:
+            return await fetch()
+        key = (account, endpoint)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < ttl:
+                return entry[1]
+            if age < ttl + self.stale_while_revalidate:
+                self._fetch(key, fetch)
+                return entry[1]
+        return await asyncio.shield(self._fetch(key, fetch))
+
+    def _fetch(
+        self, key: Key, fetch: Callable[[], Awaitable[Response]]
+    ) -> "asyncio.Future[Response]":
+        """Return the in-flight request of `key`, starting one if needed."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._store(key, fetch))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._fetched(key, done))
+        return future
+
+    async def _store(
+        self, key: Key, fetch: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        generation = self._generation
+        response = await fetch()
+        status, body = response
+        if (
+            generation == self._generation
+            and status < 400
+            and isinstance(body, dict)
+            and body.get("code") == STATUS_CODES["SUCCESS"]
+        ):
+            self._entries[key] = (time.monotonic(), response)
+        return response
+
+    def _fetched(self, key: Key, future: "asyncio.Future[Response]") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            _LOGGER.debug("Couldn't refresh %s", key[1], exc_info=future.exception())
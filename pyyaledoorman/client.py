@@ -1,39 +1,106 @@
 """Yale API Client. Used to log in to the API and instantiate Devices."""
+import asyncio
 import logging
+import time
 from datetime import datetime
 from http.client import FORBIDDEN
 from http.client import UNAUTHORIZED
 from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import cast
 from typing import Dict
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
 
+from aiohttp import ClientError
+from aiohttp import ClientResponse
+from aiohttp import ClientResponseError
 from aiohttp import ClientSession
+from aiohttp import ClientTimeout
+from aiohttp import ContentTypeError
 
+from .cache import ResponseCache
+from .codec import default_codec
+from .codec import DeviceRecord
+from .codec import JSONCodec
+from .commands import CommandResult
+from .commands import run_bulk
 from .const import BASE_URL
 from .const import INITIAL_TOKEN
 from .const import STATUS_CODES
+from .const import TOKEN_RENEW_MARGIN
+from .const import TOKEN_RENEW_RETRY
+from .device import Change
 from .device import Device
+from .device import observed
+from .events import diff_events
+from .events import DropPolicy
+from .events import EventBus
+from .events import EventSource
+from .events import Observed
+from .events import Subscription
+from .exceptions import AuthenticationError
+from .exceptions import CircuitOpenError
+from .metrics import ClientStats
+from .metrics import RequestRecord
+from .ratelimit import Priority
+from .ratelimit import RateLimiter
+from .resilience import CircuitBreaker
+from .resilience import parse_retry_after
+from .resilience import RetryPolicy
+from .session import SessionOwner
+from .snapshot import dump_snapshot
+from .snapshot import load_snapshot
+from .streaming import JSONArrayStream
+from .token_store import StoredToken
+from .token_store import TokenStore
 
 _LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
 
-class AuthenticationError(Exception):
-    """Exception for authentication errors."""
+Reader = Callable[[ClientResponse], Awaitable[Any]]
 
-    def __init__(self, *args: Any) -> None:
-        """Initialize the Exception."""
-        Exception.__init__(self, *args)
 
-
-class Client:
+class Client(SessionOwner):
     """Yale Doorman client.
 
     Arguments:
         username: Username for logging in to the Yale API.
         password: Password for logging in to the Yale API.
         initial_token: Initial token for logging in to the Yale API.
-        session (optional): aiohttp ClientSession to use.
+        session (optional): aiohttp ClientSession to use. The caller stays
+            responsible for closing it. Without one, the client creates a
+            session on first use and closes it in `close`.
+        token_store (optional): `TokenStore` to load tokens from and save them to.
+        stats (optional): `ClientStats` to record request statistics in.
+        base_url (optional): URL of the Yale API, e.g. to point at a test server.
+        retry_policy (optional): `RetryPolicy` for GET requests.
+        failure_threshold: Consecutive failures that open an endpoint's circuit.
+        reset_timeout: Seconds an endpoint's circuit stays open.
+        cache (optional): `ResponseCache` for the read endpoints. It keeps the
+            responses of each username apart, so it may be shared.
+        keep_raw_payload: Keep the raw API payload of every `Device`.
+        stream_device_status: Decode device states while they are received,
+            rather than buffering the whole response. Has no effect with a
+            `cache`, which needs complete responses.
+        codec (optional): `JSONCodec` decoding the responses. Defaults to the
+            fastest codec installed, see `default_codec`.
+        limit: Maximum number of simultaneous connections of an own session.
+        limit_per_host: Maximum number of simultaneous connections to the Yale
+            API of an own session.
+        keepalive_timeout: Seconds an idle connection of an own session is kept.
+        ttl_dns_cache: Seconds DNS lookups of an own session are cached.
+        auth_timeout: Seconds a login may take.
+        poll_timeout: Seconds a GET request, e.g. refreshing the devices, may take.
+        command_timeout: Seconds a command, e.g. locking, may take.
+        rate_limiter (optional): `RateLimiter` every request waits for. Logins
+            and commands are served before GET requests.
     """
 
     def __init__(
@@ -42,21 +109,65 @@ class Client:
         password: str,
         initial_token: str = INITIAL_TOKEN,
         session: Optional[ClientSession] = None,
+        token_store: Optional[TokenStore] = None,
+        stats: Optional[ClientStats] = None,
+        base_url: str = BASE_URL,
+        retry_policy: Optional[RetryPolicy] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+        keep_raw_payload: bool = False,
+        stream_device_status: bool = False,
+        codec: Optional[JSONCodec] = None,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        auth_timeout: float = 30.0,
+        poll_timeout: float = 15.0,
+        command_timeout: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
     ) -> None:
         """Initialize the Yale Doorman Client."""
         self.username = username
         self.password = password
         self.initial_token = initial_token
+        self.base_url = base_url
         self.logged_in = datetime.timestamp(datetime.now())
         _LOGGER.info("Logged in to Yale")
-        if session:
-            self._session = session
-        else:
-            self._session = ClientSession()
-        self._devices: List[Device] = []
+        self._init_session(
+            session, limit, limit_per_host, keepalive_timeout, ttl_dns_cache
+        )
+        self.rate_limiter = rate_limiter
+        self._timeouts = {
+            "auth": ClientTimeout(total=auth_timeout),
+            "poll": ClientTimeout(total=poll_timeout),
+            "command": ClientTimeout(total=command_timeout),
+        }
+        self._devices: Dict[str, Device] = {}
+        self._devices_by_address: Dict[str, Device] = {}
+        self._devices_by_area: Dict[str, Dict[str, Device]] = {}
         self._token: Optional[str] = None
         self._refresh_token: Optional[str] = None
+        self._login_task: Optional["asyncio.Future[bool]"] = None
+        self._login_failed_ts: Optional[float] = None
+        self._token_store = token_store
+        self.stats = stats if stats is not None else ClientStats()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.cache = cache
+        self.keep_raw_payload = keep_raw_payload
+        self.stream_device_status = stream_device_status
+        self.codec = codec if codec is not None else default_codec()
         self.headers: Dict[str, str] = {}
+        self.last_command_ts = 0.0
+        self._command_listeners: List[Callable[[Device, str], None]] = []
+        self._refresh_listeners: List[Callable[[Device, Change], None]] = []
+        self._inflight: Dict[Tuple[str, ...], "asyncio.Future[Any]"] = {}
+        self.event_bus = EventBus()
+        self.devices_updated_at: Optional[float] = None
 
     @property
     def login_ts(self) -> float:
@@ -105,17 +216,338 @@ class Client:
 
     @property
     def devices(self) -> List[Device]:
-        """Return list of Devices."""
-        return self._devices
+        """Return list of Devices, in the order they were discovered."""
+        return list(self._devices.values())
 
-    @property
-    def session(self) -> ClientSession:
-        """Return the aiohttp session."""
-        return self._session
+    def get_device(self, device_id: str) -> Optional[Device]:
+        """Return the `Device` with the given `device_id`, if known.
+
+        Arguments:
+            device_id: The ID of the device to look up.
+
+        Returns:
+            The matching `Device`, or `None`.
+        """
+        return self._devices.get(device_id)
+
+    def get_device_by_address(self, address: str) -> Optional[Device]:
+        """Return the `Device` with the given address, if known.
+
+        Arguments:
+            address: The address of the device to look up.
+
+        Returns:
+            The matching `Device`, or `None`.
+        """
+        return self._devices_by_address.get(address)
+
+    def get_devices_by_area(self, area: str) -> List[Device]:
+        """Return all known Devices in an area.
+
+        Arguments:
+            area: The area to look up.
+
+        Returns:
+            List of Devices in the area.
+        """
+        return list(self._devices_by_area.get(area, {}).values())
+
+    def _index_device(self, device: Device) -> None:
+        """Add a `Device` to the address and area indexes."""
+        self._devices_by_address[device.address] = device
+        self._devices_by_area.setdefault(device.area, {})[device.device_id] = device
+
+    def _unindex_device(self, device: Device, address: str, area: str) -> None:
+        """Remove a `Device` from the address and area indexes.
+
+        Arguments:
+            device: The `Device` to remove.
+            address: The address the device was indexed under.
+            area: The area the device was indexed under.
+        """
+        if self._devices_by_address.get(address) is device:
+            del self._devices_by_address[address]
+        area_devices = self._devices_by_area.get(area)
+        if area_devices is not None:
+            area_devices.pop(device.device_id, None)
+            if not area_devices:
+                del self._devices_by_area[area]
+
+    def _apply_device_status(
+        self,
+        devices: List[Union[Dict[str, Any], DeviceRecord]],
+        add_new: bool = True,
+    ) -> None:
+        """Apply a list of device records from the API to the registry.
+
+        Arguments:
+            devices: Device records as returned by the API.
+            add_new: Whether to register devices that are not yet known.
+        """
+        publish = self.event_bus.active
+        for device_config in devices:
+            if isinstance(device_config, dict):
+                device_id = device_config.get("device_id", "")
+            else:
+                device_id = device_config.device_id
+            device = self._devices.get(device_id)
+            if device is None:
+                if add_new:
+                    device = Device(self, device_config)
+                    self._devices[device.device_id] = device
+                    self._index_device(device)
+                    self._refreshed(device, Change.all)
+                continue
+            # Locals only, so refreshing unchanged devices allocates nothing.
+            address, area = device._address, device._area
+            state, mingw_status, config = (
+                device._state,
+                device._mingw_status,
+                device._config,
+            )
+            changed = device.parse_config(device_config)
+            if not changed:
+                continue
+            if publish and changed & Change.observed:
+                self.event_bus.publish(
+                    diff_events(
+                        device.device_id,
+                        observed(state, mingw_status, config),
+                        device._observed(),
+                        EventSource.refresh,
+                    )
+                )
+            if changed & (Change.address | Change.area):
+                self._unindex_device(device, address, area)
+                self._index_device(device)
+            self._refreshed(device, changed)
+
+    def _refreshed(self, device: Device, changed: Change) -> None:
+        """Notify the refresh listeners about a changed or new device."""
+        for listener in list(self._refresh_listeners):
+            listener(device, changed)
+
+    async def _read_device_status(
+        self, resp: ClientResponse, path: Tuple[str, ...], add_new: bool
+    ) -> Dict[str, Any]:
+        """Apply the device records of a response while it is received.
+
+        Records are applied as soon as the response `code` is known to be
+        successful. Records received before the `code` are held back until then.
+
+        Arguments:
+            resp: The response to read.
+            path: Members leading to the list of device records.
+            add_new: Whether to register devices that are not yet known.
+
+        Returns:
+            The members of the response, except for the device records.
+        """
+        stream = JSONArrayStream(path)
+        pending: List[Union[Dict[str, Any], DeviceRecord]] = []
+        async for chunk in resp.content.iter_any():
+            pending.extend(stream.feed(chunk))
+            if pending and stream.fields.get("code") == STATUS_CODES["SUCCESS"]:
+                self._apply_device_status(pending, add_new)
+                pending = []
+        pending.extend(stream.close())
+        if stream.fields.get("code") == STATUS_CODES["SUCCESS"]:
+            self._apply_device_status(pending, add_new)
+        return stream.fields
+
+    async def _fetch_device_status(
+        self, endpoint: str, path: Tuple[str, ...], add_new: bool = True
+    ) -> bool:
+        """Fetch device records from the API and apply them to the registry.
+
+        Arguments:
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+            path: Members of the response leading to the list of device records.
+            add_new: Whether to register devices that are not yet known.
+
+        Returns:
+            bool: True if the API answered with success.
+        """
+        res: Dict[str, Any]
+        if self.stream_device_status and self.cache is None:
+            _, res = await self._request(
+                "GET",
+                endpoint,
+                reader=lambda resp: self._read_device_status(resp, path, add_new),
+            )
+        else:
+            _, res = await self._request(
+                "GET",
+                endpoint,
+                reader=lambda resp: self._decode(
+                    resp,
+                    lambda data: self.codec.decode_device_status(
+                        data, path, typed=not self.keep_raw_payload
+                    ),
+                ),
+            )
+            if res.get("code") == STATUS_CODES["SUCCESS"]:
+                self._apply_device_status(res["devices"], add_new)
+        if res.get("code") != STATUS_CODES["SUCCESS"]:
+            return False
+        self.devices_updated_at = time.time()
+        return True
+
+    @staticmethod
+    async def _decode(resp: ClientResponse, decode: Callable[[bytes], Any]) -> Any:
+        """Decode a JSON response body with `decode`.
+
+        Arguments:
+            resp: The response to read.
+            decode: Decodes the body.
+
+        Returns:
+            The decoded body, or `None` if the body is empty.
+
+        Raises:
+            ContentTypeError: The response is not JSON.
+        """
+        data = await resp.read()
+        if not data.strip():
+            return None
+        if "json" not in resp.content_type:
+            raise ContentTypeError(
+                resp.request_info,
+                resp.history,
+                status=resp.status,
+                message=f"Unexpected content type {resp.content_type}",
+                headers=resp.headers,
+            )
+        return decode(data)
+
+    async def close(self) -> None:
+        """Stop a running login and close the session if the client created it."""
+        if self._login_task is not None and not self._login_task.done():
+            self._login_task.cancel()
+        await self._close_session()
+
+    async def __aenter__(self) -> "Client":
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Close the client when leaving the async context manager."""
+        await self.close()
+
+    @staticmethod
+    def _kind(method: str, endpoint: str) -> str:
+        """Return the kind of a request to `endpoint`.
+
+        Arguments:
+            method: The HTTP method.
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+
+        Returns:
+            `auth` for logins, `poll` for other GET requests and `command`
+            otherwise.
+        """
+        if endpoint == "/o/token/":
+            return "auth"
+        return "poll" if method == "GET" else "command"
+
+    def _restore_token(self) -> bool:
+        """Load tokens from the token store.
+
+        Returns:
+            bool: True if a still valid access token was restored.
+        """
+        if self._token_store is None:
+            return False
+        stored = self._token_store.load(self.username)
+        if stored is None:
+            return False
+        if not self._apply_stored_token(stored):
+            return False
+        _LOGGER.info("Restored Yale access token from the token store")
+        return True
+
+    def _apply_stored_token(self, stored: StoredToken) -> bool:
+        """Use stored tokens.
+
+        The refresh token is always taken over, the access token only while
+        it is not about to expire.
+
+        Arguments:
+            stored: The stored tokens.
+
+        Returns:
+            bool: True if the access token was taken over.
+        """
+        self.refresh_token = stored.refresh_token
+        timestamp = datetime.timestamp(datetime.now())
+        if stored.login_ts + stored.expires_in - TOKEN_RENEW_MARGIN <= timestamp:
+            return False
+        self.token_expires_in = stored.expires_in
+        self.login_ts = stored.login_ts
+        self.token = stored.access_token
+        return True
+
+    def dump_snapshot(self) -> bytes:
+        """Serialize the devices, tokens and timestamps of the client.
+
+        Returns:
+            A compact JSON snapshot, see `restore_snapshot`.
+        """
+        return dump_snapshot(self, self.codec)
+
+    def restore_snapshot(self, data: bytes) -> None:
+        """Restore a snapshot taken with `dump_snapshot`.
+
+        The devices are available right away, with the state they had when
+        the snapshot was taken. Refresh them with `update_devices`, e.g. in
+        a background task; the access token is reused if still valid.
+
+        Arguments:
+            data: The snapshot.
+        """
+        load_snapshot(self, data, self.codec)
+
+    def _save_token(self) -> None:
+        """Save the current tokens to the token store."""
+        if self._token_store is None or self.token is None:
+            return
+        self._token_store.save(
+            self.username,
+            StoredToken(
+                access_token=self.token,
+                refresh_token=self.refresh_token,
+                expires_in=self.token_expires_in,
+                login_ts=self.login_ts,
+            ),
+        )
 
     async def login(self) -> bool:  # raises: AuthenticationError
         """Log in to the Yale API.
 
+        When a `token_store` is configured and holds a valid access token for
+        this account, it is reused without contacting the API. A stored but
+        expired token is renewed with the refresh grant, falling back to the
+        password grant if the refresh token is rejected.
+
+        Returns:
+            bool: True if successfully logged in.
+
+        Raises:
+            AuthenticationError: Supplied username, password or initial token is wrong.
+
+        # noqa: DAR402 AuthenticationError
+        """
+        if self.token is None and self.refresh_token is None and self._restore_token():
+            return True
+        return await self._request_token()
+
+    async def _request_token(self) -> bool:
+        """Request new tokens with the refresh grant, or the password grant.
+
+        A rejected refresh token is dropped and the password grant is used
+        instead. The token store is not consulted again, as it would hand out
+        the same rejected refresh token.
+
         Returns:
             bool: True if successfully logged in.
 
@@ -138,58 +570,475 @@ class Client:
                 "username": self.username,
                 "password": self.password,
             }
-        async with self._session.post(
-            f"{BASE_URL}/o/token/",
-            data=auth_data,
-            headers=headers,
-        ) as resp:
-            status = resp.status
-            data = await resp.json()
-
-            if status in (FORBIDDEN, UNAUTHORIZED):
-                if self.refresh_token:
-                    self.refresh_token = None
-                    return await self.login()
-                _LOGGER.debug(
-                    "Failed to authenticate with Yale Smart Alarm. Error: %s", data
+        status, data = await self._request(
+            "POST", "/o/token/", data=auth_data, headers=headers
+        )
+        if status in (FORBIDDEN, UNAUTHORIZED):
+            if self.refresh_token:
+                self.refresh_token = None
+                return await self._request_token()
+            _LOGGER.debug(
+                "Failed to authenticate with Yale Smart Alarm. Error: %s", data
+            )
+            if self._token_store is not None:
+                self._token_store.clear(self.username)
+            raise AuthenticationError(
+                "Failed to authenticate with Yale Smart Alarm. Check credentials."
+            )
+        self.token_expires_in = data.get("expires_in")
+
+        self.login_ts = datetime.timestamp(datetime.now())
+        self.token = data.get("access_token")
+        self.refresh_token = data.get("refresh_token")
+        self.stats.record_token_refresh(auth_data["grant_type"])
+        self._save_token()
+        return True
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        raise_for_status: bool = False,
+        reader: Optional[Reader] = None,
+    ) -> Tuple[int, Any]:
+        """Send a request to the Yale API and decode the JSON response.
+
+        Every request to the API goes through here. With a `cache`, GET
+        responses of this account are served from it, and successful
+        commands invalidate them.
+
+        Arguments:
+            method: The HTTP method.
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+            data: Form data to send.
+            headers: Headers to send instead of the authorization headers.
+            raise_for_status: Raise `ClientResponseError` for 4xx/5xx responses.
+            reader: Reads the response instead of decoding it with `codec`.
+
+        Returns:
+            The HTTP status and the decoded response body.
+        """
+        cache = self.cache
+        if cache is None:
+            return await self._request_with_retry(
+                method, endpoint, data, headers, raise_for_status, reader
+            )
+        if method == "GET":
+            return await cache.get(
+                endpoint,
+                lambda: self._request_with_retry(
+                    method, endpoint, data, headers, raise_for_status, reader
+                ),
+                self.username,
+            )
+        status, body = await self._request_with_retry(
+            method, endpoint, data, headers, raise_for_status, reader
+        )
+        if (
+            endpoint != "/o/token/"
+            and isinstance(body, dict)
+            and body.get("code") == STATUS_CODES["SUCCESS"]
+        ):
+            cache.invalidate(account=self.username)
+        return status, body
+
+    async def _request_with_retry(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        raise_for_status: bool = False,
+        reader: Optional[Reader] = None,
+    ) -> Tuple[int, Any]:
+        """Send a request, retrying and circuit breaking as configured.
+
+        Every request is recorded in `stats`. GET requests failing with a
+        transport error or a retryable status are retried according to
+        `retry_policy`. Each endpoint has a circuit breaker, which refuses
+        requests for a while after repeated failures.
+
+        Arguments:
+            method: The HTTP method.
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+            data: Form data to send.
+            headers: Headers to send instead of the authorization headers.
+            raise_for_status: Raise `ClientResponseError` for 4xx/5xx responses.
+            reader: Reads the response instead of decoding it with `codec`.
+
+        Returns:
+            The HTTP status and the decoded response body.
+
+        Raises:
+            CircuitOpenError: The circuit breaker of the endpoint is open.
+            ClientError: The request failed or timed out, after retrying GETs.
+        """
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        policy = self.retry_policy
+        attempts = policy.attempts if method == "GET" else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow_request():
+                self.stats.record_request(
+                    RequestRecord(method, endpoint, 0, None, 0.0, "CircuitOpenError")
                 )
-                raise AuthenticationError(
-                    "Failed to authenticate with Yale Smart Alarm. Check credentials."
+                raise CircuitOpenError(f"Too many failures, not calling {endpoint}")
+            try:
+                status, body, retry_after = await self._send(
+                    method, endpoint, data, headers, raise_for_status, reader
                 )
-            self.token_expires_in = data.get("expires_in")
+            except (ClientError, asyncio.TimeoutError) as err:
+                if not self._is_retryable(err, breaker) or attempt >= attempts:
+                    raise
+                retry_after = None
+                if isinstance(err, ClientResponseError) and err.headers:
+                    retry_after = parse_retry_after(err.headers.get("Retry-After"))
+            else:
+                if status not in policy.retry_statuses:
+                    breaker.record_success()
+                    return status, body
+                breaker.record_failure()
+                if attempt >= attempts:
+                    return status, body
+            self.stats.record_retry(endpoint)
+            delay = policy.delay(attempt, retry_after)
+            _LOGGER.debug("Retrying %s %s in %.2fs", method, endpoint, delay)
+            await asyncio.sleep(delay)
 
-            self.login_ts = datetime.timestamp(datetime.now())
-            self.token = data.get("access_token")
-            self.refresh_token = data.get("refresh_token")
-            return True
+    def _is_retryable(self, err: BaseException, breaker: CircuitBreaker) -> bool:
+        """Record a failed request in `breaker` and return whether to retry it.
+
+        Responses with a non-retryable status, e.g. `403`, show that the API is
+        reachable, so they count as a success for the circuit breaker.
+
+        Arguments:
+            err: The error raised by the request.
+            breaker: The circuit breaker of the endpoint.
+
+        Returns:
+            bool: True if the request may be retried.
+        """
+        status = err.status if isinstance(err, ClientResponseError) else 0
+        if status and status not in self.retry_policy.retry_statuses:
+            breaker.record_success()
+            return False
+        breaker.record_failure()
+        return True
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, str]],
+        raise_for_status: bool,
+        reader: Optional[Reader] = None,
+    ) -> Tuple[int, Any, Optional[float]]:
+        """Send a single request and record it in `stats`.
+
+        Arguments:
+            method: The HTTP method.
+            endpoint: The API path, e.g. `/api/panel/cycle/`.
+            data: Form data to send.
+            headers: Headers to send instead of the authorization headers.
+            raise_for_status: Raise `ClientResponseError` for 4xx/5xx responses.
+            reader: Reads the response instead of decoding it with `codec`.
+
+        Returns:
+            The HTTP status, the decoded response body and the `Retry-After` delay.
+
+        Raises:
+            Exception: The request failed; the error is recorded before re-raising.
+        """
+        kind = self._kind(method, endpoint)
+        if self.rate_limiter is not None:
+            waited = await self.rate_limiter.acquire(
+                Priority.background if kind == "poll" else Priority.interactive
+            )
+            if waited:
+                self.stats.record_throttle(endpoint)
+                _LOGGER.debug("Rate limited %s %s for %.2fs", method, endpoint, waited)
+        start = time.perf_counter()
+        status = 0
+        try:
+            async with self.session.request(
+                method,
+                f"{self.base_url}{endpoint}",
+                data=data,
+                headers=self.headers if headers is None else headers,
+                raise_for_status=raise_for_status,
+                timeout=self._timeouts[kind],
+            ) as resp:
+                status = resp.status
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                if reader is None:
+                    body = await self._decode(resp, self.codec.loads)
+                else:
+                    body = await reader(resp)
+        except Exception as err:
+            if isinstance(err, ClientResponseError):
+                status = err.status
+            self.stats.record_request(
+                RequestRecord(
+                    method,
+                    endpoint,
+                    status,
+                    None,
+                    time.perf_counter() - start,
+                    type(err).__name__,
+                )
+            )
+            raise
+        code = body.get("code") if isinstance(body, dict) else None
+        self.stats.record_request(
+            RequestRecord(method, endpoint, status, code, time.perf_counter() - start)
+        )
+        return status, body, retry_after
+
+    def add_command_listener(
+        self, listener: Callable[[Device, str], None]
+    ) -> Callable[[], None]:
+        """Register a callback run after every successful device command.
+
+        Arguments:
+            listener: Called with the `Device` and the command name, i.e. `lock`,
+                `unlock` or `config`.
+
+        Returns:
+            A function that removes the listener again.
+        """
+        self._command_listeners.append(listener)
+        return lambda: self._command_listeners.remove(listener)
+
+    def add_refresh_listener(
+        self, listener: Callable[[Device, Change], None]
+    ) -> Callable[[], None]:
+        """Register a callback run for every device a refresh changed.
+
+        Unchanged devices are skipped, so listeners cost nothing while
+        nothing changes.
+
+        Arguments:
+            listener: Called with the `Device` and the changed fields, which
+                are `Change.all` for newly discovered devices.
+
+        Returns:
+            A function that removes the listener again.
+        """
+        self._refresh_listeners.append(listener)
+        return lambda: self._refresh_listeners.remove(listener)
+
+    def _command_completed(
+        self, device: Device, command: str, before: Observed
+    ) -> None:
+        """Record a successful device command and notify listeners.
+
+        Arguments:
+            device: The `Device` the command was sent to.
+            command: Name of the command, e.g. `lock`.
+            before: What the device looked like before the command.
+        """
+        self.last_command_ts = time.monotonic()
+        self.event_bus.publish(
+            diff_events(
+                device.device_id, before, device._observed(), EventSource.command
+            )
+        )
+        for listener in list(self._command_listeners):
+            listener(device, command)
+
+    def events(
+        self, maxsize: int = 100, drop_policy: DropPolicy = DropPolicy.drop_oldest
+    ) -> Subscription:
+        """Subscribe to state changes of the devices.
+
+        Use as ``async for event in client.events(): ...``. Events are
+        derived from refreshes of the device states and from successful
+        commands. Close the subscription, or use it as an async context
+        manager, to stop receiving events.
+
+        Arguments:
+            maxsize: Maximum number of events queued for the subscriber.
+            drop_policy: What to do with new events when the queue is full.
+
+        Returns:
+            The `Subscription`, an async iterator of `Event` objects.
+        """
+        return self.event_bus.subscribe(maxsize, drop_policy)
+
+    async def _coalesce(
+        self, key: Tuple[str, ...], factory: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Run `factory`, sharing the result with identical in-flight calls.
+
+        Arguments:
+            key: Identifies the call, e.g. `("lock", device_id)`.
+            factory: Starts the call when none with the same `key` is running.
+
+        Returns:
+            The result of the shared call.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return cast(T, await asyncio.shield(future))
+
+    def _select_devices(self, area: Optional[str]) -> List[Device]:
+        """Return the Devices in `area`, or all Devices if `area` is `None`."""
+        if area is None:
+            return self.devices
+        return self.get_devices_by_area(area)
+
+    async def _refresh_after_bulk(self) -> None:
+        """Refresh the device states once after a bulk command."""
+        try:
+            await self.update_devices()
+        except Exception:
+            _LOGGER.debug("Couldn't refresh devices after bulk command", exc_info=True)
+
+    async def lock_all(
+        self, area: Optional[str] = None, concurrency: int = 10, refresh: bool = True
+    ) -> Dict[str, CommandResult]:
+        """Lock all Devices, or all Devices in an area.
+
+        Arguments:
+            area: Only lock the Devices in this area.
+            concurrency: Maximum number of lock requests in flight.
+            refresh: Refresh the device states once all commands are done.
+
+        Returns:
+            The `CommandResult` per `device_id`.
+        """
+        results = await run_bulk(
+            self._select_devices(area), lambda device: device.lock(), concurrency
+        )
+        if refresh:
+            await self._refresh_after_bulk()
+        return results
+
+    async def unlock_all(
+        self,
+        pincode: str,
+        area: Optional[str] = None,
+        concurrency: int = 10,
+        refresh: bool = True,
+    ) -> Dict[str, CommandResult]:
+        """Unlock all Devices, or all Devices in an area.
+
+        Arguments:
+            pincode: A valid Yale Doorman pincode.
+            area: Only unlock the Devices in this area.
+            concurrency: Maximum number of unlock requests in flight.
+            refresh: Refresh the device states once all commands are done.
+
+        Returns:
+            The `CommandResult` per `device_id`.
+        """
+        results = await run_bulk(
+            self._select_devices(area),
+            lambda device: device.unlock(pincode),
+            concurrency,
+        )
+        if refresh:
+            await self._refresh_after_bulk()
+        return results
+
+    async def apply_config(
+        self,
+        settings: Mapping[str, str],
+        area: Optional[str] = None,
+        concurrency: int = 10,
+    ) -> Dict[str, CommandResult]:
+        """Apply a configuration to all Devices, or all Devices in an area.
+
+        Only the settings differing from each device's cached configuration
+        are sent, so devices already configured cost no requests.
+
+        Arguments:
+            settings: Desired values by configuration index, e.g.
+                ``{CONFIG_IDX_VOLUME: VOLUME_LOW, CONFIG_IDX_LANG: LANG_EN}``.
+            area: Only configure the Devices in this area.
+            concurrency: Maximum number of Devices configured at once.
+
+        Returns:
+            The `CommandResult` per `device_id`, listing the `changed` indices.
+
+        Raises:
+            ValueError: An index or value is invalid, nothing was sent.
+
+        # noqa: DAR402 ValueError
+        """
+        devices = self._select_devices(area)
+        # Validates the settings before any request is sent.
+        diffs = {device.device_id: device.config_diff(settings) for device in devices}
+        changed: Dict[str, List[str]] = {device.device_id: [] for device in devices}
+        results = await run_bulk(
+            devices,
+            lambda device: device._apply_config_diff(
+                diffs[device.device_id], changed[device.device_id]
+            ),
+            concurrency,
+        )
+        return {
+            device_id: result._replace(changed=tuple(changed[device_id]))
+            for device_id, result in results.items()
+        }
+
+    def _start_login(self) -> "asyncio.Future[bool]":
+        """Return the in-flight login, starting one if none is running."""
+        if self._login_task is None or self._login_task.done():
+            self._login_task = asyncio.ensure_future(self.login())
+            self._login_task.add_done_callback(self._login_done)
+        return self._login_task
+
+    def _login_done(self, task: "asyncio.Future[bool]") -> None:
+        """Log failed logins, so background renewals never go unnoticed."""
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            _LOGGER.debug("Renewing the access token failed", exc_info=task.exception())
+            self._login_failed_ts = time.monotonic()
+        else:
+            self._login_failed_ts = None
 
     async def _validate_access_token(self) -> None:
-        """Verify that our access token is still valid."""
-        now = datetime.now()
-        timestamp = datetime.timestamp(now)
-        # Check if login time + expires in is past now(-ish)
-        if (self.login_ts + self.token_expires_in) <= (timestamp - 1000):
-            await self.login()
+        """Verify that our access token is still valid.
+
+        Renewal is single-flight: concurrent callers share one login. An
+        expired token blocks until renewed, while a token that is about to
+        expire is renewed in the background so callers are not held up. After
+        a failed login, the next background renewal waits `TOKEN_RENEW_RETRY`
+        seconds.
+        """
+        if self.token is None:
+            await asyncio.shield(self._start_login())
+            return
+        timestamp = datetime.timestamp(datetime.now())
+        expires = self.login_ts + self.token_expires_in
+        if expires <= timestamp:
+            await asyncio.shield(self._start_login())
+        elif expires - TOKEN_RENEW_MARGIN <= timestamp and (
+            self._login_failed_ts is None
+            or time.monotonic() - self._login_failed_ts >= TOKEN_RENEW_RETRY
+        ):
+            self._start_login()
 
     async def update_devices(self) -> None:
-        """Update the device states."""
+        """Update the device states.
+
+        The panel snapshot is fetched once and applied to every known `Device`,
+        so refreshing the whole fleet costs a single request. Devices not seen
+        before are added to `devices`.
+        """
         await self._validate_access_token()
-        url = f"{BASE_URL}/api/panel/device_status/"
-        async with self._session.get(
-            url, headers=self.headers, raise_for_status=False
-        ) as resp:
-            res = await resp.json()
-            if res.get("code") == STATUS_CODES["SUCCESS"]:
-                for device in res.get("data"):
-                    existing = False
-                    for existing_device in self._devices:
-                        if existing_device.device_id == device.get("device_id"):
-                            existing = True
-                            await existing_device.update_state()
-                            break
-                    if existing:
-                        continue
-
-                    self._devices.append(Device(self, device))
-            else:
-                _LOGGER.debug("Couldn't fetch devices. Unknown error!")
+        if not await self._fetch_device_status("/api/panel/device_status/", ("data",)):
+            _LOGGER.debug("Couldn't fetch devices. Unknown error!")
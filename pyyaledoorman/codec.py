@@ -0,0 +1,243 @@
+"""JSON codecs for Yale API responses.
+
+`default_codec` picks the fastest codec available: msgspec, orjson or the
+stdlib `json` module, in that order. msgspec and orjson are optional and
+only used when installed.
+"""
+import json
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+
+@dataclass
+class DeviceRecord:
+    """The fields of a device record in `device_status` responses used by `Device`.
+
+    Codecs supporting typed decoding return these instead of dicts.
+    """
+
+    __slots__ = (
+        "device_id",
+        "name",
+        "type",
+        "area",
+        "address",
+        "status_open",
+        "minigw_configuration_data",
+        "minigw_lock_status",
+    )
+
+    device_id: str
+    name: str
+    type: str
+    area: str
+    address: str
+    status_open: List[str]
+    minigw_configuration_data: str
+    minigw_lock_status: str
+
+
+@dataclass
+class _DeviceStatusResponse:
+    code: str = ""
+    message: str = ""
+    data: List[DeviceRecord] = field(default_factory=list)
+
+
+@dataclass
+class _CycleData:
+    device_status: List[DeviceRecord] = field(default_factory=list)
+
+
+@dataclass
+class _CycleResponse:
+    code: str = ""
+    message: str = ""
+    data: _CycleData = field(default_factory=_CycleData)
+
+
+class JSONCodec:
+    """Decode responses and encode JSON with the stdlib `json` module.
+
+    Subclasses replace `loads` and `dumps` with faster implementations.
+    """
+
+    name = "json"
+
+    def loads(self, data: bytes) -> Any:
+        """Decode a JSON document.
+
+        Arguments:
+            data: The encoded document.
+
+        Returns:
+            The decoded document.
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as compact JSON.
+
+        Arguments:
+            obj: The object to encode.
+
+        Returns:
+            The encoded document.
+        """
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def decode_device_status(
+        self, data: bytes, path: Tuple[str, ...], typed: bool = True
+    ) -> Dict[str, Any]:
+        """Decode a response holding a list of device records.
+
+        Arguments:
+            data: The encoded response.
+            path: Members of the response leading to the list of device records.
+            typed: Decode the records into `DeviceRecord` if the codec supports it.
+
+        Returns:
+            The `code` and `message` of the response, and the records as `devices`.
+        """
+        body = self.loads(data)
+        if not isinstance(body, dict):
+            return {"code": None, "message": None, "devices": []}
+        devices = body
+        for member in path:
+            devices = devices.get(member) or {}
+        return {
+            "code": body.get("code"),
+            "message": body.get("message"),
+            "devices": devices or [],
+        }
+
+
+class OrjsonCodec(JSONCodec):
+    """Decode responses and encode JSON with orjson.
+
+    Raises:
+        ImportError: orjson is not installed.
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        """Initialize the `OrjsonCodec`."""
+        import orjson
+
+        self._orjson = orjson
+
+    def loads(self, data: bytes) -> Any:
+        """Decode a JSON document.
+
+        Arguments:
+            data: The encoded document.
+
+        Returns:
+            The decoded document.
+        """
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as compact JSON.
+
+        Arguments:
+            obj: The object to encode.
+
+        Returns:
+            The encoded document.
+        """
+        return bytes(self._orjson.dumps(obj))
+
+
+class MsgspecCodec(JSONCodec):
+    """Decode responses and encode JSON with msgspec.
+
+    Device records are decoded straight into `DeviceRecord` objects, without
+    building a dict per device first.
+
+    Raises:
+        ImportError: msgspec is not installed.
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        """Initialize the `MsgspecCodec`."""
+        import msgspec
+
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+        self._typed: Dict[Tuple[str, ...], Any] = {
+            ("data",): msgspec.json.Decoder(_DeviceStatusResponse),
+            ("data", "device_status"): msgspec.json.Decoder(_CycleResponse),
+        }
+
+    def loads(self, data: bytes) -> Any:
+        """Decode a JSON document.
+
+        Arguments:
+            data: The encoded document.
+
+        Returns:
+            The decoded document.
+        """
+        return self._decoder.decode(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object as compact JSON.
+
+        Arguments:
+            obj: The object to encode.
+
+        Returns:
+            The encoded document.
+        """
+        return bytes(self._encoder.encode(obj))
+
+    def decode_device_status(
+        self, data: bytes, path: Tuple[str, ...], typed: bool = True
+    ) -> Dict[str, Any]:
+        """Decode a response holding a list of device records.
+
+        Responses not matching the expected layout, e.g. errors, are decoded
+        without types.
+
+        Arguments:
+            data: The encoded response.
+            path: Members of the response leading to the list of device records.
+            typed: Decode the records into `DeviceRecord` objects.
+
+        Returns:
+            The `code` and `message` of the response, and the records as `devices`.
+        """
+        decoder = self._typed.get(path) if typed else None
+        if decoder is None:
+            return super().decode_device_status(data, path, typed)
+        try:
+            response = decoder.decode(data)
+        except self._msgspec.ValidationError:
+            return super().decode_device_status(data, path, typed)
+        devices = response.data
+        if path == ("data", "device_status"):
+            devices = devices.device_status
+        return {"code": response.code, "message": response.message, "devices": devices}
+
+
+def default_codec() -> JSONCodec:
+    """Return the fastest codec available.
+
+    Returns:
+        A `MsgspecCodec` or `OrjsonCodec` if installed, else a `JSONCodec`.
+    """
+    for codec in (MsgspecCodec, OrjsonCodec):
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return JSONCodec()
@@ -0,0 +1,60 @@
+"""Helpers for running commands against many Yale Doorman devices at once."""
+import asyncio
+import logging
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from .device import Device
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandResult(NamedTuple):
+    """Outcome of a command sent to a single `Device`.
+
+    For configuration changes, `changed` holds the configuration indices
+    that differed from the cached configuration and were applied, so a
+    device failing halfway lists only the indices set before the failure.
+    """
+
+    device: Device
+    success: bool
+    error: Optional[BaseException] = None
+    changed: Tuple[str, ...] = ()
+
+
+async def run_bulk(
+    devices: Iterable[Device],
+    command: Callable[[Device], Awaitable[bool]],
+    concurrency: int,
+) -> Dict[str, CommandResult]:
+    """Run `command` for every device, at most `concurrency` at a time.
+
+    A device whose command raises does not stop the others; the error is
+    reported in its `CommandResult` instead.
+
+    Arguments:
+        devices: The Devices to run the command for.
+        command: Coroutine function sending the command to one `Device`.
+        concurrency: Maximum number of commands in flight.
+
+    Returns:
+        The `CommandResult` per `device_id`.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run(device: Device) -> CommandResult:
+        async with semaphore:
+            try:
+                return CommandResult(device, await command(device))
+            except Exception as err:
+                _LOGGER.debug("Command failed for %s", device.device_id, exc_info=True)
+                return CommandResult(device, False, err)
+
+    results = await asyncio.gather(*(_run(device) for device in devices))
+    return {result.device.device_id: result for result in results}
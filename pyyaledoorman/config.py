@@ -0,0 +1,92 @@
+"""Decoded Yale Doorman lock configuration."""
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+_HEX = tuple(f"{i:02X}" for i in range(256))
+_HEX_VALUES = frozenset(_HEX)
+
+
+class DeviceConfig:
+    """Lock configuration backed by a `bytearray`.
+
+    The `minigw_configuration_data` hex string from the API is decoded once.
+    Options are read and written in place by their 1-based index, and the
+    configuration is only encoded back to the wire format when asked for.
+
+    Arguments:
+        data: The `minigw_configuration_data` hex string.
+    """
+
+    __slots__ = ("_data", "_wire")
+
+    def __init__(self, data: str = "") -> None:
+        """Initialize the `DeviceConfig`."""
+        self._wire: str = data
+        try:
+            self._data = bytearray.fromhex(data[: len(data) & ~1])
+        except ValueError:
+            _LOGGER.debug("Couldnt decode lock configuration %s", data)
+            self._data = bytearray()
+
+    def __len__(self) -> int:
+        """Return the number of configuration options."""
+        return len(self._data)
+
+    def __getitem__(self, index: int) -> int:
+        """Return the raw value of the option at the 1-based `index`."""
+        if index < 1:
+            raise IndexError("Configuration indices start at 1")
+        return self._data[index - 1]
+
+    def __setitem__(self, index: int, value: int) -> None:
+        """Set the raw value of the option at the 1-based `index`."""
+        if index < 1:
+            raise IndexError("Configuration indices start at 1")
+        self._data[index - 1] = value
+        self._wire = ""
+
+    def get(self, idx: str) -> str:
+        """Return a configuration option in wire format.
+
+        Arguments:
+            idx: The configuration index, e.g. `CONFIG_IDX_VOLUME`.
+
+        Returns:
+            The option value as a two character hex string.
+        """
+        return _HEX[self[int(idx, 10)]]
+
+    def set(self, idx: str, value: str) -> None:
+        """Set a configuration option from its wire format.
+
+        Arguments:
+            idx: The configuration index, e.g. `CONFIG_IDX_AUTOLOCK`.
+            value: The option value as a two character hex string.
+        """
+        self[int(idx, 10)] = int(value, 16)
+
+    def validate(self, idx: str, value: str) -> None:
+        """Check that a configuration option can be set to `value`.
+
+        Indices start at `01`. While the configuration is unknown, i.e.
+        empty, any such index is accepted.
+
+        Arguments:
+            idx: The configuration index, e.g. `CONFIG_IDX_AUTOLOCK`.
+            value: The option value as a two character hex string.
+
+        Raises:
+            ValueError: The index is not one of the options, or the value is
+                not two hex digits.
+        """
+        if not idx.isdecimal() or not 1 <= int(idx, 10) <= (len(self) or 99):
+            raise ValueError(f"Invalid configuration index {idx!r}")
+        if value.upper() not in _HEX_VALUES:
+            raise ValueError(f"Invalid configuration value {value!r}")
+
+    def to_wire(self) -> str:
+        """Return the configuration as a `minigw_configuration_data` string."""
+        if not self._wire:
+            self._wire = self._data.hex().upper()
+        return self._wire
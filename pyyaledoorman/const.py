@@ -1,5 +1,5 @@
 """Constants used by pyyaledoorman."""
-from traitlets.utils.bunch import Bunch
+from enum import Enum
 
 BASE_URL = "https://mob.yalehomesystem.co.uk/yapi"
 INITIAL_TOKEN = (
@@ -12,11 +12,24 @@ INITIAL_TOKEN = (
 BITWISE_CLOSED = 16
 BITWISE_LOCKED = 1
 
-LOCK_STATES = Bunch(
-    locked="device_status.lock",
-    unlocked="device_status.unlock",
-    failed="failed",
-)
+
+class LockState(str, Enum):
+    """Lock states, usable both as `LOCK_STATES.locked` and `LOCK_STATES["locked"]`."""
+
+    locked = "device_status.lock"
+    unlocked = "device_status.unlock"
+    failed = "failed"
+
+    def __str__(self) -> str:
+        """Return the value, like the string constants these replaced."""
+        return str.__str__(self)
+
+    def __format__(self, format_spec: str) -> str:
+        """Format the value, like the string constants these replaced."""
+        return str.__format__(self, format_spec)
+
+
+LOCK_STATES = LockState
 
 
 AUTOLOCK_DISABLE = "00"
@@ -33,6 +46,10 @@ LANG_NO = "05"
 LANG_RU = "08"
 LANG_SE = "06"
 LANG_TR = "10"
+# Seconds before expiry at which the access token is renewed in the background
+TOKEN_RENEW_MARGIN = 1000
+# Seconds to wait after a failed background renewal before trying again
+TOKEN_RENEW_RETRY = 60
 STATUS_CODES = {"SUCCESS": "000", "ERROR": "997"}
 VOLUME_HIGH = "03"
 VOLUME_LOW = "02"
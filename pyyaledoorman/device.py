@@ -2,19 +2,29 @@
 from __future__ import annotations
 
 import logging
+from enum import IntFlag
+from sys import intern
+from typing import Any
 from typing import cast
 from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
 from typing import TYPE_CHECKING
+from typing import Union
 
+from .codec import DeviceRecord
+from .config import DeviceConfig
 from .const import AUTOLOCK_DISABLE
 from .const import AUTOLOCK_ENABLE
-from .const import BASE_URL
 from .const import CONFIG_IDX_AUTOLOCK
 from .const import CONFIG_IDX_LANG
 from .const import CONFIG_IDX_VOLUME
 from .const import STATUS_CODES
 from .const import YALE_LOCK_STATE_LOCKED
 from .const import YALE_LOCK_STATE_UNLOCKED
+from .events import Observed
+from .exceptions import ResponseError
 
 if TYPE_CHECKING:  # pragma: no cover
     from pyyaledoorman.client import Client
@@ -22,38 +32,184 @@ if TYPE_CHECKING:  # pragma: no cover
 _LOGGER = logging.getLogger(__name__)
 
 
-class Device:
-    """Used to instantiate a Yale Doorman device."""
+class Change(IntFlag):
+    """Fields of a `Device` changed by `Device.parse_config`."""
+
+    state = 1
+    lock_status = 2
+    config = 4
+    device_name = 8
+    area = 16
+    address = 32
+    type = 64
+    #: The fields state change events are derived from.
+    observed = state | lock_status | config
+    #: Every field, e.g. for newly discovered devices.
+    all = observed | device_name | area | address | type
+
+
+_UNCHANGED = Change(0)
+
+
+def observed(state: str, mingw_status: int, config: DeviceConfig) -> Observed:
+    """Return the values state change events are derived from.
+
+    Arguments:
+        state: The lock state.
+        mingw_status: The parsed `minigw_lock_status`.
+        config: The lock configuration.
+
+    Returns:
+        The state, whether the door is open and the configuration.
+    """
+    return state, mingw_status == 20, config.to_wire()
+
 
-    def __init__(self, client: "Client", device_config: Dict[str, str]) -> None:
+class Device:
+    """Used to instantiate a Yale Doorman device.
+
+    Only the fields used by the library are kept. The raw API payload is
+    retained only when the `Client` was created with `keep_raw_payload`.
+    """
+
+    __slots__ = (
+        "_client",
+        "_name",
+        "_id",
+        "_state",
+        "_type",
+        "_area",
+        "_address",
+        "_config",
+        "_mingw_status",
+        "_lock_status",
+        "_raw",
+    )
+
+    _name: str
+    _id: str
+    _address: str
+
+    def __init__(
+        self, client: "Client", device_config: Union[Dict[str, Any], DeviceRecord]
+    ) -> None:
         """Initialize a Yale Doorman `Device`.
 
         Maps API responses to `Device` attributes.
         """
-        self.parse_config(device_config)
         self._client = client
+        self._name = self._id = self._address = ""
+        self._state = self._type = self._area = self._lock_status = ""
+        self._config = DeviceConfig()
+        self._mingw_status = 0
+        self._raw: Optional[Dict[str, Any]] = None
+        self.parse_config(device_config)
+
+    def parse_config(  # noqa: C901
+        self, device_config: Union[Dict[str, Any], DeviceRecord]
+    ) -> Change:
+        """Parse API responses and sets `Device` configuration.
+
+        Every field is compared with the cached value first and only parsed
+        and stored if it changed, so refreshing an unchanged device allocates
+        nothing and keeps no references into the payload, unless the `Client`
+        keeps raw payloads.
+
+        Arguments:
+            device_config: A device record of the API.
+
+        Returns:
+            The changed fields, falsy if nothing changed.
+        """
+        if isinstance(device_config, dict):
+            if self._client.keep_raw_payload:
+                self._raw = device_config
+            name = device_config["name"]
+            device_id = device_config["device_id"]
+            state = device_config["status_open"][0]
+            device_type = device_config["type"]
+            area = device_config["area"]
+            address = device_config["address"]
+            config = device_config["minigw_configuration_data"]
+            lock_status = device_config["minigw_lock_status"]
+        else:
+            name = device_config.name
+            device_id = device_config.device_id
+            state = device_config.status_open[0]
+            device_type = device_config.type
+            area = device_config.area
+            address = device_config.address
+            config = device_config.minigw_configuration_data
+            lock_status = device_config.minigw_lock_status
+        changed = 0
+        if device_id != self._id:
+            self._id = device_id
+        if name != self._name:
+            self._name = name
+            changed |= Change.device_name
+        if address != self._address:
+            self._address = address
+            changed |= Change.address
+        # Shared by most devices of a fleet, so keep a single copy of each.
+        if state != self._state:
+            self._state = intern(state)
+            changed |= Change.state
+        if device_type != self._type:
+            self._type = intern(device_type)
+            changed |= Change.type
+        if area != self._area:
+            self._area = intern(area)
+            changed |= Change.area
+        if config != self._config.to_wire():
+            self._config = DeviceConfig(config)
+            changed |= Change.config
+        if lock_status != self._lock_status:
+            # The API may send `None`, which must not abort the refresh.
+            self._lock_status = (
+                intern(lock_status) if isinstance(lock_status, str) else lock_status
+            )
+            changed |= Change.lock_status
+            try:
+                self._mingw_status = int(lock_status, 10)
+            except Exception:
+                _LOGGER.debug("Couldnt parse mingw lock status", exc_info=True)
+        # Calling the enum is comparatively slow, skip it in the common case.
+        return Change(changed) if changed else _UNCHANGED
 
-    def parse_config(self, device_config: Dict[str, str]) -> None:
-        """Parse API responses and sets `Device` configuration."""
-        self._device_config = device_config
-        self._name = device_config["name"]
-        self._id = device_config["device_id"]
-        self._state = device_config["status_open"][0]
-        self._type = device_config["type"]
+    @property
+    def raw_payload(self) -> Optional[Dict[str, Any]]:
+        """Return the last API payload of the device.
 
-        self._area = device_config["area"]
-        self._address = device_config["address"]
-        self._config = device_config["minigw_configuration_data"]
+        Returns:
+            The payload, or `None` unless the `Client` keeps raw payloads.
+        """
+        return self._raw
 
-        try:
-            self._mingw_status = int(device_config["minigw_lock_status"], 10)
-        except Exception:  # pragma: no cover
-            _LOGGER.debug("Couldnt parse mingw lock status", exc_info=True)
+    def _observed(self) -> Observed:
+        """Return the values state change events are derived from."""
+        return observed(self._state, self._mingw_status, self._config)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the values of the fields that are watched for changes.
+
+        Returns:
+            The current `state`, `is_open`, `mingw_status` and
+            `configuration_data` of the device.
+        """
+        return {
+            "state": self._state,
+            "is_open": self.is_open,
+            "mingw_status": self._mingw_status,
+            "configuration_data": self._config.to_wire(),
+        }
 
     def _get_config_option(self, idx: str) -> str:
-        index = int(idx, 10)
-        parts = [self._config[i : i + 2] for i in range(0, len(self._config), 2)]
-        return parts[index - 1]
+        return self._config.get(idx)
+
+    @property
+    def configuration_data(self) -> str:
+        """Return the lock configuration as a `minigw_configuration_data` string."""
+        return self._config.to_wire()
 
     @property
     def volume_level(self) -> str:
@@ -82,8 +238,7 @@ class Device:
         Returns:
             bool: `True` if autolock is enabled, otherwise `False`
         """
-        state = self._get_config_option(CONFIG_IDX_AUTOLOCK)
-        if state == "FF":
+        if self._get_config_option(CONFIG_IDX_AUTOLOCK) == AUTOLOCK_ENABLE:
             return True
         return False
 
@@ -142,9 +297,14 @@ class Device:
     async def lock(self) -> bool:
         """Lock the lock and update the internal state to `YALE_LOCK_STATE_LOCKED`.
 
+        Concurrent calls for the same `Device` share a single request.
+
         Returns:
             bool: True if locking was successful, False otherwise.
         """
+        return await self._client._coalesce(("lock", self.device_id), self._lock)
+
+    async def _lock(self) -> bool:
         await self._client._validate_access_token()
         params = {
             "area": self.area,
@@ -153,41 +313,47 @@ class Device:
             "zone": 1,
             "request_value": "1",
         }
-        url = f"{BASE_URL}/api/panel/device_control/"
-        async with self._client.session.post(
-            url, data=params, headers=self._client.headers, raise_for_status=True
-        ) as resp:
-            data: Dict[str, str] = await resp.json()
-            if data.get("code") == STATUS_CODES["SUCCESS"]:
-                self._state = YALE_LOCK_STATE_LOCKED
-                return True
-            else:
-                _LOGGER.debug("Couldnt lock the door. Unspecified error.")
-            return False
+        _, data = await self._client._request(
+            "POST", "/api/panel/device_control/", data=params, raise_for_status=True
+        )
+        if data.get("code") == STATUS_CODES["SUCCESS"]:
+            before = self._observed()
+            self._state = YALE_LOCK_STATE_LOCKED
+            self._client._command_completed(self, "lock", before)
+            return True
+        else:
+            _LOGGER.debug("Couldnt lock the door. Unspecified error.")
+        return False
 
     async def unlock(self, pincode: str) -> bool:
         """Unlocks the lock. Takes `pincode` as a required parameter to unlock.
 
+        Concurrent calls with the same `pincode` share a single request.
+
         Arguments:
             pincode: a valid Yale Doorman pincode
 
         Returns:
              bool: True if unlock successful, False otherwise.
         """
+        return await self._client._coalesce(
+            ("unlock", self.device_id, pincode), lambda: self._unlock(pincode)
+        )
+
+    async def _unlock(self, pincode: str) -> bool:
         await self._client._validate_access_token()
-        url = f"{BASE_URL}/api/minigw/unlock/"
         params = {"area": self.area, "zone": 1, "pincode": pincode}
-
-        async with self._client.session.post(
-            url, data=params, headers=self._client.headers, raise_for_status=True
-        ) as resp:
-            data: Dict[str, str] = await resp.json()
-            if data.get("code") == STATUS_CODES["SUCCESS"]:
-                self._state = YALE_LOCK_STATE_UNLOCKED
-                return True
-            else:
-                _LOGGER.debug("Couldnt unlock the door. Unspecified error.")
-            return False
+        _, data = await self._client._request(
+            "POST", "/api/minigw/unlock/", data=params, raise_for_status=True
+        )
+        if data.get("code") == STATUS_CODES["SUCCESS"]:
+            before = self._observed()
+            self._state = YALE_LOCK_STATE_UNLOCKED
+            self._client._command_completed(self, "unlock", before)
+            return True
+        else:
+            _LOGGER.debug("Couldnt unlock the door. Unspecified error.")
+        return False
 
     async def enable_autolock(self) -> bool:
         """Enable autolocking of the lock.
@@ -195,10 +361,7 @@ class Device:
         Return:
             bool: `True` if successful, `False` otherwise.
         """
-        if await self.set_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_ENABLE):
-            self._update_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_ENABLE)
-            return True
-        return False  # pragma: no cover
+        return await self.set_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_ENABLE)
 
     async def disable_autolock(self) -> bool:
         """Disable autolocking of the lock.
@@ -206,22 +369,20 @@ class Device:
         Return:
             bool: `True` if successful, `False` otherwise.
         """
-        if await self.set_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_DISABLE):
-            self._update_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_DISABLE)
-            return True
-        return False  # pragma: no cover
+        return await self.set_deviceconfig(CONFIG_IDX_AUTOLOCK, AUTOLOCK_DISABLE)
 
     def _update_deviceconfig(self, index: str, value: str) -> None:
-        """Fetch the device configuration.
+        """Update the cached device configuration in place.
+
+        Options outside the cached configuration, e.g. while it is unknown, are
+        left to the next refresh.
 
         Arguments:
             index: The index of the configuration string to update.
             value: Value to write to the configuration string. Usually a `short`.
         """
-        idx = int(index, 10)
-        parts = [self._config[i : i + 2] for i in range(0, len(self._config), 2)]
-        parts[idx - 1] = value
-        self._config = "".join(parts)
+        if int(index, 10) <= len(self._config):
+            self._config.set(index, value)
 
     async def get_deviceconfig(self) -> Dict[str, str]:
         """Fetch the device configuration.
@@ -229,45 +390,110 @@ class Device:
         Returns:
             The raw API response.
         """
-        url = f"{BASE_URL}/api/minigw/lock/config/"
-        async with self._client.session.get(
-            url, headers=self._client.headers, raise_for_status=True
-        ) as resp:
-            return cast(Dict[str, str], await resp.json())
+        _, data = await self._client._request(
+            "GET", "/api/minigw/lock/config/", raise_for_status=True
+        )
+        return cast(Dict[str, str], data)
 
     async def set_deviceconfig(self, config_idx: str, value: str) -> bool:
         """Set device configuration.
 
+        On success the cached configuration is updated as well.
+
         Arguments:
             config_idx: index of the confiuration option to change.
             value: new value to write.
 
         Returns:
             bool: True if the device config was updated successfully, False otherwise.
+
+        Raises:
+            ValueError: The index or value is invalid, nothing was sent.
+
+        # noqa: DAR402 ValueError
         """
-        url = f"{BASE_URL}/api/minigw/lock/config/"
+        self._config.validate(config_idx, value)
         params = {"area": self.area, "zone": 1, "idx": config_idx, "val": value}
-        async with self._client.session.post(
-            url, data=params, headers=self._client.headers, raise_for_status=True
-        ) as resp:
-            data = await resp.json()
-            if data.get("code") == STATUS_CODES["SUCCESS"]:
-                return True
-            return False  # pragma: no cover
+        _, data = await self._client._request(
+            "POST", "/api/minigw/lock/config/", data=params, raise_for_status=True
+        )
+        if data.get("code") == STATUS_CODES["SUCCESS"]:
+            before = self._observed()
+            self._update_deviceconfig(config_idx, value)
+            self._client._command_completed(self, "config", before)
+            return True
+        return False  # pragma: no cover
+
+    def config_diff(self, settings: Mapping[str, str]) -> Dict[str, str]:
+        """Return the settings that differ from the cached configuration.
+
+        Arguments:
+            settings: Desired values by configuration index, e.g.
+                ``{CONFIG_IDX_VOLUME: VOLUME_LOW}``.
+
+        Returns:
+            The differing settings, with values in upper case hex.
+
+        Raises:
+            ValueError: An index or value is invalid.
+
+        # noqa: DAR402 ValueError
+        """
+        diff = {}
+        for idx, value in settings.items():
+            self._config.validate(idx, value)
+            value = value.upper()
+            try:
+                current = self._config.get(idx)
+            except IndexError:
+                current = None
+            if current != value:
+                diff[idx] = value
+        return diff
+
+    async def apply_config(self, settings: Mapping[str, str]) -> bool:
+        """Apply the desired configuration to the device.
+
+        Only the settings differing from the cached configuration are sent,
+        one request per configuration index.
+
+        Arguments:
+            settings: Desired values by configuration index, e.g.
+                ``{CONFIG_IDX_AUTOLOCK: AUTOLOCK_ENABLE}``.
+
+        Returns:
+            bool: True if the device has the desired configuration.
+
+        Raises:
+            ValueError: An index or value is invalid, nothing was sent.
+
+        # noqa: DAR402 ValueError
+        """
+        return await self._apply_config_diff(self.config_diff(settings), [])
+
+    async def _apply_config_diff(
+        self, diff: Mapping[str, str], changed: List[str]
+    ) -> bool:
+        """Send the settings of a `config_diff`, appending the applied indices."""
+        if diff:
+            await self._client._validate_access_token()
+        for idx, value in diff.items():
+            if not await self.set_deviceconfig(idx, value):
+                return False
+            changed.append(idx)
+        return True
 
     async def update_state(self) -> None:
-        """Update the `Device` status from the API."""
+        """Update the `Device` status from the API.
+
+        The cycle response holds the status of every device on the panel, so
+        all Devices known to the `Client` are refreshed along with this one.
+
+        Raises:
+            ResponseError: The API answered with an error.
+        """
         await self._client._validate_access_token()
-        url = f"{BASE_URL}/api/panel/cycle/"
-        async with self._client.session.get(
-            url, headers=self._client.headers, raise_for_status=False
-        ) as resp:
-            data = await resp.json()
-            if data.get("code") == STATUS_CODES["SUCCESS"]:
-                devices = data.get("data", {}).get("device_status", [])
-                for device in devices:
-                    if device.get("device_id") == self.device_id:
-                        self.parse_config(device)
-
-            else:
-                raise Exception("Unknown error")
+        if not await self._client._fetch_device_status(
+            "/api/panel/cycle/", ("data", "device_status"), add_new=False
+        ):
+            raise ResponseError("Unknown error")
@@ -0,0 +1,262 @@
+"""Typed stream of device state changes."""
+import asyncio
+import time
+import weakref
+from collections import deque
+from enum import Enum
+from typing import Any
+from typing import Deque
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from .const import YALE_LOCK_STATE_LOCKED
+from .const import YALE_LOCK_STATE_UNLOCKED
+
+#: The state, door state and configuration of a `Device` events are derived from.
+Observed = Tuple[str, bool, str]
+
+
+class EventType(str, Enum):
+    """Kinds of device state changes."""
+
+    locked = "locked"
+    unlocked = "unlocked"
+    state_changed = "state_changed"
+    door_opened = "door_opened"
+    door_closed = "door_closed"
+    config_changed = "config_changed"
+
+
+class EventSource(str, Enum):
+    """What revealed a state change."""
+
+    refresh = "refresh"
+    command = "command"
+
+
+class Event(NamedTuple):
+    """A state change of a device.
+
+    Arguments:
+        type: The kind of change.
+        device_id: ID of the device that changed.
+        timestamp: When the change was seen, as a UNIX timestamp.
+        source: Whether a refresh or a command revealed the change.
+        old: The previous value, e.g. the previous lock state.
+        new: The new value.
+    """
+
+    type: EventType
+    device_id: str
+    timestamp: float
+    source: EventSource
+    old: Any
+    new: Any
+
+
+class DropPolicy(str, Enum):
+    """What to do with a new event when a subscriber's queue is full."""
+
+    drop_oldest = "drop_oldest"
+    drop_newest = "drop_newest"
+
+
+def diff_events(
+    device_id: str, before: Observed, after: Observed, source: EventSource
+) -> List[Event]:
+    """Return the events for the change of a device from `before` to `after`.
+
+    Arguments:
+        device_id: ID of the device.
+        before: The observed values before the change.
+        after: The observed values after the change.
+        source: What revealed the change.
+
+    Returns:
+        The events, in order of lock state, door state and configuration.
+    """
+    if before == after:
+        return []
+    now = time.time()
+    events = []
+    (state, is_open, config), (new_state, new_is_open, new_config) = before, after
+    if state != new_state:
+        if new_state == YALE_LOCK_STATE_LOCKED:
+            kind = EventType.locked
+        elif new_state == YALE_LOCK_STATE_UNLOCKED:
+            kind = EventType.unlocked
+        else:
+            kind = EventType.state_changed
+        events.append(Event(kind, device_id, now, source, state, new_state))
+    if is_open != new_is_open:
+        kind = EventType.door_opened if new_is_open else EventType.door_closed
+        events.append(Event(kind, device_id, now, source, is_open, new_is_open))
+    if config != new_config:
+        events.append(
+            Event(EventType.config_changed, device_id, now, source, config, new_config)
+        )
+    return events
+
+
+class Subscription:
+    """A bounded queue of events, consumed with `async for`.
+
+    When the queue is full, new events are handled according to
+    `drop_policy` and counted in `dropped`, so a slow consumer cannot grow
+    memory without bounds. Iteration ends once the subscription is closed
+    and the queued events are consumed.
+
+    Arguments:
+        bus: The `EventBus` delivering the events.
+        maxsize: Maximum number of queued events.
+        drop_policy: Whether to drop the oldest queued or the new event.
+    """
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        maxsize: int = 100,
+        drop_policy: DropPolicy = DropPolicy.drop_oldest,
+    ) -> None:
+        """Initialize the `Subscription`."""
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.closed = False
+        self._bus = bus
+        self._queue: Deque[Event] = deque()
+        self._waiter: Optional["asyncio.Future[None]"] = None
+
+    def __len__(self) -> int:
+        """Return the number of queued events."""
+        return len(self._queue)
+
+    def put(self, event: Event) -> None:
+        """Queue an event, dropping one if the queue is full.
+
+        Arguments:
+            event: The event to queue.
+        """
+        if self.closed:
+            return
+        if len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            if self.drop_policy == DropPolicy.drop_newest:
+                return
+            self._queue.popleft()
+        self._queue.append(event)
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self) -> None:
+        """Stop receiving events."""
+        self.closed = True
+        self._bus._subscriptions.discard(self)
+        self._wake()
+
+    def __aiter__(self) -> "Subscription":
+        """Return the subscription itself as the async iterator."""
+        return self
+
+    async def __anext__(self) -> Event:
+        """Wait for the next event.
+
+        Returns:
+            The oldest queued event.
+
+        Raises:
+            StopAsyncIteration: The subscription is closed and drained.
+        """
+        while not self._queue:
+            if self.closed:
+                raise StopAsyncIteration
+            await self._wait(None)
+        return self._queue.popleft()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Wait up to `timeout` seconds for the next event.
+
+        Arguments:
+            timeout: Seconds to wait, `None` waits forever.
+
+        Returns:
+            The oldest queued event, or `None` if none arrived in time.
+
+        Raises:
+            StopAsyncIteration: The subscription is closed and drained.
+        """
+        if not self._queue and not self.closed:
+            await self._wait(timeout)
+        if self._queue:
+            return self._queue.popleft()
+        if self.closed:
+            raise StopAsyncIteration
+        return None
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        """Wait until an event is queued, the subscription is closed or timeout."""
+        loop = asyncio.get_running_loop()
+        self._waiter = loop.create_future()
+        timer = None if timeout is None else loop.call_later(timeout, self._wake)
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            if timer is not None:
+                timer.cancel()
+
+    async def __aenter__(self) -> "Subscription":
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Close the subscription when leaving the async context manager."""
+        self.close()
+
+
+class EventBus:
+    """Deliver events to every open `Subscription`.
+
+    Subscriptions are held weakly, so one that is no longer referenced stops
+    receiving events even if it was not closed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the `EventBus`."""
+        self._subscriptions: "weakref.WeakSet[Subscription]" = weakref.WeakSet()
+
+    @property
+    def active(self) -> bool:
+        """Return `True` if there are subscriptions to deliver events to."""
+        return bool(self._subscriptions)
+
+    def subscribe(
+        self, maxsize: int = 100, drop_policy: DropPolicy = DropPolicy.drop_oldest
+    ) -> Subscription:
+        """Return a new `Subscription` receiving all events from now on.
+
+        Arguments:
+            maxsize: Maximum number of queued events.
+            drop_policy: What to do with new events when the queue is full.
+
+        Returns:
+            The `Subscription`.
+        """
+        subscription = Subscription(self, maxsize, drop_policy)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def publish(self, events: List[Event]) -> None:
+        """Deliver events to every subscription.
+
+        Arguments:
+            events: The events to deliver.
+        """
+        for subscription in list(self._subscriptions):
+            for event in events:
+                subscription.put(event)
@@ -0,0 +1,22 @@
+"""Exceptions raised by pyyaledoorman."""
+from typing import Any
+
+
+class YaleError(Exception):
+    """Base class for pyyaledoorman errors."""
+
+
+class AuthenticationError(YaleError):
+    """Exception for authentication errors."""
+
+    def __init__(self, *args: Any) -> None:
+        """Initialize the Exception."""
+        Exception.__init__(self, *args)
+
+
+class ResponseError(YaleError):
+    """The Yale API answered with an error `code`."""
+
+
+class CircuitOpenError(YaleError):
+    """Requests to an endpoint are failing fast after repeated failures."""
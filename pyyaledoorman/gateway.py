@@ -0,0 +1,505 @@
+"""HTTP/JSON gateway serving the cached device states of a `Client`.
+
+One gateway polls the Yale API for an account and serves the device states
+to any number of local readers from memory, so they need no `Client` of
+their own. Responses carry an `ETag`; readers sending it back in
+`If-None-Match` get `304 Not Modified` until a device changes.
+
+Routes:
+
+* ``GET /devices``: the states of all devices.
+* ``GET /devices/{device_id}``: the state of one device.
+* ``POST /devices/{device_id}/lock``: lock a device.
+* ``POST /devices/{device_id}/unlock``: unlock a device, with a JSON body
+  like ``{"pincode": "123456"}``.
+* ``GET /events``: a stream of device changes as Server-Sent Events.
+* ``GET /events/ws``: the same stream over a WebSocket.
+
+Commands sent for the same device at the same time share one request to the
+Yale API.
+
+Streams start with a ``devices`` message holding the states of all devices,
+like ``GET /devices``, followed by one message per `Event`, named after its
+type, e.g. ``locked``. Each subscriber has a bounded queue; if it falls
+behind, the oldest events are dropped and it is sent a fresh ``devices``
+message instead. Subscribers that do not accept a message within
+`send_timeout` are disconnected.
+
+.. warning::
+
+   The gateway can unlock doors. Without an `auth_token` anyone who can
+   reach it can do so, so only serve it on a trusted interface, e.g. the
+   default ``127.0.0.1``. With an `auth_token`, every request must carry an
+   ``Authorization: Bearer <auth_token>`` header. Unlock attempts are limited
+   per device to `max_unlock_failures` failures within `unlock_lockout`
+   seconds.
+
+Usage as a standalone server, with the credentials in the `YALE_USERNAME`
+and `YALE_PASSWORD` environment variables and the optional bearer token in
+`YALE_GATEWAY_TOKEN`::
+
+    python -m pyyaledoorman.gateway --port 8080
+"""
+import argparse
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from aiohttp import ClientError
+from aiohttp import web
+
+from .client import Client
+from .device import Device
+from .events import DropPolicy
+from .events import Event
+from .events import Subscription
+from .exceptions import YaleError
+from .poller import Poller
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def device_state(device: Device) -> Dict[str, Any]:
+    """Return the state of a device as served by the gateway.
+
+    Arguments:
+        device: The `Device`.
+
+    Returns:
+        The JSON serializable state.
+    """
+    return {
+        "device_id": device.device_id,
+        "name": device.name,
+        "area": device.area,
+        "address": device.address,
+        "type": device.type,
+        "state": device.state,
+        "is_locked": device.is_locked,
+        "is_open": device.is_open,
+        "configuration_data": device.configuration_data,
+    }
+
+
+def sse_message(name: str, data: bytes) -> bytes:
+    """Return a Server-Sent Events message.
+
+    Arguments:
+        name: The event name, an empty name makes a keepalive comment.
+        data: The event data, JSON without line breaks.
+
+    Returns:
+        The encoded message.
+    """
+    if not name:
+        return b": keepalive\n\n"
+    return b"event: " + name.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class Gateway:
+    """Serve the device states of a `Client` over HTTP.
+
+    Encoded responses are cached and only rebuilt after a refresh changed or
+    discovered a device, or a command was sent. Each event is encoded once, however many
+    subscribers it is streamed to.
+
+    Arguments:
+        client: The `Client` of the account.
+        poller (optional): `Poller` refreshing the devices. Defaults to a
+            `Poller` with default intervals.
+        max_queue (optional): Maximum number of events queued per subscriber.
+        heartbeat (optional): Seconds between keepalives on idle streams.
+        send_timeout (optional): Seconds a subscriber may take to accept a
+            message before it is disconnected.
+        auth_token (optional): Bearer token every request must carry.
+        max_unlock_failures (optional): Failed unlocks of a device after
+            which further unlocks are refused for `unlock_lockout` seconds.
+        unlock_lockout (optional): Seconds failed unlocks are counted for.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        poller: Optional[Poller] = None,
+        max_queue: int = 100,
+        heartbeat: float = 15.0,
+        send_timeout: float = 10.0,
+        auth_token: Optional[str] = None,
+        max_unlock_failures: int = 5,
+        unlock_lockout: float = 300.0,
+    ) -> None:
+        """Initialize the `Gateway`."""
+        self.auth_token = auth_token
+        self.max_unlock_failures = max_unlock_failures
+        self.unlock_lockout = unlock_lockout
+        self._unlock_failures: Dict[str, List[float]] = {}
+        self.client = client
+        self.poller = poller if poller is not None else Poller(client)
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self.send_timeout = send_timeout
+        self._streams: Set[Subscription] = set()
+        self._encode_event = functools.lru_cache(maxsize=256)(
+            self._encode_event_uncached
+        )
+        self._all: Optional[Tuple[bytes, str]] = None
+        self._single: Dict[str, Tuple[bytes, str]] = {}
+        self._remove_refresh_listener: Optional[Callable[[], None]] = None
+        self._remove_command_listener: Optional[Callable[[], None]] = None
+
+    def _invalidate(self, *_: Any) -> None:
+        """Drop the cached responses."""
+        self._all = None
+        self._single.clear()
+
+    def _encode(self, document: Any) -> Tuple[bytes, str]:
+        body = self.client.codec.dumps(document)
+        return body, _etag(body)
+
+    @staticmethod
+    def _respond(request: web.Request, cached: Tuple[bytes, str]) -> web.Response:
+        """Return the cached response, or `304` if the reader has it already."""
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match.strip() == "*" or etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        ):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    def _device(self, request: web.Request) -> Device:
+        device = self.client.get_device(request.match_info["device_id"])
+        if device is None:
+            raise web.HTTPNotFound(
+                text='{"error": "Unknown device"}', content_type="application/json"
+            )
+        return device
+
+    async def list_devices(self, request: web.Request) -> web.Response:
+        """Serve the states of all devices.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response.
+        """
+        return self._respond(request, self._devices())
+
+    def _devices(self) -> Tuple[bytes, str]:
+        if self._all is None:
+            self._all = self._encode(
+                {"devices": [device_state(device) for device in self.client.devices]}
+            )
+        return self._all
+
+    async def get_device(self, request: web.Request) -> web.Response:
+        """Serve the state of one device.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response.
+        """
+        device = self._device(request)
+        cached = self._single.get(device.device_id)
+        if cached is None:
+            cached = self._single[device.device_id] = self._encode(device_state(device))
+        return self._respond(request, cached)
+
+    async def _command(
+        self, device: Device, command: Callable[[], Awaitable[bool]]
+    ) -> web.Response:
+        """Run a command and report its outcome."""
+        try:
+            success = await command()
+        except (ClientError, YaleError, asyncio.TimeoutError) as err:
+            _LOGGER.debug("Command for %s failed", device.device_id, exc_info=True)
+            return web.json_response(
+                {"success": False, "error": type(err).__name__}, status=502
+            )
+        return web.json_response(
+            {"success": success, "device": device_state(device)},
+            dumps=lambda obj: self.client.codec.dumps(obj).decode(),
+        )
+
+    async def lock(self, request: web.Request) -> web.Response:
+        """Lock a device.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response.
+        """
+        device = self._device(request)
+        return await self._command(device, device.lock)
+
+    async def unlock(self, request: web.Request) -> web.Response:
+        """Unlock a device with the pincode from the JSON request body.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response.
+
+        Raises:
+            HTTPBadRequest: The request has no pincode.
+        """
+        device = self._device(request)
+        try:
+            pincode = (await request.json())["pincode"]
+        except (ValueError, TypeError, KeyError):
+            raise web.HTTPBadRequest(
+                text='{"error": "Missing pincode"}', content_type="application/json"
+            ) from None
+        now = time.monotonic()
+        failures = self._unlock_failures.setdefault(device.device_id, [])
+        failures[:] = [ts for ts in failures if now - ts < self.unlock_lockout]
+        if len(failures) >= self.max_unlock_failures:
+            return web.json_response(
+                {"success": False, "error": "Too many failed unlocks"}, status=429
+            )
+        # Counted as a failure while in flight, so concurrent attempts cannot
+        # get past the limit.
+        failures.append(now)
+
+        async def unlock() -> bool:
+            try:
+                success = await device.unlock(str(pincode))
+            except BaseException:
+                # Only refusals count as failures, not errors reaching the API.
+                if now in failures:
+                    failures.remove(now)
+                raise
+            if success:
+                failures.clear()
+            return success
+
+        return await self._command(device, unlock)
+
+    @property
+    def subscribers(self) -> int:
+        """Return the number of open event streams."""
+        return len(self._streams)
+
+    def _encode_event_uncached(self, event: Event) -> bytes:
+        return self.client.codec.dumps(
+            {
+                "type": event.type.value,
+                "device_id": event.device_id,
+                "timestamp": event.timestamp,
+                "source": event.source.value,
+                "old": event.old,
+                "new": event.new,
+            }
+        )
+
+    async def stream(self, send: Callable[[str, bytes], Awaitable[None]]) -> None:
+        """Stream device changes to one subscriber until it disconnects.
+
+        Arguments:
+            send: Sends a message given its name and JSON data. An empty name
+                asks for a keepalive.
+        """
+        subscription = self.client.events(self.max_queue, DropPolicy.drop_oldest)
+        self._streams.add(subscription)
+        dropped = 0
+        try:
+            await asyncio.wait_for(
+                send("devices", self._devices()[0]), self.send_timeout
+            )
+            while True:
+                event = await subscription.get(self.heartbeat)
+                if subscription.dropped != dropped:
+                    # The subscriber missed events, resynchronize it.
+                    dropped = subscription.dropped
+                    message = send("devices", self._devices()[0])
+                    await asyncio.wait_for(message, self.send_timeout)
+                if event is None:
+                    message = send("", b"")
+                else:
+                    message = send(event.type.value, self._encode_event(event))
+                await asyncio.wait_for(message, self.send_timeout)
+        except StopAsyncIteration:
+            pass
+        except (asyncio.TimeoutError, ConnectionError):
+            _LOGGER.debug("Disconnecting event subscriber", exc_info=True)
+        finally:
+            subscription.close()
+            self._streams.discard(subscription)
+
+    async def sse(self, request: web.Request) -> web.StreamResponse:
+        """Stream device changes as Server-Sent Events.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The HTTP response.
+        """
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            }
+        )
+        await response.prepare(request)
+
+        async def send(name: str, data: bytes) -> None:
+            await response.write(sse_message(name, data))
+
+        await self.stream(send)
+        return response
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Stream device changes over a WebSocket.
+
+        Messages are JSON objects like ``{"event": "locked", "data": {...}}``.
+
+        Arguments:
+            request: The HTTP request.
+
+        Returns:
+            The WebSocket response.
+        """
+        ws = web.WebSocketResponse(heartbeat=self.heartbeat)
+        await ws.prepare(request)
+
+        async def stream() -> None:
+            await self.stream(functools.partial(_ws_send, ws))
+            await ws.close()
+
+        streaming = asyncio.ensure_future(stream())
+        try:
+            # Reading handles pings and notices when the peer goes away. After
+            # an error, e.g. an oversized message, the socket is closed and the
+            # loop ends.
+            async for _ in ws:
+                pass
+        finally:
+            streaming.cancel()
+            await ws.close()
+        return ws
+
+    async def start(self) -> None:
+        """Start polling and watching for commands."""
+        if self._remove_refresh_listener is None:
+            self._remove_refresh_listener = self.client.add_refresh_listener(
+                self._invalidate
+            )
+            self._remove_command_listener = self.client.add_command_listener(
+                self._invalidate
+            )
+        self.poller.start()
+
+    async def stop(self) -> None:
+        """Stop polling and end the event streams."""
+        for subscription in list(self._streams):
+            subscription.close()
+        if (
+            self._remove_refresh_listener is not None
+            and self._remove_command_listener is not None
+        ):
+            self._remove_refresh_listener()
+            self._remove_command_listener()
+            self._remove_refresh_listener = self._remove_command_listener = None
+        await self.poller.stop()
+
+    async def _run_with_app(self, app: web.Application) -> AsyncIterator[None]:
+        await self.start()
+        yield
+        await self.stop()
+
+    @web.middleware
+    async def _authenticate(
+        self,
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        """Refuse requests without the bearer token, if one is configured."""
+        if self.auth_token is not None:
+            expected = f"Bearer {self.auth_token}".encode()
+            given = request.headers.get("Authorization", "").encode()
+            if not hmac.compare_digest(given, expected):
+                return web.json_response(
+                    {"error": "Unauthorized"},
+                    status=401,
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+        return await handler(request)
+
+    def make_app(self) -> web.Application:
+        """Return the aiohttp application, which starts and stops the gateway.
+
+        Returns:
+            The application.
+        """
+        app = web.Application(middlewares=[self._authenticate])
+        app.router.add_get("/devices", self.list_devices)
+        app.router.add_get("/devices/{device_id}", self.get_device)
+        app.router.add_post("/devices/{device_id}/lock", self.lock)
+        app.router.add_post("/devices/{device_id}/unlock", self.unlock)
+        app.router.add_get("/events", self.sse)
+        app.router.add_get("/events/ws", self.websocket)
+        app.cleanup_ctx.append(self._run_with_app)
+        return app
+
+
+async def _ws_send(ws: web.WebSocketResponse, name: str, data: bytes) -> None:
+    if name:
+        await ws.send_str('{"event": "%s", "data": %s}' % (name, data.decode()))
+
+
+def main() -> None:
+    """Run a gateway until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds")
+    args = parser.parse_args()
+    client = Client(os.environ["YALE_USERNAME"], os.environ["YALE_PASSWORD"])
+    auth_token = os.environ.get("YALE_GATEWAY_TOKEN") or None
+    if auth_token is None and args.host not in ("127.0.0.1", "localhost", "::1"):
+        _LOGGER.warning(
+            "Serving on %s without YALE_GATEWAY_TOKEN lets anyone who can "
+            "reach it unlock the doors",
+            args.host,
+        )
+    gateway = Gateway(
+        client, Poller(client, interval=args.interval), auth_token=auth_token
+    )
+    app = gateway.make_app()
+
+    async def close_client(app: web.Application) -> AsyncIterator[None]:
+        yield
+        await client.close()
+
+    # Registered first so the client is closed after the gateway stopped.
+    app.cleanup_ctx.insert(0, close_client)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,197 @@
+"""Request instrumentation for the Yale API Client."""
+import json
+import logging
+from collections import Counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestRecord(NamedTuple):
+    """A finished request to the Yale API.
+
+    `status` is `0` and `error` is set when no response was received.
+    """
+
+    method: str
+    endpoint: str
+    status: int
+    code: Optional[str]
+    duration: float
+    error: Optional[str] = None
+
+
+class Histogram:
+    """Cumulative latency histogram, in seconds.
+
+    Arguments:
+        buckets: Upper bounds of the buckets, in ascending order.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Initialize the `Histogram`."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record an observation.
+
+        Arguments:
+            value: The observed duration, in seconds.
+        """
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class ClientStats:
+    """Request statistics of a `Client`.
+
+    Tracks per endpoint latency histograms, HTTP status codes, Yale `code`
+    values, transport errors, retries and requests delayed by the rate
+    limiter, as well as token refreshes per grant type. Listeners are called
+    with a `RequestRecord` for every request.
+
+    Arguments:
+        buckets: Upper bounds of the latency histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Initialize the `ClientStats`."""
+        self._buckets = tuple(buckets)
+        self._listeners: List[Callable[[RequestRecord], None]] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all statistics."""
+        self.latency: Dict[str, Histogram] = {}
+        self.statuses: "Counter[Tuple[str, int]]" = Counter()
+        self.codes: "Counter[Tuple[str, str]]" = Counter()
+        self.errors: "Counter[Tuple[str, str]]" = Counter()
+        self.retries: "Counter[str]" = Counter()
+        self.throttled: "Counter[str]" = Counter()
+        self.token_refreshes: "Counter[str]" = Counter()
+
+    def add_listener(
+        self, listener: Callable[[RequestRecord], None]
+    ) -> Callable[[], None]:
+        """Register a callback run after every request.
+
+        Arguments:
+            listener: Called with the `RequestRecord` of each request.
+
+        Returns:
+            A function that removes the listener again.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def record_request(self, record: RequestRecord) -> None:
+        """Record a finished request.
+
+        Arguments:
+            record: The finished request.
+        """
+        histogram = self.latency.get(record.endpoint)
+        if histogram is None:
+            histogram = self.latency[record.endpoint] = Histogram(self._buckets)
+        histogram.observe(record.duration)
+        if record.status:
+            self.statuses[(record.endpoint, record.status)] += 1
+        if record.code is not None:
+            self.codes[(record.endpoint, record.code)] += 1
+        if record.error is not None:
+            self.errors[(record.endpoint, record.error)] += 1
+        for listener in list(self._listeners):
+            try:
+                listener(record)
+            except Exception:
+                _LOGGER.exception("Error in request listener %s", listener)
+
+    def record_retry(self, endpoint: str) -> None:
+        """Record a retried request.
+
+        Arguments:
+            endpoint: The endpoint that was retried.
+        """
+        self.retries[endpoint] += 1
+
+    def record_throttle(self, endpoint: str) -> None:
+        """Record a request delayed by the rate limiter.
+
+        Arguments:
+            endpoint: The endpoint of the delayed request.
+        """
+        self.throttled[endpoint] += 1
+
+    def record_token_refresh(self, grant_type: str) -> None:
+        """Record a successful token request.
+
+        Arguments:
+            grant_type: The OAuth grant used, `password` or `refresh_token`.
+        """
+        self.token_refreshes[grant_type] += 1
+
+    def to_prometheus(self, prefix: str = "pyyaledoorman") -> str:
+        """Return the statistics in the Prometheus text exposition format.
+
+        Arguments:
+            prefix: Prefix of the metric names.
+
+        Returns:
+            The metrics, one sample per line.
+        """
+        duration = f"{prefix}_request_duration_seconds"
+        lines = [f"# TYPE {duration} histogram"]
+        for endpoint, histogram in sorted(self.latency.items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(
+                    _sample(f"{duration}_bucket", count, endpoint=endpoint, le=bound)
+                )
+            lines.append(
+                _sample(
+                    f"{duration}_bucket", histogram.count, endpoint=endpoint, le="+Inf"
+                )
+            )
+            lines.append(_sample(f"{duration}_sum", histogram.total, endpoint=endpoint))
+            lines.append(
+                _sample(f"{duration}_count", histogram.count, endpoint=endpoint)
+            )
+        counters: List[Tuple[str, Tuple[str, ...], Mapping[Any, int]]] = [
+            ("responses_total", ("endpoint", "status"), self.statuses),
+            ("codes_total", ("endpoint", "code"), self.codes),
+            ("errors_total", ("endpoint", "error"), self.errors),
+            ("retries_total", ("endpoint",), self.retries),
+            ("throttled_total", ("endpoint",), self.throttled),
+            ("token_refreshes_total", ("grant_type",), self.token_refreshes),
+        ]
+        for name, label_names, counter in counters:
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for key, count in sorted(counter.items()):
+                values = key if isinstance(key, tuple) else (key,)
+                lines.append(
+                    _sample(f"{prefix}_{name}", count, **dict(zip(label_names, values)))
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _sample(name: str, value: float, **labels: Any) -> str:
+    """Format a Prometheus sample, escaping the label values."""
+    label_str = ",".join(f"{key}={json.dumps(str(val))}" for key, val in labels.items())
+    return f"{name}{{{label_str}}} {value}"
@@ -0,0 +1,226 @@
+"""Adaptive background poller notifying subscribers about device changes."""
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .client import Client
+from .device import Change
+from .device import Device
+
+_LOGGER = logging.getLogger(__name__)
+
+Changes = Dict[str, Tuple[Any, Any]]
+Callback = Callable[[Device, Changes], Union[None, Awaitable[None]]]
+
+
+class Poller:
+    """Poll a `Client` on an adaptive interval and report changed fields.
+
+    After a `lock` or `unlock` command the poller runs every `fast_interval`
+    seconds for `fast_period` seconds. Otherwise it starts at `interval` and
+    backs off by `backoff` after each poll without changes, up to
+    `max_interval`. A change resets the interval to `interval`.
+
+    Subscribers are only called for devices with changed fields. They get the
+    `Device` and a mapping of field name to `(old, new)` values; fields are
+    those of `Device.snapshot`. Newly discovered devices report `None` as the
+    old value of every field. Only devices a refresh or command changed are
+    compared against their previous snapshot, so polls without changes
+    build no snapshots at all.
+
+    Arguments:
+        client: The `Client` to poll.
+        interval: Seconds between polls while devices are changing.
+        fast_interval: Seconds between polls right after a command.
+        fast_period: Seconds after a command during which `fast_interval` is used.
+        max_interval: Upper bound of the backed off interval.
+        backoff: Factor the interval grows by after a poll without changes.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        interval: float = 30.0,
+        fast_interval: float = 2.0,
+        fast_period: float = 30.0,
+        max_interval: float = 300.0,
+        backoff: float = 1.5,
+    ) -> None:
+        """Initialize the `Poller`."""
+        self.client = client
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.fast_period = fast_period
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._current_interval = interval
+        self._subscribers: List[Callback] = []
+        self._snapshots: Dict[str, Dict[str, Any]] = {
+            device.device_id: device.snapshot() for device in client.devices
+        }
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._changed: Dict[str, Device] = {}
+        self._remove_listeners: Optional[Callable[[], None]] = None
+
+    @property
+    def current_interval(self) -> float:
+        """Return the interval until the next poll."""
+        return self._current_interval
+
+    def subscribe(self, callback: Callback) -> Callable[[], None]:
+        """Subscribe to device changes.
+
+        Arguments:
+            callback: Function or coroutine function called with the `Device`
+                and its changed fields.
+
+        Returns:
+            A function that removes the subscription again.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _watch(self) -> None:
+        """Start recording which devices change, diffing all of them once."""
+        if self._remove_listeners is None:
+            remove_refresh = self.client.add_refresh_listener(self._on_refresh)
+            remove_command = self.client.add_command_listener(self._on_command)
+
+            def remove() -> None:
+                remove_refresh()
+                remove_command()
+
+            self._remove_listeners = remove
+            # Changes made while not watching went unrecorded.
+            self._changed.update(
+                (device.device_id, device) for device in self.client.devices
+            )
+
+    def _diff(self) -> List[Tuple[Device, Changes]]:
+        """Compare the changed devices against their previous snapshots."""
+        changes: List[Tuple[Device, Changes]] = []
+        changed_devices, self._changed = self._changed, {}
+        for device_id, device in changed_devices.items():
+            new = device.snapshot()
+            old = self._snapshots.get(device_id, {})
+            changed = {
+                field: (old.get(field), value)
+                for field, value in new.items()
+                if old.get(field) != value or field not in old
+            }
+            if changed:
+                changes.append((device, changed))
+            self._snapshots[device_id] = new
+        return changes
+
+    async def _notify(self, device: Device, changed: Changes) -> None:
+        for callback in list(self._subscribers):
+            try:
+                result = callback(device, changed)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                _LOGGER.exception("Error in poller subscriber %s", callback)
+
+    async def poll(self) -> Dict[str, Changes]:
+        """Refresh the devices once and notify subscribers about changes.
+
+        Returns:
+            The changed fields per `device_id`.
+        """
+        self._watch()
+        await self.client.update_devices()
+        changes = self._diff()
+        for device, changed in changes:
+            await self._notify(device, changed)
+        return {device.device_id: changed for device, changed in changes}
+
+    def _next_interval(self, changed: bool) -> float:
+        """Return the delay until the next poll and update the backoff."""
+        if time.monotonic() - self.client.last_command_ts < self.fast_period:
+            self._current_interval = self.interval
+            return self.fast_interval
+        if changed:
+            self._current_interval = self.interval
+        else:
+            self._current_interval = min(
+                self._current_interval * self.backoff, self.max_interval
+            )
+        return self._current_interval
+
+    async def _wait(self, delay: float) -> bool:
+        """Sleep for `delay` seconds, or until a command wakes the poller.
+
+        Arguments:
+            delay: Seconds to sleep.
+
+        Returns:
+            bool: True if a command woke the poller early.
+        """
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        # Not `asyncio.wait_for`, which may swallow a cancellation arriving
+        # together with the wakeup and keep the poller running.
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            done, _ = await asyncio.wait((waiter,), timeout=delay)
+        finally:
+            waiter.cancel()
+            self._wakeup.clear()
+        return bool(done)
+
+    def _on_refresh(self, device: Device, changed: Change) -> None:
+        """Record a device whose snapshot fields a refresh changed."""
+        if changed & Change.observed:
+            self._changed[device.device_id] = device
+
+    def _on_command(self, device: Device, command: str) -> None:
+        """Record the device and wake the poller up after a command."""
+        self._changed[device.device_id] = device
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """Poll until cancelled."""
+        while True:
+            try:
+                changed = bool(await self.poll())
+            except Exception:
+                _LOGGER.debug("Polling Yale devices failed", exc_info=True)
+                changed = False
+            if await self._wait(self._next_interval(changed)):
+                await asyncio.sleep(self.fast_interval)
+
+    def start(self) -> "asyncio.Task[None]":
+        """Start polling in a background task.
+
+        Returns:
+            The polling task.
+        """
+        if self._task is None or self._task.done():
+            self._watch()
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stop the background polling task."""
+        if self._remove_listeners is not None:
+            self._remove_listeners()
+            self._remove_listeners = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,162 @@
+"""Pool of Yale API Clients sharing a single aiohttp connector."""
+import asyncio
+import logging
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from aiohttp import ClientSession
+
+from .client import Client
+from .const import INITIAL_TOKEN
+from .device import Device
+from .session import SessionOwner
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ClientPool(SessionOwner):
+    """Host many Yale accounts over one tuned connection pool.
+
+    All accounts share one `ClientSession`, and therefore one keep-alive
+    connection pool towards the Yale API, instead of one per `Client`.
+
+    Arguments:
+        concurrency: Maximum number of accounts refreshed at the same time.
+        limit: Maximum number of simultaneous connections.
+        limit_per_host: Maximum number of simultaneous connections to the Yale API.
+        keepalive_timeout: Seconds an idle connection is kept open.
+        ttl_dns_cache: Seconds DNS lookups are cached.
+        session (optional): aiohttp ClientSession to share instead of creating one.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+        session: Optional[ClientSession] = None,
+    ) -> None:
+        """Initialize the Yale Doorman ClientPool."""
+        self.concurrency = concurrency
+        self._init_session(
+            session, limit, limit_per_host, keepalive_timeout, ttl_dns_cache
+        )
+        self._clients: Dict[str, Client] = {}
+
+    @property
+    def clients(self) -> List[Client]:
+        """Return the Clients in the pool."""
+        return list(self._clients.values())
+
+    @property
+    def devices(self) -> List[Device]:
+        """Return the Devices of every account in the pool."""
+        return [
+            device for client in self._clients.values() for device in client.devices
+        ]
+
+    def get_client(self, username: str) -> Optional[Client]:
+        """Return the `Client` of an account, if it is in the pool.
+
+        Arguments:
+            username: Username of the account.
+
+        Returns:
+            The matching `Client`, or `None`.
+        """
+        return self._clients.get(username)
+
+    def get_device(self, device_id: str) -> Optional[Device]:
+        """Return the `Device` with the given `device_id` from any account.
+
+        Arguments:
+            device_id: The ID of the device to look up.
+
+        Returns:
+            The matching `Device`, or `None`.
+        """
+        for client in self._clients.values():
+            device = client.get_device(device_id)
+            if device is not None:
+                return device
+        return None
+
+    def add_account(
+        self,
+        username: str,
+        password: str,
+        initial_token: str = INITIAL_TOKEN,
+        **kwargs: Any,
+    ) -> Client:
+        """Add an account to the pool.
+
+        Arguments:
+            username: Username for logging in to the Yale API.
+            password: Password for logging in to the Yale API.
+            initial_token: Initial token for logging in to the Yale API.
+            kwargs: Further arguments for the `Client`, e.g. `token_store`.
+
+        Returns:
+            The `Client` for the account.
+        """
+        client = Client(
+            username, password, initial_token, session=self.session, **kwargs
+        )
+        self._clients[username] = client
+        return client
+
+    def remove_account(self, username: str) -> None:
+        """Remove an account from the pool.
+
+        Arguments:
+            username: Username of the account to remove.
+        """
+        self._clients.pop(username, None)
+
+    async def _refresh(self, client: Client, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            if client.token is None:
+                await client.login()
+            await client.update_devices()
+
+    async def update_devices(self) -> Dict[str, Optional[BaseException]]:
+        """Update the devices of every account concurrently.
+
+        At most `concurrency` accounts are refreshed at the same time. A
+        failing account does not stop the others from being refreshed.
+
+        Returns:
+            The error raised per username, or `None` if the refresh succeeded.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        clients = list(self._clients.values())
+        results = await asyncio.gather(
+            *(self._refresh(client, semaphore) for client in clients),
+            return_exceptions=True,
+        )
+        errors: Dict[str, Optional[BaseException]] = {}
+        for client, result in zip(clients, results):
+            if isinstance(result, BaseException):
+                _LOGGER.debug(
+                    "Couldn't update devices for %s", client.username, exc_info=result
+                )
+                errors[client.username] = result
+            else:
+                errors[client.username] = None
+        return errors
+
+    async def close(self) -> None:
+        """Close the shared session if it is owned by the pool."""
+        await self._close_session()
+
+    async def __aenter__(self) -> "ClientPool":
+        """Enter the async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Close the pool when leaving the async context manager."""
+        await self.close()
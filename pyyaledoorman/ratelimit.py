@@ -0,0 +1,96 @@
+"""Token bucket rate limiting of the requests of an account."""
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+class Priority(IntEnum):
+    """Priority of a request; lower values are served first."""
+
+    interactive = 0
+    background = 1
+
+
+class RateLimiter:
+    """Token bucket scheduler for the requests of one account.
+
+    Requests take one token each. Tokens refill at `rate` per second up to
+    `burst`. Waiting requests are served by priority, then in arrival order.
+    Background requests also leave `reserve` tokens untouched, so
+    interactive requests such as `lock` and `unlock` rarely wait even while
+    polling uses up the budget.
+
+    Arguments:
+        rate: Tokens added per second, i.e. the sustained request rate.
+        burst: Maximum number of tokens, i.e. the largest burst of requests.
+        reserve: Tokens background requests leave for interactive ones.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 10, reserve: int = 2) -> None:
+        """Initialize the `RateLimiter`."""
+        self.rate = rate
+        self.burst = burst
+        self.reserve = min(reserve, burst - 1)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of requests waiting for a token."""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: Priority = Priority.background) -> float:
+        """Wait for a token.
+
+        Arguments:
+            priority: Priority of the request.
+
+        Returns:
+            The number of seconds waited, `0` if a token was available.
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self._dispatch()
+        if future.done():
+            return 0.0
+        start = time.monotonic()
+        await future
+        return time.monotonic() - start
+
+    def _needed(self, priority: int) -> float:
+        """Return the tokens that must be left before serving `priority`."""
+        return 1.0 + (self.reserve if priority != Priority.interactive else 0)
+
+    def _dispatch(self) -> None:
+        """Hand out the available tokens and schedule the next dispatch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # Cancelled while waiting.
+                heapq.heappop(self._waiters)
+                continue
+            if self._tokens < self._needed(priority):
+                delay = (self._needed(priority) - self._tokens) / self.rate
+                self._timer = asyncio.get_running_loop().call_later(
+                    delay, self._dispatch
+                )
+                return
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            future.set_result(None)
@@ -0,0 +1,143 @@
+"""Retry and circuit breaker policies for requests to the Yale API."""
+import random
+import time
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Collection
+from typing import Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a `Retry-After` header.
+
+    Arguments:
+        value: The header value, either seconds or an HTTP date.
+
+    Returns:
+        The number of seconds to wait, or `None` if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for idempotent requests.
+
+    Arguments:
+        attempts: Total number of attempts, `1` disables retries.
+        base_delay: Delay before the first retry, in seconds.
+        max_delay: Upper bound of any delay, including `Retry-After`.
+        jitter: Fraction of the delay that is randomized, between 0 and 1.
+        retry_statuses: HTTP statuses that are retried.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        jitter: float = 0.5,
+        retry_statuses: Collection[int] = (429, 500, 502, 503, 504),
+    ) -> None:
+        """Initialize the `RetryPolicy`."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Return the delay before the next attempt.
+
+        Arguments:
+            attempt: Number of attempts made so far, starting at 1.
+            retry_after: Delay requested by the server, if any.
+
+        Returns:
+            The delay in seconds.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        delay = min(self.base_delay * 2.0 ** (attempt - 1), self.max_delay)
+        return delay * (1 - self.jitter * random.random())  # noqa: S311
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures of an endpoint.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are refused for `reset_timeout` seconds. After that the circuit
+    is half-open: a single trial request is let through while the others
+    are still refused. Its success closes the circuit, while a failure opens
+    it for another `reset_timeout` seconds. A trial that never reports back
+    is given up after `reset_timeout` seconds and another one is allowed.
+
+    Arguments:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds the circuit stays open.
+    """
+
+    __slots__ = (
+        "failure_threshold",
+        "reset_timeout",
+        "failures",
+        "opened_at",
+        "trial_started",
+    )
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Initialize the `CircuitBreaker`."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return `True` while requests are refused."""
+        if self.opened_at is None:
+            return False
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return True
+        return (
+            self.trial_started is not None
+            and now - self.trial_started < self.reset_timeout
+        )
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent, claiming the trial if half-open.
+
+        Returns:
+            bool: False while the circuit is open or a trial is in flight.
+        """
+        if self.is_open:
+            return False
+        if self.opened_at is not None:
+            self.trial_started = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful request and close the circuit."""
+        self.failures = 0
+        self.opened_at = self.trial_started = None
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit at the threshold."""
+        self.failures += 1
+        self.trial_started = None
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
@@ -0,0 +1,61 @@
+"""Lazily created aiohttp session shared by `Client` and `ClientPool`."""
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from aiohttp import ClientSession
+from aiohttp import TCPConnector
+
+
+class SessionOwner:
+    """Base class holding an aiohttp `ClientSession` with a tuned connector.
+
+    A session passed in is used as is and never closed. Otherwise one is
+    created on first use, with a `TCPConnector` sized by the connector
+    settings, and closed again in `_close_session`.
+    """
+
+    _session: Optional[ClientSession]
+    _owns_session: bool
+    _connector_settings: Dict[str, Any]
+
+    def _init_session(
+        self,
+        session: Optional[ClientSession],
+        limit: int,
+        limit_per_host: int,
+        keepalive_timeout: float,
+        ttl_dns_cache: int,
+    ) -> None:
+        """Remember the session, or the settings to create one with.
+
+        Arguments:
+            session: aiohttp ClientSession to use instead of creating one.
+            limit: Maximum number of simultaneous connections.
+            limit_per_host: Maximum number of simultaneous connections per host.
+            keepalive_timeout: Seconds an idle connection is kept open.
+            ttl_dns_cache: Seconds DNS lookups are cached.
+        """
+        self._session = session
+        self._owns_session = session is None
+        self._connector_settings = {
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+            "ttl_dns_cache": ttl_dns_cache,
+        }
+
+    @property
+    def session(self) -> ClientSession:
+        """Return the aiohttp session, creating it on first use."""
+        if self._session is None:
+            self._session = ClientSession(
+                connector=TCPConnector(**self._connector_settings)
+            )
+        return self._session
+
+    async def _close_session(self) -> None:
+        """Close the session if it was created here."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
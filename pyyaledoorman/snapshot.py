@@ -0,0 +1,117 @@
+"""Serialization of the state of a `Client` for warm starts."""
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import TYPE_CHECKING
+from typing import Union
+
+from .codec import DeviceRecord
+from .codec import JSONCodec
+from .token_store import StoredToken
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .client import Client
+
+SNAPSHOT_VERSION = 1
+
+
+def dump_snapshot(client: "Client", codec: JSONCodec) -> bytes:
+    """Serialize the devices, tokens and timestamps of a `Client`.
+
+    Devices are stored as compact arrays, or as their raw API payload if the
+    client keeps those. Either way the current state is stored, including
+    changes made by commands since the last refresh.
+
+    Arguments:
+        client: The `Client` to serialize.
+        codec: Encodes the snapshot.
+
+    Returns:
+        The snapshot as JSON.
+    """
+    devices: List[Any] = []
+    for device in client.devices:
+        raw = device.raw_payload
+        if raw is not None:
+            devices.append(
+                dict(
+                    raw,
+                    name=device.name,
+                    type=device.type,
+                    area=device.area,
+                    address=device.address,
+                    status_open=[device.state],
+                    minigw_configuration_data=device.configuration_data,
+                    minigw_lock_status=device._lock_status,
+                )
+            )
+            continue
+        devices.append(
+            [
+                device.device_id,
+                device.name,
+                device.type,
+                device.area,
+                device.address,
+                device.state,
+                device.configuration_data,
+                device._lock_status,
+            ]
+        )
+    token = None
+    if client.token is not None:
+        token = StoredToken(
+            access_token=client.token,
+            refresh_token=client.refresh_token,
+            expires_in=client.token_expires_in,
+            login_ts=client.login_ts,
+        )._asdict()
+    return codec.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": time.time(),
+            "devices_updated_at": client.devices_updated_at,
+            "token": token,
+            "devices": devices,
+        }
+    )
+
+
+def load_snapshot(client: "Client", data: bytes, codec: JSONCodec) -> Dict[str, Any]:
+    """Restore the state serialized by `dump_snapshot` into a `Client`.
+
+    Known devices are updated and others are added. The access token is
+    restored if it is still valid.
+
+    Arguments:
+        client: The `Client` to restore into.
+        data: The snapshot.
+        codec: Decodes the snapshot.
+
+    Returns:
+        The decoded snapshot, without the devices.
+
+    Raises:
+        ValueError: The snapshot is not supported.
+    """
+    snapshot = codec.loads(data)
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version")
+    records: List[Union[Dict[str, Any], DeviceRecord]] = []
+    for entry in snapshot.pop("devices"):
+        if isinstance(entry, dict):
+            records.append(entry)
+            continue
+        device_id, name, kind, area, address, state, config, lock_status = entry
+        records.append(
+            DeviceRecord(
+                device_id, name, kind, area, address, [state], config, lock_status
+            )
+        )
+    client._apply_device_status(records)
+    if snapshot.get("devices_updated_at") is not None:
+        client.devices_updated_at = snapshot["devices_updated_at"]
+    if snapshot.get("token") is not None:
+        client._apply_stored_token(StoredToken(**snapshot["token"]))
+    return snapshot
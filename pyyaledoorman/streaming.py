@@ -0,0 +1,176 @@
+"""Incremental decoding of large Yale API responses."""
+import codecs
+import json
+import re
+from json import JSONDecodeError
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_AFTER = frozenset(" \t\n\r,:]}")
+
+_START, _KEY, _VALUE, _ITEM, _DONE = range(5)
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    match = _WHITESPACE.match(text, pos)
+    return match.end() if match else pos
+
+
+class JSONArrayStream:
+    """Decode the items of an array in a JSON object while it is received.
+
+    The response is fed in chunks as they arrive. Every complete item of the
+    array at `path` is returned as soon as it is decoded, so only the item
+    being received is buffered rather than the whole response. The other
+    members of the outermost object are collected in `fields`.
+
+    Items are decoded with the C scanner of the stdlib `json` module, which,
+    unlike the faster third-party decoders, can decode a value from the middle
+    of a buffer.
+
+    Arguments:
+        path: Members leading to the array, e.g. `("data", "device_status")`.
+    """
+
+    def __init__(self, path: Sequence[str] = ("data",)) -> None:
+        """Initialize the `JSONArrayStream`."""
+        self.path = tuple(path)
+        self.fields: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._pos = 0
+        self._state = _START
+        self._member = ""
+        self._depth = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Decode the next chunk of the response.
+
+        Arguments:
+            chunk: The received bytes.
+
+        Returns:
+            The array items completed by this chunk.
+        """
+        self._text = self._text[self._pos :] + self._utf8.decode(chunk)
+        self._pos = 0
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """Decode the rest of the response once it was received completely.
+
+        Returns:
+            The array items not returned by `feed` yet.
+
+        Raises:
+            JSONDecodeError: The response is not a complete JSON object.
+        """
+        self._text = self._text[self._pos :] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        items = self._parse(final=True)
+        if self._state != _DONE:
+            raise JSONDecodeError("Unterminated object", self._text, self._pos)
+        return items
+
+    def _decode(self, final: bool) -> Any:
+        """Decode the value at the current position.
+
+        A value may be cut off by the end of the buffer, e.g. `1` of `1.5`,
+        so it is only accepted once it is followed by a delimiter or the
+        whole response was received.
+
+        Arguments:
+            final: Whether the whole response was received.
+
+        Returns:
+            The value, or `self` if more data is needed.
+
+        Raises:
+            JSONDecodeError: The value is invalid and no more data will arrive.
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._text, self._pos)
+        except JSONDecodeError:
+            if final:
+                raise
+            return self
+        if not final and (end == len(self._text) or self._text[end] not in _AFTER):
+            return self
+        self._pos = end
+        return value
+
+    def _parse(self, final: bool) -> List[Any]:  # noqa: C901
+        """Advance through the buffer as far as possible.
+
+        Arguments:
+            final: Whether the whole response was received.
+
+        Returns:
+            The array items decoded.
+
+        Raises:
+            JSONDecodeError: The response is not a JSON object.
+        """
+        items: List[Any] = []
+        text = self._text
+        while True:
+            self._pos = _skip_whitespace(text, self._pos)
+            if self._pos == len(text) or self._state == _DONE:
+                return items
+            char = text[self._pos]
+            if self._state == _START:
+                if char != "{":
+                    raise JSONDecodeError("Expecting '{'", text, self._pos)
+                self._pos += 1
+                self._state = _KEY
+            elif self._state == _KEY:
+                if char in ",}":
+                    self._pos += 1
+                    if char == "}":
+                        if not self._depth:
+                            self._state = _DONE
+                        self._depth -= 1
+                    continue
+                start = self._pos
+                member = self._decode(final)
+                if member is self:
+                    return items
+                colon = _skip_whitespace(text, self._pos)
+                if colon == len(text):
+                    self._pos = start
+                    return items
+                if text[colon] != ":" or not isinstance(member, str):
+                    raise JSONDecodeError("Expecting ':'", text, colon)
+                self._pos = colon + 1
+                self._member = member
+                self._state = _VALUE
+            elif self._state == _VALUE:
+                if self._member == self.path[self._depth]:
+                    if char == "[" and self._depth == len(self.path) - 1:
+                        self._pos += 1
+                        self._state = _ITEM
+                        continue
+                    if char == "{" and self._depth < len(self.path) - 1:
+                        self._pos += 1
+                        self._depth += 1
+                        self._state = _KEY
+                        continue
+                value = self._decode(final)
+                if value is self:
+                    return items
+                if not self._depth:
+                    self.fields[self._member] = value
+                self._state = _KEY
+            elif char in ",]":
+                self._pos += 1
+                if char == "]":
+                    self._state = _KEY
+            else:
+                item = self._decode(final)
+                if item is self:
+                    return items
+                items.append(item)
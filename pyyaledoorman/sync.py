@@ -0,0 +1,350 @@
+"""Blocking facade over `Client` and `Device` for synchronous code."""
+import asyncio
+import threading
+from typing import Any
+from typing import Coroutine
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import TypeVar
+
+from .client import Client
+from .commands import CommandResult
+from .const import INITIAL_TOKEN
+from .device import Device
+
+T = TypeVar("T")
+
+
+class EventLoopThread:
+    """An event loop running forever in a daemon thread.
+
+    Coroutines can be submitted from any thread with `run`.
+    """
+
+    def __init__(self) -> None:
+        """Start the event loop thread."""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="pyyaledoorman", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine in the loop and wait for its result.
+
+        Arguments:
+            coro: The coroutine to run.
+            timeout: Seconds to wait for the result, `None` waits forever.
+
+        Returns:
+            The result of the coroutine.
+
+        Raises:
+            RuntimeError: Called from the loop thread, which would deadlock.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Can't block the pyyaledoorman event loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        finally:
+            # Stops the coroutine if waiting timed out or was interrupted.
+            future.cancel()
+
+    def stop(self) -> None:
+        """Stop the event loop and wait for the thread to finish."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_shared_thread: Optional[EventLoopThread] = None
+_shared_lock = threading.Lock()
+
+
+def shared_loop_thread() -> EventLoopThread:
+    """Return the loop thread shared by all `SyncClient` instances.
+
+    Returns:
+        The `EventLoopThread`, started on first use.
+    """
+    global _shared_thread
+    with _shared_lock:
+        if _shared_thread is None:
+            _shared_thread = EventLoopThread()
+        return _shared_thread
+
+
+class SyncDevice:
+    """Blocking wrapper around a `Device`.
+
+    Properties are read from the wrapped `Device` directly, commands run in
+    the event loop of the `SyncClient`.
+
+    Arguments:
+        client: The `SyncClient` the device belongs to.
+        device: The wrapped `Device`.
+    """
+
+    def __init__(self, client: "SyncClient", device: Device) -> None:
+        """Initialize the `SyncDevice`."""
+        self._sync = client
+        self.device = device
+
+    @property
+    def device_id(self) -> str:
+        """Return the device ID."""
+        return self.device.device_id
+
+    @property
+    def name(self) -> str:
+        """Return the device name."""
+        return self.device.name
+
+    @property
+    def area(self) -> str:
+        """Return the device area."""
+        return self.device.area
+
+    @property
+    def address(self) -> str:
+        """Return the device address."""
+        return self.device.address
+
+    @property
+    def type(self) -> str:
+        """Return the device type."""
+        return self.device.type
+
+    @property
+    def state(self) -> str:
+        """Return the device state."""
+        return self.device.state
+
+    @property
+    def is_locked(self) -> bool:
+        """Return `True` if the lock is locked."""
+        return self.device.is_locked
+
+    @property
+    def is_open(self) -> bool:
+        """Return `True` if the door is open."""
+        return self.device.is_open
+
+    @property
+    def autolock_enabled(self) -> bool:
+        """Return `True` if autolock is enabled."""
+        return self.device.autolock_enabled
+
+    @property
+    def volume_level(self) -> str:
+        """Return the volume level."""
+        return self.device.volume_level
+
+    @property
+    def language(self) -> str:
+        """Return the language."""
+        return self.device.language
+
+    def lock(self) -> bool:
+        """Lock the lock.
+
+        Returns:
+            bool: True if the lock was locked.
+        """
+        return self._sync._run(self.device.lock())
+
+    def unlock(self, pincode: str) -> bool:
+        """Unlock the lock.
+
+        Arguments:
+            pincode: The pincode of the lock.
+
+        Returns:
+            bool: True if the lock was unlocked.
+        """
+        return self._sync._run(self.device.unlock(pincode))
+
+    def update_state(self) -> None:
+        """Update the device status from the API."""
+        self._sync._run(self.device.update_state())
+
+    def enable_autolock(self) -> bool:
+        """Enable autolock.
+
+        Returns:
+            bool: True if the configuration was changed.
+        """
+        return self._sync._run(self.device.enable_autolock())
+
+    def disable_autolock(self) -> bool:
+        """Disable autolock.
+
+        Returns:
+            bool: True if the configuration was changed.
+        """
+        return self._sync._run(self.device.disable_autolock())
+
+    def get_deviceconfig(self) -> Dict[str, str]:
+        """Return the device configuration from the API.
+
+        Returns:
+            The decoded API response.
+        """
+        return self._sync._run(self.device.get_deviceconfig())
+
+    def set_deviceconfig(self, config_idx: str, value: str) -> bool:
+        """Set a configuration option of the device.
+
+        Arguments:
+            config_idx: Index of the option, e.g. `CONFIG_IDX_AUTOLOCK`.
+            value: The new value, as two hex digits.
+
+        Returns:
+            bool: True if the configuration was changed.
+        """
+        return self._sync._run(self.device.set_deviceconfig(config_idx, value))
+
+    def apply_config(self, settings: Mapping[str, str]) -> bool:
+        """Apply the desired configuration, sending only differing settings.
+
+        Arguments:
+            settings: Desired values by configuration index.
+
+        Returns:
+            bool: True if the device has the desired configuration.
+        """
+        return self._sync._run(self.device.apply_config(settings))
+
+
+class SyncClient:
+    """Blocking wrapper around `Client` for synchronous code.
+
+    All instances share one event loop running in a background thread, so
+    the HTTP session and the access token are reused between calls. Methods
+    may be called from any thread, but not from within callbacks running in
+    the event loop.
+
+    Arguments:
+        username: Username for logging in to the Yale API.
+        password: Password for logging in to the Yale API.
+        initial_token: Initial token for logging in to the Yale API.
+        timeout (optional): Seconds to wait for any call, `None` waits forever.
+        loop_thread (optional): `EventLoopThread` to run in instead of the shared one.
+        kwargs: Further arguments to `Client`.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        initial_token: str = INITIAL_TOKEN,
+        timeout: Optional[float] = 60.0,
+        loop_thread: Optional[EventLoopThread] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the `SyncClient`."""
+        self.timeout = timeout
+        self._loop_thread = loop_thread or shared_loop_thread()
+        self.client = Client(username, password, initial_token, **kwargs)
+        self._devices: Dict[str, SyncDevice] = {}
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self._loop_thread.run(coro, self.timeout)
+
+    def _wrap(self, device: Device) -> SyncDevice:
+        sync_device = self._devices.get(device.device_id)
+        if sync_device is None or sync_device.device is not device:
+            sync_device = self._devices[device.device_id] = SyncDevice(self, device)
+        return sync_device
+
+    @property
+    def devices(self) -> List[SyncDevice]:
+        """Return the devices known to the client."""
+        return [self._wrap(device) for device in self.client.devices]
+
+    def get_device(self, device_id: str) -> Optional[SyncDevice]:
+        """Return the device with the given ID.
+
+        Arguments:
+            device_id: The ID of the device.
+
+        Returns:
+            The `SyncDevice`, or `None` if the device is not known.
+        """
+        device = self.client.get_device(device_id)
+        return None if device is None else self._wrap(device)
+
+    def login(self) -> bool:
+        """Log in to the Yale API.
+
+        Returns:
+            bool: True if logged in.
+        """
+        return self._run(self.client.login())
+
+    def update_devices(self) -> None:
+        """Update the device states, adding devices not seen before."""
+        self._run(self.client.update_devices())
+
+    def lock_all(
+        self, area: Optional[str] = None, concurrency: int = 10
+    ) -> Dict[str, CommandResult]:
+        """Lock all devices, or the devices of one area.
+
+        Arguments:
+            area: Only lock the devices of this area.
+            concurrency: Maximum number of commands in flight.
+
+        Returns:
+            The `CommandResult` of every device, by device ID.
+        """
+        return self._run(self.client.lock_all(area, concurrency))
+
+    def unlock_all(
+        self, pincode: str, area: Optional[str] = None, concurrency: int = 10
+    ) -> Dict[str, CommandResult]:
+        """Unlock all devices, or the devices of one area.
+
+        Arguments:
+            pincode: The pincode of the locks.
+            area: Only unlock the devices of this area.
+            concurrency: Maximum number of commands in flight.
+
+        Returns:
+            The `CommandResult` of every device, by device ID.
+        """
+        return self._run(self.client.unlock_all(pincode, area, concurrency))
+
+    def apply_config(
+        self,
+        settings: Mapping[str, str],
+        area: Optional[str] = None,
+        concurrency: int = 10,
+    ) -> Dict[str, CommandResult]:
+        """Apply a configuration to all devices, or the devices of one area.
+
+        Arguments:
+            settings: Desired values by configuration index.
+            area: Only configure the devices of this area.
+            concurrency: Maximum number of devices configured at once.
+
+        Returns:
+            The `CommandResult` of every device, by device ID.
+        """
+        return self._run(self.client.apply_config(settings, area, concurrency))
+
+    def close(self) -> None:
+        """Close the client, see `Client.close`."""
+        self._run(self.client.close())
+
+    def __enter__(self) -> "SyncClient":
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close the client when leaving the context manager."""
+        self.close()
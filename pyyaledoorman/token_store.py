@@ -0,0 +1,171 @@
+"""Token stores used to persist Yale API tokens between process starts."""
+import json
+import logging
+import os
+import tempfile
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StoredToken(NamedTuple):
+    """Tokens returned by the Yale API, along with when they were issued."""
+
+    access_token: str
+    refresh_token: Optional[str]
+    expires_in: int
+    login_ts: float
+
+
+class TokenStore(ABC):
+    """Base class for token stores.
+
+    Subclass and implement `load`, `save` and `clear` to keep tokens
+    elsewhere.
+    """
+
+    @abstractmethod
+    def load(self, username: str) -> Optional[StoredToken]:
+        """Return the stored token of an account.
+
+        Arguments:
+            username: Username of the account.
+        """
+
+    @abstractmethod
+    def save(self, username: str, token: StoredToken) -> None:
+        """Store the token of an account.
+
+        Arguments:
+            username: Username of the account.
+            token: The token to store.
+        """
+
+    @abstractmethod
+    def clear(self, username: str) -> None:
+        """Forget the token of an account.
+
+        Arguments:
+            username: Username of the account.
+        """
+
+
+class MemoryTokenStore(TokenStore):
+    """Keep tokens in memory, e.g. to share them between Clients."""
+
+    def __init__(self) -> None:
+        """Initialize the `MemoryTokenStore`."""
+        self._tokens: Dict[str, StoredToken] = {}
+
+    def load(self, username: str) -> Optional[StoredToken]:
+        """Return the stored token of an account.
+
+        Arguments:
+            username: Username of the account.
+
+        Returns:
+            The stored token, or `None`.
+        """
+        return self._tokens.get(username)
+
+    def save(self, username: str, token: StoredToken) -> None:
+        """Store the token of an account.
+
+        Arguments:
+            username: Username of the account.
+            token: The token to store.
+        """
+        self._tokens[username] = token
+
+    def clear(self, username: str) -> None:
+        """Forget the token of an account.
+
+        Arguments:
+            username: Username of the account.
+        """
+        self._tokens.pop(username, None)
+
+
+class FileTokenStore(TokenStore):
+    """Keep tokens in a JSON file, readable only by the current user.
+
+    Arguments:
+        path: Path of the JSON file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the `FileTokenStore`."""
+        self.path = path
+
+    def _read(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(self.path, encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            _LOGGER.debug("Couldnt parse token file %s", self.path, exc_info=True)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self, username: str) -> Optional[StoredToken]:
+        """Return the stored token of an account.
+
+        Arguments:
+            username: Username of the account.
+
+        Returns:
+            The stored token, or `None`.
+        """
+        data = self._read().get(username)
+        if not data:
+            return None
+        try:
+            return StoredToken(**data)  # type: ignore[arg-type]
+        except TypeError:
+            _LOGGER.debug("Couldnt parse stored token for %s", username)
+            return None
+
+    def save(self, username: str, token: StoredToken) -> None:
+        """Store the token of an account.
+
+        The file is replaced atomically through a unique temporary file, so
+        readers never see a partial write. Concurrent updates from several
+        processes are last-writer-wins: a token saved by another process
+        between reading and replacing the file may be lost, and is requested
+        again by that process on its next login.
+
+        Arguments:
+            username: Username of the account.
+            token: The token to store.
+        """
+        data = self._read()
+        data[username] = token._asdict()
+        self._write(data)
+
+    def clear(self, username: str) -> None:
+        """Forget the token of an account.
+
+        Arguments:
+            username: Username of the account.
+        """
+        data = self._read()
+        if data.pop(username, None) is not None:
+            self._write(data)
+
+    def _write(self, data: Dict[str, Dict[str, object]]) -> None:
+        # mkstemp creates the file readable only by the current user.
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=".tokens-", suffix=".tmp", dir=os.path.dirname(self.path) or "."
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(data, fp)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
@@ -0,0 +1,79 @@
+"""Shared fixtures for the pyyaledoorman tests."""
+import json
+from typing import Generator
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman.const import BASE_URL
+
+login_data = {
+    "scope": "google_profile groups basic_profile write read",
+    "expires_in": 259200,
+    "access_token": "suchaccesstoken",
+    "refresh_token": "suchrefreshtoken",
+    "token_type": "Bearer",
+}
+
+
+@pytest.fixture
+def mock_aioresponse() -> Generator[aioresponses, None, None]:
+    """Setup for various mocked API calls."""
+    with aioresponses() as mocked:
+        mocked.post(
+            f"{BASE_URL}/o/token/",
+            status=200,
+            payload=login_data,
+            repeat=True,
+        )
+        mocked.post(f"{BASE_URL}/api/panel/", status=200, repeat=True)
+        mocked.post(f"{BASE_URL}/minigw/lock/config/", status=200)
+        mocked.post(
+            f"{BASE_URL}/api/minigw/lock/config/", status=200, payload={"code": "000"}
+        )
+        mocked.get(
+            f"{BASE_URL}/api/minigw/lock/config/",
+            status=200,
+            payload=json.load(open("tests/get_deviceconfig.json")),
+        )
+        mocked.get(
+            f"{BASE_URL}/api/panel/device_status/",
+            payload=json.load(open("tests/get_devices.json")),
+            status=200,
+            repeat=True,
+        )
+        mocked.get(
+            f"{BASE_URL}/api/panel/cycle/",
+            payload=json.load(open("tests/update_state.json")),
+            status=200,
+            repeat=False,
+        )
+        mocked.get(
+            f"{BASE_URL}/api/panel/cycle/",
+            payload={"message": "error"},
+            status=403,
+        )
+        mocked.post(
+            f"{BASE_URL}/api/panel/device_control/",
+            payload=json.load(open("tests/lock.json")),
+            status=200,
+            repeat=False,
+        )
+        mocked.post(
+            f"{BASE_URL}/api/panel/device_control/",
+            payload=json.load(open("tests/lock_fail.json")),
+            status=200,
+            repeat=False,
+        )
+        mocked.post(
+            f"{BASE_URL}/api/minigw/unlock/",
+            payload=json.load(open("tests/unlock.json")),
+            status=200,
+            repeat=False,
+        )
+        mocked.post(
+            f"{BASE_URL}/api/minigw/unlock/",
+            payload=json.load(open("tests/unlock_fail.json")),
+            status=200,
+            repeat=False,
+        )
+        yield mocked
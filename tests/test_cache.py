@@ -0,0 +1,160 @@
+"""Tests for the pyyaledoorman response cache."""
+import asyncio
+import json
+from typing import Any
+from typing import Tuple
+
+from aiohttp import ClientConnectionError
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman import ClientPool
+from pyyaledoorman.cache import ResponseCache
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.resilience import RetryPolicy
+from yarl import URL
+
+from .conftest import login_data
+
+STATUS_URL = ("GET", URL(f"{BASE_URL}/api/panel/device_status/"))
+CONFIG_URL = ("GET", URL(f"{BASE_URL}/api/minigw/lock/config/"))
+
+
+async def test_cached_and_coalesced(mock_aioresponse: aioresponses) -> None:
+    """Verify that cached responses are reused and concurrent GETs coalesce."""
+    yale = Client("test", "test", "test", cache=ResponseCache())
+    await yale.login()
+    await asyncio.gather(*(yale.update_devices() for _ in range(5)))
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 1
+    device = yale.devices[0]
+    first = await device.get_deviceconfig()
+    assert await device.get_deviceconfig() is first
+    assert len(mock_aioresponse.requests[CONFIG_URL]) == 1
+
+    assert await device.lock() is True
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+    assert await device.lock() is False
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+
+
+async def test_expiry_and_stale_while_revalidate(
+    mock_aioresponse: aioresponses,
+) -> None:
+    """Verify that stale responses are served while refreshing."""
+    cache = ResponseCache(
+        {"/api/panel/device_status/": 0.0}, stale_while_revalidate=60.0
+    )
+    yale = Client("test", "test", "test", cache=cache)
+    await yale.login()
+    await yale.update_devices()
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 1
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+
+    cache.stale_while_revalidate = 0.0
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 3
+
+
+async def test_failures_are_not_cached(mock_aioresponse: aioresponses) -> None:
+    """Verify that errors are not cached and background errors are logged."""
+    cache = ResponseCache(stale_while_revalidate=60.0)
+    yale = Client(
+        "test", "test", "test", cache=cache, retry_policy=RetryPolicy(attempts=1)
+    )
+    await yale.login()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        payload=json.load(open("tests/update_device_fail.json")),
+    )
+    await yale.update_devices()
+    assert cache._entries == {}
+
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        payload=json.load(open("tests/get_devices.json")),
+    )
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        exception=ClientConnectionError("boom"),
+    )
+    await yale.update_devices()
+    cache.ttls["/api/panel/device_status/"] = 0.0
+    await yale.update_devices()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert len(yale.devices) == 1
+
+    cache.invalidate("/api/panel/device_status/")
+    assert cache._entries == {}
+
+
+async def test_shared_between_accounts(mock_aioresponse: aioresponses) -> None:
+    """Verify that accounts sharing a cache never see each other's devices."""
+    data = json.load(open("tests/get_devices.json"))
+    other = json.load(open("tests/get_devices.json"))
+    other["data"][0].update(device_id="RF:2", address="RF:2")
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", payload=login_data, repeat=True)
+    mock_aioresponse.get(f"{BASE_URL}/api/panel/device_status/", payload=data)
+    mock_aioresponse.get(f"{BASE_URL}/api/panel/device_status/", payload=other)
+    mock_aioresponse.get(f"{BASE_URL}/api/panel/device_status/", payload=data)
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "000"}
+    )
+    cache = ResponseCache()
+    async with ClientPool() as pool:
+        first = pool.add_account("first", "test", cache=cache)
+        second = pool.add_account("second", "test", cache=cache)
+        await first.update_devices()
+        await second.update_devices()
+        assert [device.device_id for device in first.devices] == ["RF:001234"]
+        assert [device.device_id for device in second.devices] == ["RF:2"]
+        await first.update_devices()
+        await second.update_devices()
+        assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+
+        # A command only invalidates the responses of its own account.
+        await first.devices[0].lock()
+        await first.update_devices()
+        await second.update_devices()
+        assert len(mock_aioresponse.requests[STATUS_URL]) == 3
+        assert [device.device_id for device in second.devices] == ["RF:2"]
+    cache.invalidate()
+    assert cache._entries == {}
+
+    # Endpoints without a TTL are not cached.
+    async def fetch() -> Tuple[int, Any]:
+        return 200, {"code": "000"}
+
+    assert await cache.get("/api/panel/", fetch, "first") == (200, {"code": "000"})
+    assert cache._entries == {}
+
+
+async def test_invalidated_while_in_flight() -> None:
+    """Verify that requests in flight are not joined once invalidated."""
+    cache = ResponseCache({"/api/panel/cycle/": 60.0})
+    fetches = 0
+    release = asyncio.Event()
+
+    async def fetch() -> Tuple[int, Any]:
+        nonlocal fetches
+        fetches += 1
+        await release.wait()
+        return 200, {"code": "000"}
+
+    first = asyncio.ensure_future(cache.get("/api/panel/cycle/", fetch))
+    await asyncio.sleep(0)
+    cache.invalidate("/api/panel/cycle/")
+    second = asyncio.ensure_future(cache.get("/api/panel/cycle/", fetch))
+    await asyncio.sleep(0)
+    release.set()
+    assert await first == await second == (200, {"code": "000"})
+    assert fetches == 2
+    assert list(cache._entries) == [("", "/api/panel/cycle/")]
+    assert cache._inflight == {}
@@ -0,0 +1,112 @@
+"""Tests for the pyyaledoorman JSON codecs."""
+import json
+from typing import Type
+
+import pytest
+from aiohttp import ContentTypeError
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.codec import default_codec
+from pyyaledoorman.codec import DeviceRecord
+from pyyaledoorman.codec import JSONCodec
+from pyyaledoorman.codec import MsgspecCodec
+from pyyaledoorman.codec import OrjsonCodec
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.resilience import RetryPolicy
+
+CODECS = [JSONCodec, OrjsonCodec, MsgspecCodec]
+
+
+def make_codec(codec: Type[JSONCodec]) -> JSONCodec:
+    """Return an instance of `codec`, skipping the test if it is not installed."""
+    try:
+        return codec()
+    except ImportError:
+        pytest.skip(f"{codec.name} is not installed")
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_codec_round_trip(codec_class: Type[JSONCodec]) -> None:
+    """Verify encoding and decoding of documents."""
+    codec = make_codec(codec_class)
+    document = {"code": "000", "data": [1, "dør", None, True]}
+    assert codec.loads(codec.dumps(document)) == document
+    assert json.loads(codec.dumps(document)) == document
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_decode_device_status(codec_class: Type[JSONCodec]) -> None:
+    """Verify decoding of device records, typed where supported."""
+    codec = make_codec(codec_class)
+    with open("tests/get_devices.json", "rb") as devices_file:
+        data = devices_file.read()
+    status = codec.decode_device_status(data, ("data",))
+    assert status["code"] == "000"
+    (record,) = status["devices"]
+    if codec_class is MsgspecCodec:
+        assert isinstance(record, DeviceRecord)
+        assert record.name == "door"
+        untyped = codec.decode_device_status(data, ("data",), typed=False)
+        assert isinstance(untyped["devices"][0], dict)
+    else:
+        assert record["name"] == "door"
+
+    with open("tests/update_state.json", "rb") as cycle_file:
+        data = cycle_file.read()
+    status = codec.decode_device_status(data, ("data", "device_status"))
+    assert len(status["devices"]) == 2
+
+    error = codec.decode_device_status(b'{"code": "997", "data": null}', ("data",))
+    assert error == {"code": "997", "message": None, "devices": []}
+
+
+def test_decode_unexpected_document() -> None:
+    """Verify that a body which is not an object decodes to no devices."""
+    status = JSONCodec().decode_device_status(b"[]", ("data",))
+    assert status == {"code": None, "message": None, "devices": []}
+
+
+def test_default_codec(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify that the fastest installed codec is picked."""
+    for codec_class in CODECS[::-1]:
+        try:
+            expected = codec_class()
+        except ImportError:
+            continue
+        break
+    assert default_codec().name == expected.name
+
+    def not_installed(self: JSONCodec) -> None:
+        raise ImportError
+
+    monkeypatch.setattr(MsgspecCodec, "__init__", not_installed)
+    monkeypatch.setattr(OrjsonCodec, "__init__", not_installed)
+    assert type(default_codec()) is JSONCodec
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+async def test_client_codec(
+    mock_aioresponse: aioresponses, codec_class: Type[JSONCodec]
+) -> None:
+    """Verify updating devices with every codec."""
+    yale = Client("test", "test", "test", codec=make_codec(codec_class))
+    await yale.login()
+    await yale.update_devices()
+    device = yale.devices[0]
+    assert device.name == "door"
+    assert device.is_locked
+    await device.update_state()
+    assert device.is_locked
+    await yale.close()
+
+
+async def test_unexpected_content_type(mock_aioresponse: aioresponses) -> None:
+    """Verify that responses which are not JSON raise."""
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/minigw/lock/config/", body="<html>", content_type="text/html"
+    )
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(attempts=1))
+    with pytest.raises(ContentTypeError):
+        await yale._request("GET", "/api/minigw/lock/config/")
+    await yale.close()
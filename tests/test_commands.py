@@ -0,0 +1,198 @@
+"""Tests for bulk and coalesced device commands."""
+import asyncio
+import json
+
+import pytest
+from aiohttp import ClientConnectionError
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.config import DeviceConfig
+from pyyaledoorman.const import AUTOLOCK_DISABLE
+from pyyaledoorman.const import AUTOLOCK_ENABLE
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import CONFIG_IDX_AUTOLOCK
+from pyyaledoorman.const import CONFIG_IDX_LANG
+from pyyaledoorman.const import CONFIG_IDX_VOLUME
+from pyyaledoorman.const import LANG_EN
+from pyyaledoorman.const import LANG_NO
+from pyyaledoorman.const import VOLUME_LOW
+from pyyaledoorman.resilience import RetryPolicy
+from yarl import URL
+
+from .conftest import login_data
+
+CONTROL_URL = ("POST", URL(f"{BASE_URL}/api/panel/device_control/"))
+UNLOCK_URL = ("POST", URL(f"{BASE_URL}/api/minigw/unlock/"))
+STATUS_URL = ("GET", URL(f"{BASE_URL}/api/panel/device_status/"))
+CONFIG_URL = ("POST", URL(f"{BASE_URL}/api/minigw/lock/config/"))
+
+
+async def _client_with_two_areas(mock_aioresponse: aioresponses) -> Client:
+    data = json.load(open("tests/get_devices.json"))
+    second = dict(data["data"][0], device_id="RF:2", address="RF:2", area="2")
+    data["data"].append(second)
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", payload=login_data, repeat=True)
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(attempts=1))
+    await yale.login()
+    await yale.update_devices()
+    return yale
+
+
+async def test_coalesced_lock(mock_aioresponse: aioresponses) -> None:
+    """Verify that concurrent identical commands share one request."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    device = yale.devices[0]
+    assert await asyncio.gather(device.lock(), device.lock()) == [True, True]
+    assert len(mock_aioresponse.requests[CONTROL_URL]) == 1
+    assert await asyncio.gather(device.unlock("123456"), device.unlock("123456")) == [
+        True,
+        True,
+    ]
+    assert len(mock_aioresponse.requests[UNLOCK_URL]) == 1
+    assert yale._inflight == {}
+
+
+async def test_lock_all(mock_aioresponse: aioresponses) -> None:
+    """Verify bulk locking with per-device results and a single refresh."""
+    yale = await _client_with_two_areas(mock_aioresponse)
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "000"}, repeat=2
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "997"}
+    )
+    results = await yale.lock_all(concurrency=1)
+    assert set(results) == {"RF:001234", "RF:2"}
+    assert all(result.success for result in results.values())
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+
+    results = await yale.lock_all(area="2", refresh=False)
+    assert list(results) == ["RF:2"]
+    assert results["RF:2"].success is False
+    assert len(mock_aioresponse.requests[STATUS_URL]) == 2
+
+
+async def test_unlock_all(mock_aioresponse: aioresponses) -> None:
+    """Verify bulk unlocking reports errors per device."""
+    yale = await _client_with_two_areas(mock_aioresponse)
+    mock_aioresponse.post(f"{BASE_URL}/api/minigw/unlock/", payload={"code": "000"})
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/unlock/",
+        exception=ClientConnectionError("boom"),
+    )
+    results = await yale.unlock_all("123456", area="1")
+    assert results["RF:001234"].success is True
+    results = await yale.unlock_all("123456", area="1", refresh=False)
+    assert isinstance(results["RF:001234"].error, ClientConnectionError)
+
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        exception=ClientConnectionError("boom"),
+    )
+    results = await yale.unlock_all("123456", area="3")
+    assert results == {}
+
+
+async def test_apply_config(mock_aioresponse: aioresponses) -> None:
+    """Verify that only differing settings are sent, per device."""
+    yale = await _client_with_two_areas(mock_aioresponse)
+    yale.get_device("RF:2")._update_deviceconfig(  # type: ignore[union-attr]
+        CONFIG_IDX_VOLUME, VOLUME_LOW
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "000"}
+    )
+    settings = {
+        CONFIG_IDX_VOLUME: VOLUME_LOW,
+        CONFIG_IDX_AUTOLOCK: AUTOLOCK_ENABLE.lower(),
+        CONFIG_IDX_LANG: LANG_EN,
+    }
+    results = await yale.apply_config(settings)
+    assert len(mock_aioresponse.requests[CONFIG_URL]) == 1
+    assert results["RF:001234"].success
+    assert results["RF:001234"].changed == (CONFIG_IDX_VOLUME,)
+    assert results["RF:2"].success
+    assert results["RF:2"].changed == ()
+    assert all(device.volume_level == VOLUME_LOW for device in yale.devices)
+
+    assert all(
+        result.success for result in (await yale.apply_config(settings)).values()
+    )
+    assert len(mock_aioresponse.requests[CONFIG_URL]) == 1
+
+    mock_aioresponse.post(f"{BASE_URL}/api/minigw/lock/config/", status=500)
+    results = await yale.apply_config({CONFIG_IDX_LANG: LANG_NO}, area="2")
+    assert set(results) == {"RF:2"}
+    assert not results["RF:2"].success
+    assert results["RF:2"].error is not None
+    assert results["RF:2"].changed == ()
+
+    # A device failing halfway reports the indices applied before.
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "000"}
+    )
+    mock_aioresponse.post(f"{BASE_URL}/api/minigw/lock/config/", status=500)
+    results = await yale.apply_config(
+        {CONFIG_IDX_AUTOLOCK: AUTOLOCK_DISABLE, CONFIG_IDX_LANG: LANG_NO}, area="2"
+    )
+    assert not results["RF:2"].success
+    assert results["RF:2"].changed == (CONFIG_IDX_AUTOLOCK,)
+
+    # So does a device refusing a setting.
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "997"}
+    )
+    results = await yale.apply_config({CONFIG_IDX_LANG: LANG_NO}, area="2")
+    assert results["RF:2"].success is False
+    assert results["RF:2"].error is None
+    assert results["RF:2"].changed == ()
+    await yale.close()
+
+
+async def test_apply_config_invalid(mock_aioresponse: aioresponses) -> None:
+    """Verify that invalid settings are refused before sending anything."""
+    yale = await _client_with_two_areas(mock_aioresponse)
+    device = yale.devices[0]
+    for settings in ({"00": "01"}, {"99": "01"}, {CONFIG_IDX_VOLUME: "1FF"}):
+        with pytest.raises(ValueError):
+            await yale.apply_config(settings)
+        with pytest.raises(ValueError):
+            await device.apply_config(settings)
+    with pytest.raises(ValueError):
+        await device.set_deviceconfig(CONFIG_IDX_VOLUME, "1FF")
+    with pytest.raises(ValueError):
+        await yale.apply_config({CONFIG_IDX_VOLUME: VOLUME_LOW, "00": "01"})
+    assert CONFIG_URL not in mock_aioresponse.requests
+    assert device.volume_level != VOLUME_LOW
+
+    # Without a known configuration every valid setting differs.
+    device._config = DeviceConfig()
+    assert device.config_diff({"20": "ab"}) == {"20": "AB"}
+    await yale.close()
+
+
+async def test_apply_config_unknown(mock_aioresponse: aioresponses) -> None:
+    """Verify configuring devices whose configuration is not known yet."""
+    yale = await _client_with_two_areas(mock_aioresponse)
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "000"}, repeat=True
+    )
+    device = yale.get_device("RF:2")
+    assert device is not None
+    device._config = DeviceConfig()
+    assert await device.enable_autolock() is True
+    assert len(mock_aioresponse.requests[CONFIG_URL]) == 1
+    assert device.configuration_data == ""
+
+    results = await yale.apply_config({CONFIG_IDX_LANG: LANG_NO}, area="2")
+    assert results["RF:2"].success
+    assert results["RF:2"].error is None
+    assert results["RF:2"].changed == (CONFIG_IDX_LANG,)
+    await yale.close()
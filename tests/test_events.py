@@ -0,0 +1,125 @@
+"""Tests for the pyyaledoorman event stream."""
+import asyncio
+import gc
+import json
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import YALE_LOCK_STATE_LOCKED
+from pyyaledoorman.const import YALE_LOCK_STATE_UNLOCKED
+from pyyaledoorman.events import diff_events
+from pyyaledoorman.events import DropPolicy
+from pyyaledoorman.events import Event
+from pyyaledoorman.events import EventBus
+from pyyaledoorman.events import EventSource
+from pyyaledoorman.events import EventType
+
+
+async def test_events_from_refresh_and_commands(
+    mock_aioresponse: aioresponses,
+) -> None:
+    """Verify events derived from refreshes and commands."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    events = yale.events()
+    await yale.update_devices()
+    assert len(events) == 0
+
+    data = json.load(open("tests/get_devices.json"))
+    data["data"][0]["status_open"] = [YALE_LOCK_STATE_UNLOCKED]
+    data["data"][0]["minigw_lock_status"] = "20"
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "000"}
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "000"}
+    )
+    await yale.update_devices()
+    device = yale.devices[0]
+    assert await device.lock()
+    assert await device.disable_autolock()
+    assert not device.autolock_enabled
+    events.close()
+
+    received = [event async for event in events]
+    assert [(event.type, event.source) for event in received] == [
+        (EventType.unlocked, EventSource.refresh),
+        (EventType.door_opened, EventSource.refresh),
+        (EventType.locked, EventSource.command),
+        (EventType.config_changed, EventSource.command),
+    ]
+    assert received[1].old is False and received[1].new is True
+    assert all(event.device_id == device.device_id for event in received)
+    await yale.close()
+
+
+async def test_subscription_waits() -> None:
+    """Verify that iterating waits for events until closed."""
+    bus = EventBus()
+    event = Event(EventType.locked, "lock", 0.0, EventSource.command, None, None)
+
+    async with bus.subscribe() as subscription:
+        consumer = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0)
+        assert not consumer.done()
+        bus.publish([event])
+        assert await consumer is event
+        consumer = asyncio.ensure_future(subscription.__anext__())
+        await asyncio.sleep(0)
+    assert subscription.closed
+    with pytest.raises(StopAsyncIteration):
+        await consumer
+    assert [e async for e in subscription] == []
+    assert not bus.active
+
+
+async def test_subscription_get() -> None:
+    """Verify waiting for an event with a timeout."""
+    bus = EventBus()
+    event = Event(EventType.locked, "lock", 0.0, EventSource.command, None, None)
+    subscription = bus.subscribe()
+    assert await subscription.get(0.01) is None
+    asyncio.get_running_loop().call_later(0.01, bus.publish, [event])
+    assert await subscription.get(1) is event
+    subscription.close()
+    with pytest.raises(StopAsyncIteration):
+        await subscription.get(1)
+
+
+async def test_drop_policies() -> None:
+    """Verify that full queues drop events according to their policy."""
+    bus = EventBus()
+    events = [
+        Event(EventType.locked, str(n), 0.0, EventSource.refresh, None, None)
+        for n in range(5)
+    ]
+    oldest = bus.subscribe(maxsize=2)
+    newest = bus.subscribe(maxsize=2, drop_policy=DropPolicy.drop_newest)
+    bus.publish(events)
+    assert oldest.dropped == newest.dropped == 3
+    oldest.close()
+    newest.close()
+    assert [e.device_id async for e in oldest] == ["3", "4"]
+    assert [e.device_id async for e in newest] == ["0", "1"]
+    newest.put(events[2])
+    assert len(newest) == 0
+
+    bus.subscribe()
+    gc.collect()
+    assert not bus.active
+
+
+def test_diff_events_unknown_state() -> None:
+    """Verify that a state which is neither locked nor unlocked is reported."""
+    before = (YALE_LOCK_STATE_LOCKED, False, "")
+    after = ("jammed", False, "")
+    (event,) = diff_events("lock", before, after, EventSource.refresh)
+    assert event.type == EventType.state_changed
+    assert (event.old, event.new) == (YALE_LOCK_STATE_LOCKED, "jammed")
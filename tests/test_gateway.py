@@ -0,0 +1,362 @@
+"""Tests for the pyyaledoorman HTTP gateway."""
+import asyncio
+import json
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pytest
+from aiohttp import web
+from aiohttp import WSMsgType
+from aiohttp.test_utils import make_mocked_request
+from aiohttp.test_utils import TestClient
+from aiohttp.test_utils import TestServer
+from aioresponses import aioresponses
+from aioresponses import CallbackResult
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.gateway import Gateway
+from pyyaledoorman.gateway import main
+from pyyaledoorman.gateway import sse_message
+from yarl import URL
+
+
+def _request(
+    method: str,
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    body: Any = None,
+) -> web.Request:
+    request = make_mocked_request(
+        method,
+        path,
+        headers=headers,
+        match_info={"device_id": path.split("/")[2]} if path.count("/") > 1 else {},
+    )
+
+    async def read_json() -> Any:
+        if body is None:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        return body
+
+    request.json = read_json  # type: ignore[method-assign]
+    return request
+
+
+async def test_etag(mock_aioresponse: aioresponses) -> None:
+    """Verify that readers are served from memory with ETag support."""
+    yale = Client("test", "test", "test")
+    gateway = Gateway(yale)
+    await gateway.start()
+    await gateway.start()
+    await gateway.poller.poll()
+
+    resp = await gateway.list_devices(_request("GET", "/devices"))
+    assert resp.status == 200
+    assert resp.body is not None
+    devices = json.loads(bytes(resp.body))["devices"]
+    assert devices[0]["device_id"] == "RF:001234"
+    assert devices[0]["is_locked"] is True
+    etag = resp.headers["ETag"]
+
+    for _ in range(3):
+        resp = await gateway.list_devices(
+            _request("GET", "/devices", {"If-None-Match": etag})
+        )
+        assert resp.status == 304
+        assert resp.headers["ETag"] == etag
+    assert (
+        len(
+            mock_aioresponse.requests[
+                ("GET", URL(f"{BASE_URL}/api/panel/device_status/"))
+            ]
+        )
+        == 1
+    )
+
+    resp = await gateway.get_device(_request("GET", "/devices/RF:001234"))
+    assert resp.status == 200
+    assert resp.body is not None
+    assert json.loads(bytes(resp.body))["device_id"] == "RF:001234"
+    etag = resp.headers["ETag"]
+    resp = await gateway.get_device(
+        _request("GET", "/devices/RF:001234", {"If-None-Match": etag})
+    )
+    assert resp.status == 304
+    with pytest.raises(web.HTTPNotFound):
+        await gateway.get_device(_request("GET", "/devices/RF:unknown"))
+
+    await gateway.unlock(
+        _request("POST", "/devices/RF:001234/unlock", body={"pincode": "123456"})
+    )
+    resp = await gateway.list_devices(
+        _request("GET", "/devices", {"If-None-Match": etag})
+    )
+    assert resp.status == 200
+    assert resp.headers["ETag"] != etag
+    etag = resp.headers["ETag"]
+
+    # Fields not watched by the poller, e.g. the name, invalidate too.
+    data = json.load(open("tests/get_devices.json"))
+    data["data"][0]["name"] = "front door"
+    data["data"][0]["status_open"] = ["device_status.unlock"]
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    await yale.update_devices()
+    resp = await gateway.list_devices(
+        _request("GET", "/devices", {"If-None-Match": etag})
+    )
+    assert resp.status == 200
+    assert resp.body is not None
+    assert json.loads(bytes(resp.body))["devices"][0]["name"] == "front door"
+    await gateway.stop()
+
+
+async def test_commands(mock_aioresponse: aioresponses) -> None:
+    """Verify proxying commands, sharing one request between readers."""
+    yale = Client("test", "test", "test")
+    gateway = Gateway(yale)
+    await yale.update_devices()
+    control = ("POST", URL(f"{BASE_URL}/api/panel/device_control/"))
+
+    responses = await asyncio.gather(
+        *(gateway.lock(_request("POST", "/devices/RF:001234/lock")) for _ in range(5))
+    )
+    assert [resp.status for resp in responses] == [200] * 5
+    assert len(mock_aioresponse.requests[control]) == 1
+
+    with pytest.raises(web.HTTPBadRequest):
+        await gateway.unlock(_request("POST", "/devices/RF:001234/unlock"))
+
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/api/minigw/unlock/", status=500, repeat=True)
+    resp = await gateway.unlock(
+        _request("POST", "/devices/RF:001234/unlock", body={"pincode": "123456"})
+    )
+    assert resp.status == 502
+    assert resp.text is not None
+    assert json.loads(resp.text)["success"] is False
+
+
+async def test_stream(mock_aioresponse: aioresponses) -> None:
+    """Verify streaming changes, resynchronizing subscribers that fall behind."""
+    yale = Client("test", "test", "test")
+    await yale.update_devices()
+    gateway = Gateway(yale, max_queue=1, heartbeat=0.01)
+    messages: List[Tuple[str, bytes]] = []
+    blocked = asyncio.Event()
+    blocked.set()
+
+    async def send(name: str, data: bytes) -> None:
+        await blocked.wait()
+        messages.append((name, data))
+
+    streaming = asyncio.ensure_future(gateway.stream(send))
+    await asyncio.sleep(0.05)
+    assert gateway.subscribers == 1
+    assert messages[0][0] == "devices"
+    assert ("", b"") in messages
+
+    messages.clear()
+    blocked.clear()
+    await asyncio.sleep(0.05)
+    device = yale.devices[0]
+    await device.unlock("123456")
+    await device.lock()
+    blocked.set()
+    await asyncio.sleep(0.05)
+    named = [(name, data) for name, data in messages if name]
+    assert [name for name, _ in named] == ["devices", "locked"]
+    assert json.loads(named[1][1])["old"] == "device_status.unlock"
+
+    await gateway.stop()
+    await asyncio.wait_for(streaming, 1)
+    assert gateway.subscribers == 0
+
+
+async def test_stream_send_timeout(mock_aioresponse: aioresponses) -> None:
+    """Verify that subscribers not accepting messages are disconnected."""
+    yale = Client("test", "test", "test")
+    gateway = Gateway(yale, send_timeout=0.01)
+
+    async def send(name: str, data: bytes) -> None:
+        await asyncio.sleep(1)
+
+    await asyncio.wait_for(gateway.stream(send), 1)
+    assert gateway.subscribers == 0
+
+
+def test_sse_message() -> None:
+    """Verify the Server-Sent Events framing."""
+    assert sse_message("locked", b"{}") == b"event: locked\ndata: {}\n\n"
+    assert sse_message("", b"") == b": keepalive\n\n"
+
+
+async def test_push_endpoints() -> None:
+    """Verify the SSE and WebSocket endpoints of the application."""
+    yale = Client("test", "test", "test")
+    gateway = Gateway(yale, heartbeat=0.05)
+    # Local requests reach the test server, Yale API requests fail.
+    with aioresponses(passthrough=["http://127.0.0.1"]):
+        async with TestClient(TestServer(gateway.make_app())) as http:
+            async with http.get("/events") as resp:
+                assert resp.headers["Content-Type"] == "text/event-stream"
+                assert await resp.content.readline() == b"event: devices\n"
+                line = await resp.content.readline()
+                assert json.loads(line[len(b"data: ") :]) == {"devices": []}
+                gateway._streams.copy().pop().close()
+                assert await resp.content.read() == b"\n"
+
+            async with http.ws_connect("/events/ws") as ws:
+                msg = await ws.receive_json()
+                assert msg == {"event": "devices", "data": {"devices": []}}
+                await ws.send_str("ignored")
+                # Keepalives are left to the WebSocket pings.
+                stream = gateway._streams.copy().pop()
+                asyncio.get_event_loop().call_later(0.15, stream.close)
+                msg = await ws.receive()
+                assert msg.type == WSMsgType.CLOSE
+
+            async with http.ws_connect("/events/ws") as ws:
+                await ws.receive_json()
+            await asyncio.sleep(0.01)
+            assert gateway.subscribers == 0
+
+            # Messages over the size limit make the gateway hang up.
+            async with http.ws_connect("/events/ws") as ws:
+                await ws.receive_json()
+                await ws.send_str("x" * (4 * 1024 * 1024 + 1))
+                msg = await ws.receive()
+                assert msg.type == WSMsgType.CLOSE
+            await asyncio.sleep(0.01)
+            assert gateway.subscribers == 0
+
+
+async def test_unlock_failures(mock_aioresponse: aioresponses) -> None:
+    """Verify limiting failed unlocks and reporting command timeouts."""
+    yale = Client("test", "test", "test")
+    await yale.update_devices()
+    gateway = Gateway(yale, max_unlock_failures=1)
+    path = "/devices/RF:001234/unlock"
+
+    resp = await gateway.unlock(_request("POST", path, body={"pincode": "1"}))
+    assert resp.text is not None
+    assert json.loads(resp.text)["success"] is True
+    resp = await gateway.unlock(_request("POST", path, body={"pincode": "2"}))
+    assert resp.text is not None
+    assert json.loads(resp.text)["success"] is False
+    resp = await gateway.unlock(_request("POST", path, body={"pincode": "3"}))
+    assert resp.status == 429
+    unlock = ("POST", URL(f"{BASE_URL}/api/minigw/unlock/"))
+    assert len(mock_aioresponse.requests[unlock]) == 2
+
+    # Unlocks in flight count, so concurrent attempts share the limit.
+    gateway = Gateway(yale, max_unlock_failures=3)
+    mock_aioresponse.clear()
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/unlock/", payload={"code": "997"}, repeat=True
+    )
+    for _ in range(3):
+        responses = await asyncio.gather(
+            *(
+                gateway.unlock(_request("POST", path, body={"pincode": str(i)}))
+                for i in range(20)
+            )
+        )
+        assert [resp.status for resp in responses].count(200) <= 3
+    assert len(mock_aioresponse.requests[unlock]) == 2 + 3
+    assert len(gateway._unlock_failures["RF:001234"]) == 3
+
+    # Errors reaching the API are no refusals and do not count.
+    gateway = Gateway(yale, max_unlock_failures=1)
+    mock_aioresponse.clear()
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/unlock/", exception=asyncio.TimeoutError()
+    )
+    resp = await gateway.unlock(_request("POST", path, body={"pincode": "4"}))
+    assert resp.status == 502
+    assert gateway._unlock_failures["RF:001234"] == []
+
+    # A success meanwhile already cleared the failure of a failing unlock.
+    gateway = Gateway(yale)
+    mock_aioresponse.clear()
+
+    async def slow_error(url: URL, **kwargs: Any) -> CallbackResult:
+        if kwargs["data"]["pincode"] == "5":
+            await asyncio.sleep(0.01)
+            raise asyncio.TimeoutError()
+        return CallbackResult(payload={"code": "000"})
+
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/unlock/", callback=slow_error, repeat=True
+    )
+    failing, succeeding = await asyncio.gather(
+        gateway.unlock(_request("POST", path, body={"pincode": "5"})),
+        gateway.unlock(_request("POST", path, body={"pincode": "6"})),
+    )
+    assert (failing.status, succeeding.status) == (502, 200)
+    assert gateway._unlock_failures["RF:001234"] == []
+
+    mock_aioresponse.clear()
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", exception=asyncio.TimeoutError()
+    )
+    resp = await gateway.lock(_request("POST", "/devices/RF:001234/lock"))
+    assert resp.status == 502
+    assert resp.text is not None
+    assert json.loads(resp.text)["error"] == "TimeoutError"
+
+
+async def test_auth_token() -> None:
+    """Verify that requests must carry the bearer token if one is set."""
+    yale = Client("test", "test", "test")
+    gateway = Gateway(yale, auth_token="secret")
+    with aioresponses(passthrough=["http://127.0.0.1"]):
+        async with TestClient(TestServer(gateway.make_app())) as http:
+            async with http.get("/devices") as resp:
+                assert resp.status == 401
+                assert resp.headers["WWW-Authenticate"] == "Bearer"
+            headers = {"Authorization": "Bearer wrong"}
+            async with http.post("/devices/x/lock", headers=headers) as resp:
+                assert resp.status == 401
+            headers = {"Authorization": "Bearer secret"}
+            async with http.get("/devices", headers=headers) as resp:
+                assert resp.status == 200
+
+
+async def test_main(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Verify the command line entry point."""
+    apps: List[web.Application] = []
+
+    def run_app(app: web.Application, host: str, port: int) -> None:
+        assert (host, port) == ("0.0.0.0", 8081)  # noqa: S104
+        apps.append(app)
+
+    monkeypatch.setattr(web, "run_app", run_app)
+    monkeypatch.setattr(
+        "sys.argv", ["yale-gateway", "--host", "0.0.0.0", "--port", "8081"]
+    )
+    monkeypatch.setenv("YALE_USERNAME", "test")
+    monkeypatch.setenv("YALE_PASSWORD", "test")
+    monkeypatch.delenv("YALE_GATEWAY_TOKEN", raising=False)
+    main()
+    assert "without YALE_GATEWAY_TOKEN" in caplog.text
+
+    caplog.clear()
+    monkeypatch.setenv("YALE_GATEWAY_TOKEN", "secret")
+    main()
+    assert "without YALE_GATEWAY_TOKEN" not in caplog.text
+
+    with aioresponses(passthrough=["http://127.0.0.1"]):
+        async with TestClient(TestServer(apps[-1])) as http:
+            async with http.get("/devices") as resp:
+                assert resp.status == 401
+            headers = {"Authorization": "Bearer secret"}
+            async with http.get("/devices", headers=headers) as resp:
+                assert resp.status == 200
@@ -0,0 +1,46 @@
+"""Guard the import footprint of pyyaledoorman."""
+import subprocess  # noqa: S404
+import sys
+from typing import Set
+
+from pyyaledoorman.const import LOCK_STATES
+
+_LIST_MODULES = "import sys; {}; print('\\n'.join(sys.modules))"
+
+# Modules that are slow to import and only needed by optional features.
+_HEAVY = (
+    "aiohttp.web",
+    "msgspec",
+    "orjson",
+    "pyyaledoorman.gateway",
+    "traitlets",
+)
+
+
+def _imported_modules(statement: str) -> Set[str]:
+    """Return the modules loaded by `statement` in a fresh interpreter."""
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _LIST_MODULES.format(statement)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return set(output.split())
+
+
+def test_lock_states() -> None:
+    """Verify that lock states support attribute and item access."""
+    assert LOCK_STATES.locked == "device_status.lock"
+    assert LOCK_STATES["unlocked"] == "device_status.unlock"
+    assert LOCK_STATES.failed == "failed"
+    assert str(LOCK_STATES.locked) == "device_status.lock"
+    assert f"{LOCK_STATES.unlocked}" == "device_status.unlock"
+    assert "%s" % LOCK_STATES.failed == "failed"
+
+
+def test_import_footprint() -> None:
+    """Importing the library must not load the heavy optional modules."""
+    modules = _imported_modules("import pyyaledoorman")
+    assert "pyyaledoorman" in modules
+    for name in _HEAVY:
+        assert name not in modules
@@ -0,0 +1,79 @@
+"""Tests for the pyyaledoorman request instrumentation."""
+from typing import List
+
+import pytest
+from aiohttp import ClientConnectionError
+from aiohttp import ClientResponseError
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.metrics import Histogram
+from pyyaledoorman.metrics import RequestRecord
+from pyyaledoorman.resilience import RetryPolicy
+
+
+def test_histogram() -> None:
+    """Verify cumulative bucket counts."""
+    histogram = Histogram((0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+    assert histogram.counts == [1, 2]
+    assert histogram.count == 3
+    assert histogram.total == pytest.approx(5.55)
+
+
+async def test_client_stats(mock_aioresponse: aioresponses) -> None:
+    """Verify that requests, codes, errors and token refreshes are recorded."""
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(base_delay=0))
+    records: List[RequestRecord] = []
+    remove = yale.stats.add_listener(records.append)
+    yale.stats.add_listener(lambda record: 1 / 0)
+    await yale.login()
+    await yale.update_devices()
+    device = yale.devices[0]
+    await device.lock()
+    await device.lock()
+
+    stats = yale.stats
+    assert stats.token_refreshes["password"] == 1
+    assert stats.latency["/api/panel/device_control/"].count == 2
+    assert stats.statuses[("/api/panel/device_status/", 200)] == 1
+    assert stats.codes[("/api/panel/device_control/", "000")] == 1
+    assert stats.codes[("/api/panel/device_control/", "997")] == 1
+    assert [record.endpoint for record in records] == [
+        "/o/token/",
+        "/api/panel/device_status/",
+        "/api/panel/device_control/",
+        "/api/panel/device_control/",
+    ]
+
+    remove()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        exception=ClientConnectionError("boom"),
+    )
+    mock_aioresponse.post(f"{BASE_URL}/api/panel/device_control/", status=500)
+    with pytest.raises(ClientConnectionError):
+        await yale.update_devices()
+    with pytest.raises(ClientResponseError):
+        await device.lock()
+    assert len(records) == 4
+    assert stats.errors[("/api/panel/device_status/", "ClientConnectionError")] == 3
+    assert stats.retries["/api/panel/device_status/"] == 2
+    assert stats.errors[("/api/panel/device_control/", "ClientResponseError")] == 1
+    assert stats.statuses[("/api/panel/device_control/", 500)] == 1
+
+    text = stats.to_prometheus()
+    assert (
+        'pyyaledoorman_request_duration_seconds_count{endpoint="/o/token/"} 1' in text
+    )
+    assert 'pyyaledoorman_retries_total{endpoint="/api/panel/device_status/"} 2' in text
+    assert 'pyyaledoorman_token_refreshes_total{grant_type="password"} 1' in text
+    assert (
+        'pyyaledoorman_codes_total{endpoint="/api/panel/device_control/",code="997"} 1'
+        in text
+    )
+    stats.reset()
+    assert stats.latency == {}
@@ -0,0 +1,162 @@
+"""Tests for the pyyaledoorman Poller."""
+import asyncio
+import json
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.device import Device
+from pyyaledoorman.poller import Changes
+from pyyaledoorman.poller import Poller
+from yarl import URL
+
+from .conftest import login_data
+
+
+async def test_poll_changes(mock_aioresponse: aioresponses) -> None:
+    """Verify that subscribers only hear about changed fields."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    poller = Poller(yale)
+    seen: List[Tuple[Device, Changes]] = []
+
+    async def async_callback(device: Device, changes: Changes) -> None:
+        seen.append((device, changes))
+
+    def failing_callback(device: Device, changes: Changes) -> Any:
+        raise RuntimeError("boom")
+
+    unsubscribe = poller.subscribe(async_callback)
+    poller.subscribe(failing_callback)
+    sync_seen: List[str] = []
+    poller.subscribe(lambda device, changes: sync_seen.append(device.device_id))
+
+    changes = await poller.poll()
+    assert changes["RF:001234"]["state"] == (None, "device_status.lock")
+    assert len(seen) == 1
+    assert sync_seen == ["RF:001234"]
+    assert await poller.poll() == {}
+    assert len(seen) == 1
+
+    data = json.load(open("tests/get_devices.json"))
+    data["data"][0]["minigw_lock_status"] = "20"
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    changes = await poller.poll()
+    assert changes == {
+        "RF:001234": {"is_open": (False, True), "mingw_status": (35, 20)}
+    }
+    assert seen[-1][1] == changes["RF:001234"]
+
+    unsubscribe()
+    data["data"][0]["minigw_lock_status"] = "35"
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    await poller.poll()
+    assert len(seen) == 2
+
+
+async def test_adaptive_interval(mock_aioresponse: aioresponses) -> None:
+    """Verify backing off while idle and speeding up after commands."""
+    yale = Client("test", "test", "test")
+    poller = Poller(yale, interval=10, fast_interval=1, max_interval=20, backoff=2)
+    assert poller._next_interval(False) == 20
+    assert poller._next_interval(False) == 20
+    assert poller._next_interval(True) == 10
+    assert poller.current_interval == 10
+
+    await yale.login()
+    await yale.update_devices()
+    await yale.devices[0].lock()
+    assert poller._next_interval(False) == 1
+
+
+async def test_run_wakes_on_command(mock_aioresponse: aioresponses) -> None:
+    """Verify that the background task polls again right after a command."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    poller = Poller(yale, interval=60, fast_interval=0, fast_period=0)
+    status_url = ("GET", URL(f"{BASE_URL}/api/panel/device_status/"))
+
+    task = poller.start()
+    assert poller.start() is task
+    await asyncio.sleep(0.05)
+    assert len(mock_aioresponse.requests[status_url]) == 2
+    await yale.devices[0].lock()
+    await asyncio.sleep(0.05)
+    assert len(mock_aioresponse.requests[status_url]) == 3
+    await poller.stop()
+    assert task.done()
+    await poller.stop()
+
+    mock_aioresponse.clear()
+    poller.start()
+    await asyncio.sleep(0.05)
+    await poller.stop()
+
+    # Without commands, polls are an interval apart.
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        payload=json.load(open("tests/get_devices.json")),
+        repeat=True,
+    )
+    poller = Poller(yale, interval=0.01, max_interval=0.01, fast_period=0)
+    poller.start()
+    await asyncio.sleep(0.05)
+    await poller.stop()
+    assert len(mock_aioresponse.requests[status_url]) >= 3 + 2
+
+
+async def test_poll_diffs_changed_devices(
+    mock_aioresponse: aioresponses, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verify that only devices a refresh or command changed are diffed."""
+    data = json.load(open("tests/get_devices.json"))
+    data["data"].append(dict(data["data"][0], device_id="RF:2", address="RF:2"))
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", payload=login_data, repeat=True)
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/", payload=data, repeat=True
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "000"}
+    )
+    yale = Client("test", "test", "test")
+    poller = Poller(yale)
+    snapshots: List[str] = []
+    snapshot = Device.snapshot
+
+    def counting_snapshot(device: Device) -> Dict[str, Any]:
+        snapshots.append(device.device_id)
+        return snapshot(device)
+
+    monkeypatch.setattr(Device, "snapshot", counting_snapshot)
+    assert set(await poller.poll()) == {"RF:001234", "RF:2"}
+    assert sorted(snapshots) == ["RF:001234", "RF:2"]
+    snapshots.clear()
+    assert await poller.poll() == {}
+    assert snapshots == []
+
+    data["data"][1]["minigw_lock_status"] = "20"
+    assert set(await poller.poll()) == {"RF:2"}
+    assert snapshots == ["RF:2"]
+    snapshots.clear()
+
+    # Renames are not part of the snapshot.
+    data["data"][1]["name"] = "back door"
+    assert await poller.poll() == {}
+    assert snapshots == []
+
+    await yale.devices[0].lock()
+    await poller.poll()
+    assert snapshots == ["RF:001234"]
@@ -0,0 +1,36 @@
+"""Tests for the pyyaledoorman ClientPool."""
+from aiohttp import ClientConnectionError
+from aioresponses import aioresponses
+from pyyaledoorman import ClientPool
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.resilience import RetryPolicy
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+async def test_pool(mock_aioresponse: aioresponses) -> None:
+    """Verify that accounts share one session and refresh concurrently."""
+    async with ClientPool(concurrency=2) as pool:
+        first = pool.add_account("first", "test", "test", retry_policy=NO_RETRY)
+        second = pool.add_account("second", "test", "test", retry_policy=NO_RETRY)
+        assert first.session is second.session is pool.session
+        assert pool.clients == [first, second]
+        assert pool.get_client("first") is first
+
+        assert await pool.update_devices() == {"first": None, "second": None}
+        assert len(pool.devices) == 2
+        assert pool.get_device("RF:001234") is first.devices[0]
+        assert pool.get_device("nope") is None
+
+        mock_aioresponse.clear()
+        mock_aioresponse.get(
+            f"{BASE_URL}/api/panel/device_status/",
+            exception=ClientConnectionError("boom"),
+            repeat=True,
+        )
+        errors = await pool.update_devices()
+        assert isinstance(errors["first"], ClientConnectionError)
+
+        pool.remove_account("second")
+        assert pool.clients == [first]
+    assert first.session.closed
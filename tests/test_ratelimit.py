@@ -0,0 +1,62 @@
+"""Tests for the pyyaledoorman rate limiter."""
+import asyncio
+import time
+from typing import List
+
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.ratelimit import Priority
+from pyyaledoorman.ratelimit import RateLimiter
+
+
+async def test_budget() -> None:
+    """Verify that requests stay within the burst and the rate."""
+    limiter = RateLimiter(rate=100, burst=5, reserve=0)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(15)))
+    assert time.monotonic() - start >= 0.09
+
+
+async def test_priorities() -> None:
+    """Verify that interactive requests overtake and keep a reserve."""
+    limiter = RateLimiter(rate=50, burst=3, reserve=1)
+    order: List[str] = []
+
+    async def request(name: str, priority: Priority) -> None:
+        await limiter.acquire(priority)
+        order.append(name)
+
+    background = [
+        asyncio.ensure_future(request(f"poll{n}", Priority.background))
+        for n in range(4)
+    ]
+    await asyncio.sleep(0)
+    assert order == ["poll0", "poll1"]
+    assert limiter.waiting == 2
+    await request("lock", Priority.interactive)
+    assert order == ["poll0", "poll1", "lock"]
+    await asyncio.gather(*background)
+    assert order[3:] == ["poll2", "poll3"]
+
+
+async def test_cancelled_waiter() -> None:
+    """Verify that cancelled requests give up their place."""
+    limiter = RateLimiter(rate=50, burst=1, reserve=0)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    assert await limiter.acquire() > 0
+    assert limiter.waiting == 0
+
+
+async def test_client_rate_limited(mock_aioresponse: aioresponses) -> None:
+    """Verify that client requests go through the rate limiter."""
+    async with Client(
+        "test", "test", "test", rate_limiter=RateLimiter(rate=100, burst=1)
+    ) as yale:
+        await yale.update_devices()
+        await yale.update_devices()
+        assert sum(yale.stats.throttled.values()) == 2
+        assert "/o/token/" not in yale.stats.throttled
+        assert "throttled_total" in yale.stats.to_prometheus()
@@ -0,0 +1,197 @@
+"""Tests for retries and circuit breaking of API requests."""
+import asyncio
+import json
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Any
+
+import pytest
+from aiohttp import ClientConnectionError
+from aiohttp import ClientResponseError
+from aioresponses import aioresponses
+from aioresponses import CallbackResult
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.exceptions import CircuitOpenError
+from pyyaledoorman.exceptions import ResponseError
+from pyyaledoorman.exceptions import YaleError
+from pyyaledoorman.resilience import CircuitBreaker
+from pyyaledoorman.resilience import parse_retry_after
+from pyyaledoorman.resilience import RetryPolicy
+from yarl import URL
+
+STATUS_URL = f"{BASE_URL}/api/panel/device_status/"
+CONTROL_URL = f"{BASE_URL}/api/panel/device_control/"
+
+
+def test_parse_retry_after() -> None:
+    """Verify parsing of seconds and HTTP dates."""
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=60)
+    for value in (
+        format_datetime(later, usegmt=True),
+        format_datetime(later.replace(tzinfo=None)),
+    ):
+        delay = parse_retry_after(value)
+        assert delay is not None
+        assert 50 < delay <= 60
+
+
+def test_retry_policy_delay() -> None:
+    """Verify exponential backoff, jitter and Retry-After capping."""
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=0.5)
+    assert 0.5 <= policy.delay(1) <= 1
+    assert 1 <= policy.delay(2) <= 2
+    assert 2.5 <= policy.delay(10) <= 5
+    assert policy.delay(1, retry_after=2) == 2
+    assert policy.delay(1, retry_after=60) == 5
+
+
+def test_circuit_breaker() -> None:
+    """Verify opening after the threshold and closing after a success."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.is_open is False
+    breaker.record_failure()
+    assert breaker.is_open is True
+    assert breaker.allow_request() is False
+    breaker.reset_timeout = 0
+    assert breaker.is_open is False
+    breaker.record_success()
+    assert breaker.failures == 0
+
+
+def test_circuit_breaker_half_open() -> None:
+    """Verify that a half-open circuit lets a single trial request through."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow_request() is False
+    assert breaker.opened_at is not None
+    breaker.opened_at -= 60
+    assert breaker.is_open is False
+    assert breaker.allow_request() is True
+    assert breaker.is_open is True
+    assert breaker.allow_request() is False
+
+    # A failed trial opens the circuit again.
+    breaker.record_failure()
+    assert breaker.allow_request() is False
+    breaker.opened_at -= 60
+    assert breaker.allow_request() is True
+
+    # A trial that never reports back is replaced after the timeout.
+    assert breaker.trial_started is not None
+    breaker.trial_started -= 60
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.is_open is False
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is True
+
+
+async def test_get_is_retried(mock_aioresponse: aioresponses) -> None:
+    """Verify that failed GETs are retried, honoring Retry-After."""
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(base_delay=0))
+    await yale.login()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(STATUS_URL, status=503, headers={"Retry-After": "0"})
+    mock_aioresponse.get(STATUS_URL, exception=ClientConnectionError("boom"))
+    mock_aioresponse.get(STATUS_URL, payload=json.load(open("tests/get_devices.json")))
+    await yale.update_devices()
+    assert len(yale.devices) == 1
+    assert yale.stats.retries["/api/panel/device_status/"] == 2
+
+    # Retry-After is also honored when the status is raised as an error.
+    mock_aioresponse.get(STATUS_URL, status=503, headers={"Retry-After": "0"})
+    mock_aioresponse.get(STATUS_URL, payload={"code": "000"})
+    status, body = await yale._request(
+        "GET", "/api/panel/device_status/", raise_for_status=True
+    )
+    assert (status, body) == (200, {"code": "000"})
+    assert yale.stats.retries["/api/panel/device_status/"] == 3
+
+
+async def test_post_is_not_retried(mock_aioresponse: aioresponses) -> None:
+    """Verify that commands fail without being retried."""
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(base_delay=0))
+    await yale.login()
+    await yale.update_devices()
+    mock_aioresponse.clear()
+    mock_aioresponse.post(CONTROL_URL, status=503, repeat=True)
+    with pytest.raises(ClientResponseError):
+        await yale.devices[0].lock()
+    assert len(mock_aioresponse.requests[("POST", URL(CONTROL_URL))]) == 1
+
+
+async def test_retries_exhausted(mock_aioresponse: aioresponses) -> None:
+    """Verify that the last response is returned once retries run out."""
+    yale = Client("test", "test", "test", retry_policy=RetryPolicy(base_delay=0))
+    await yale.login()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(STATUS_URL, status=503, payload={"code": "997"}, repeat=True)
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[("GET", URL(STATUS_URL))]) == 3
+    assert yale.devices == []
+
+
+async def test_circuit_opens(mock_aioresponse: aioresponses) -> None:
+    """Verify that an endpoint fails fast after repeated failures."""
+    yale = Client(
+        "test",
+        "test",
+        "test",
+        retry_policy=RetryPolicy(attempts=1),
+        failure_threshold=2,
+    )
+    await yale.login()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        STATUS_URL, exception=ClientConnectionError("boom"), repeat=True
+    )
+    for _ in range(2):
+        with pytest.raises(ClientConnectionError):
+            await yale.update_devices()
+    with pytest.raises(CircuitOpenError):
+        await yale.update_devices()
+    assert len(mock_aioresponse.requests[("GET", URL(STATUS_URL))]) == 2
+    assert yale.stats.errors[("/api/panel/device_status/", "CircuitOpenError")] == 1
+
+    # Once half-open, a single trial request is let through.
+    breaker = yale._breakers["/api/panel/device_status/"]
+    breaker.opened_at = time.monotonic() - yale.reset_timeout
+    mock_aioresponse.clear()
+
+    async def slow(url: URL, **kwargs: Any) -> CallbackResult:
+        await asyncio.sleep(0.01)
+        return CallbackResult(payload=json.load(open("tests/get_devices.json")))
+
+    mock_aioresponse.get(STATUS_URL, callback=slow, repeat=True)
+    results = await asyncio.gather(
+        *(yale._request("GET", "/api/panel/device_status/") for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert results[0][0] == 200
+    assert all(isinstance(result, CircuitOpenError) for result in results[1:])
+    assert len(mock_aioresponse.requests[("GET", URL(STATUS_URL))]) == 3
+    await yale.update_devices()
+    assert len(mock_aioresponse.requests[("GET", URL(STATUS_URL))]) == 4
+
+
+async def test_update_state_error(mock_aioresponse: aioresponses) -> None:
+    """Verify that API errors surface as `ResponseError`."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    mock_aioresponse.clear()
+    mock_aioresponse.get(f"{BASE_URL}/api/panel/cycle/", payload={"code": "997"})
+    with pytest.raises(ResponseError, match="Unknown error"):
+        await yale.devices[0].update_state()
+    assert issubclass(ResponseError, YaleError)
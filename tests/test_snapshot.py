@@ -0,0 +1,61 @@
+"""Tests for snapshots of the pyyaledoorman client state."""
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.codec import JSONCodec
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import CONFIG_IDX_VOLUME
+from pyyaledoorman.const import VOLUME_HIGH
+from pyyaledoorman.const import YALE_LOCK_STATE_UNLOCKED
+from yarl import URL
+
+TOKEN_URL = ("POST", URL(f"{BASE_URL}/o/token/"))
+
+
+@pytest.mark.parametrize("keep_raw_payload", [False, True])
+async def test_warm_start(
+    mock_aioresponse: aioresponses, keep_raw_payload: bool
+) -> None:
+    """Verify that a restored client serves the last state without logging in."""
+    async with Client(
+        "test", "test", "test", keep_raw_payload=keep_raw_payload
+    ) as yale:
+        await yale.update_devices()
+        device = yale.devices[0]
+        # Changes made by commands since the refresh are kept as well.
+        assert await device.unlock("123456") is True
+        device._update_deviceconfig(CONFIG_IDX_VOLUME, VOLUME_HIGH)
+        snapshot = yale.dump_snapshot()
+
+    restored = Client("test", "test", "test", codec=JSONCodec())
+    restored.restore_snapshot(snapshot)
+    assert restored.devices_updated_at == yale.devices_updated_at
+    (copy,) = restored.devices
+    assert copy.snapshot() == device.snapshot()
+    assert copy.state == YALE_LOCK_STATE_UNLOCKED
+    assert copy.volume_level == VOLUME_HIGH
+    for attribute in ("device_id", "name", "type", "area", "address", "volume_level"):
+        assert getattr(copy, attribute) == getattr(device, attribute)
+    assert restored.get_device_by_address(device.address) is copy
+    assert restored.token == yale.token
+
+    async with restored:
+        await restored.update_devices()
+    assert len(mock_aioresponse.requests[TOKEN_URL]) == 1
+    assert restored.devices == [copy]
+
+
+def test_unsupported_snapshot() -> None:
+    """Verify that unknown snapshots are refused."""
+    with pytest.raises(ValueError):
+        Client("test", "test").restore_snapshot(b'{"version": 0}')
+
+
+def test_empty_snapshot() -> None:
+    """Verify a snapshot of a client that never logged in nor refreshed."""
+    snapshot = Client("test", "test").dump_snapshot()
+    restored = Client("test", "test")
+    restored.restore_snapshot(snapshot)
+    assert restored.devices == []
+    assert restored.devices_updated_at is None
+    assert restored.token is None
@@ -0,0 +1,81 @@
+"""Tests for the incremental decoding of pyyaledoorman responses."""
+import json
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import YALE_LOCK_STATE_LOCKED
+from pyyaledoorman.streaming import JSONArrayStream
+
+
+def test_array_stream_chunks() -> None:
+    """Verify that items are decoded whatever the chunk boundaries."""
+    body = {
+        "result": True,
+        "code": "000",
+        "data": {
+            "other": [1, {"text": '"]}'}],
+            "device_status": [{"no": n, "name": "dør ✓"} for n in range(5)],
+            "count": 1.5e3,
+        },
+        "message": "OK!",
+    }
+    for indent in (None, 2):
+        raw = json.dumps(body, indent=indent, ensure_ascii=False).encode()
+        for size in (1, 2, 7, len(raw)):
+            stream = JSONArrayStream(("data", "device_status"))
+            items = []
+            for start in range(0, len(raw), size):
+                items.extend(stream.feed(raw[start : start + size]))
+            items.extend(stream.close())
+            assert items == body["data"]["device_status"]  # type: ignore[index]
+            assert stream.fields == {"result": True, "code": "000", "message": "OK!"}
+
+
+def test_array_stream_invalid() -> None:
+    """Verify that invalid and truncated responses raise."""
+    with pytest.raises(ValueError):
+        JSONArrayStream().feed(b"<html>")
+    stream = JSONArrayStream()
+    assert stream.feed(b'{"data": [{"no": 1}, {"no"') == [{"no": 1}]
+    with pytest.raises(ValueError):
+        stream.close()
+    stream = JSONArrayStream()
+    assert stream.feed(b'{"data": []') == []
+    with pytest.raises(ValueError, match="Unterminated"):
+        stream.close()
+    for body in (b'{"code" "000"}', b'{1: "000"}'):
+        with pytest.raises(ValueError, match="Expecting ':'"):
+            JSONArrayStream().feed(body)
+
+
+def test_array_stream_members() -> None:
+    """Verify members split before their colon and arrays missing on the path."""
+    stream = JSONArrayStream(("data", "device_status"))
+    assert stream.feed(b'{"code" ') == []
+    assert stream.feed(b': "000", "data": null}') == []
+    assert stream.close() == []
+    assert stream.fields == {"code": "000", "data": None}
+
+
+async def test_stream_device_status(mock_aioresponse: aioresponses) -> None:
+    """Verify updating devices from streamed responses."""
+    yale = Client("test", "test", "test", stream_device_status=True)
+    await yale.login()
+    await yale.update_devices()
+    assert len(yale.devices) == 1
+    device = yale.devices[0]
+    assert device.name == "door"
+    assert device.state == YALE_LOCK_STATE_LOCKED
+    await device.update_state()
+    assert device.state == YALE_LOCK_STATE_LOCKED
+
+    mock_aioresponse.clear()
+    mock_aioresponse.get(
+        f"{BASE_URL}/api/panel/device_status/",
+        payload={"data": [{"device_id": "other"}], "code": "997"},
+    )
+    await yale.update_devices()
+    assert len(yale.devices) == 1
+    await yale.close()
@@ -0,0 +1,98 @@
+"""Tests for the pyyaledoorman synchronous facade."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import SyncClient
+from pyyaledoorman.const import AUTOLOCK_DISABLE
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import CONFIG_IDX_AUTOLOCK
+from pyyaledoorman.const import CONFIG_IDX_VOLUME
+from pyyaledoorman.const import LANG_EN
+from pyyaledoorman.const import VOLUME_HIGH
+from pyyaledoorman.const import VOLUME_LOW
+from pyyaledoorman.const import VOLUME_OFF
+from pyyaledoorman.sync import EventLoopThread
+from pyyaledoorman.sync import shared_loop_thread
+from yarl import URL
+
+TOKEN_URL = ("POST", URL(f"{BASE_URL}/o/token/"))
+
+
+def test_sync_client(mock_aioresponse: aioresponses) -> None:
+    """Verify blocking calls reuse the loop, session and token."""
+    with SyncClient("test", "test", "test") as yale:
+        yale.update_devices()
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: yale.update_devices(), range(8)))
+        assert len(mock_aioresponse.requests[TOKEN_URL]) == 1
+        (device,) = yale.devices
+        assert yale.get_device(device.device_id) is device
+        assert yale.get_device("unknown") is None
+        assert device.name == "door"
+        assert device.is_locked
+        assert device.lock() is True
+        assert device.unlock("123456") is True
+        assert device.get_deviceconfig()["code"] == "000"
+        device.update_state()
+        assert device.is_locked
+        session = yale.client.session
+    assert session.closed
+    with SyncClient("test", "test") as other:
+        other.update_devices()
+        assert other.client._session is not session
+
+
+def test_sync_client_in_loop_thread() -> None:
+    """Verify that blocking the loop thread is refused instead of deadlocking."""
+    loop_thread = shared_loop_thread()
+
+    async def nested() -> None:
+        with pytest.raises(RuntimeError):
+            loop_thread.run(nested())
+
+    loop_thread.run(nested())
+
+
+def test_sync_device_config_and_bulk(mock_aioresponse: aioresponses) -> None:
+    """Verify the configuration and bulk commands of the blocking facade."""
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/lock/config/", payload={"code": "000"}, repeat=True
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/panel/device_control/", payload={"code": "000"}, repeat=True
+    )
+    mock_aioresponse.post(
+        f"{BASE_URL}/api/minigw/unlock/", payload={"code": "000"}, repeat=True
+    )
+    loop_thread = EventLoopThread()
+    with SyncClient("test", "test", "test", loop_thread=loop_thread) as yale:
+        assert yale.login() is True
+        yale.update_devices()
+        (device,) = yale.devices
+        assert device.device_id == "RF:001234"
+        assert device.area == "1"
+        assert device.address == "RF:001234"
+        assert device.type == "device_type.door_lock"
+        assert device.state == "device_status.lock"
+        assert not device.is_open
+        assert device.volume_level == VOLUME_OFF
+        assert device.language == LANG_EN
+        assert device.autolock_enabled
+
+        assert device.disable_autolock() is True
+        assert not device.autolock_enabled
+        assert device.enable_autolock() is True
+        assert device.autolock_enabled
+        assert device.set_deviceconfig(CONFIG_IDX_VOLUME, VOLUME_LOW) is True
+        assert device.volume_level == VOLUME_LOW
+        assert device.apply_config({CONFIG_IDX_VOLUME: VOLUME_HIGH}) is True
+        assert device.volume_level == VOLUME_HIGH
+
+        assert yale.lock_all()["RF:001234"].success
+        assert yale.unlock_all("123456")["RF:001234"].success
+        results = yale.apply_config({CONFIG_IDX_AUTOLOCK: AUTOLOCK_DISABLE})
+        assert results["RF:001234"].changed == (CONFIG_IDX_AUTOLOCK,)
+        assert not device.autolock_enabled
+    loop_thread.stop()
+    assert loop_thread.loop.is_closed()
@@ -0,0 +1,137 @@
+"""Tests for the pyyaledoorman token stores."""
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from aioresponses import aioresponses
+from pyyaledoorman import Client
+from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.exceptions import AuthenticationError
+from pyyaledoorman.token_store import FileTokenStore
+from pyyaledoorman.token_store import MemoryTokenStore
+from pyyaledoorman.token_store import StoredToken
+from pyyaledoorman.token_store import TokenStore
+from yarl import URL
+
+from .conftest import login_data
+
+TOKEN_URL = ("POST", URL(f"{BASE_URL}/o/token/"))
+
+
+async def test_memory_token_store(mock_aioresponse: aioresponses) -> None:
+    """Verify that a stored valid token skips the password login."""
+    store = MemoryTokenStore()
+    first = Client("test", "test", "test", token_store=store)
+    await first.login()
+    assert len(mock_aioresponse.requests[TOKEN_URL]) == 1
+    stored = store.load("test")
+    assert stored is not None
+    assert stored.access_token == login_data["access_token"]
+
+    second = Client("test", "test", "test", token_store=store)
+    assert await second.login() is True
+    assert second.token == login_data["access_token"]
+    assert second.login_ts == first.login_ts
+    assert len(mock_aioresponse.requests[TOKEN_URL]) == 1
+
+
+async def test_expired_stored_token(mock_aioresponse: aioresponses) -> None:
+    """Verify that an expired stored token is renewed with the refresh grant."""
+    store = MemoryTokenStore()
+    store.save("test", StoredToken("old", "suchrefreshtoken", 100, 0.0))
+    yale = Client("test", "test", "test", token_store=store)
+    await yale.login()
+    request = mock_aioresponse.requests[TOKEN_URL][0]
+    assert request.kwargs["data"]["grant_type"] == "refresh_token"
+    assert yale.token == login_data["access_token"]
+    stored = store.load("test")
+    assert stored is not None
+    assert stored.access_token == login_data["access_token"]
+
+
+async def test_file_token_store(mock_aioresponse: aioresponses, tmp_path: Path) -> None:
+    """Verify that tokens survive in a file between Clients."""
+    path = tmp_path / "tokens.json"
+    store = FileTokenStore(str(path))
+    assert store.load("test") is None
+    yale = Client("test", "test", "test", token_store=store)
+    await yale.login()
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert [p.name for p in tmp_path.iterdir()] == ["tokens.json"]
+
+    yale = Client("test", "test", "test", token_store=FileTokenStore(str(path)))
+    await yale.login()
+    assert len(mock_aioresponse.requests[TOKEN_URL]) == 1
+
+    path.write_text('{"test": {"access_token": "x"}}')
+    assert store.load("test") is None
+    path.write_text("not json")
+    assert store.load("test") is None
+
+
+def test_file_token_store_failed_write(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Verify that a failed write leaves the file and no temporary file."""
+    path = tmp_path / "tokens.json"
+    store = FileTokenStore(str(path))
+    store.save("test", StoredToken("a", "b", 1, 0.0))
+
+    def fail(*args: object) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr("os.replace", fail)
+    with pytest.raises(OSError):
+        store.save("other", StoredToken("c", "d", 1, 0.0))
+    assert [p.name for p in tmp_path.iterdir()] == ["tokens.json"]
+    assert store.load("test") == StoredToken("a", "b", 1, 0.0)
+
+
+def test_token_store_interface() -> None:
+    """Verify that subclasses must implement the whole interface."""
+
+    class LoadOnly(TokenStore):
+        def load(self, username: str) -> Optional[StoredToken]:
+            return None
+
+    with pytest.raises(TypeError):
+        TokenStore()  # type: ignore[abstract]
+    with pytest.raises(TypeError):
+        LoadOnly()  # type: ignore[abstract]
+
+
+@pytest.mark.parametrize("kind", ["memory", "file"])
+async def test_rejected_credentials_clear_the_store(
+    mock_aioresponse: aioresponses, tmp_path: Path, kind: str
+) -> None:
+    """Verify that tokens of an account whose credentials are rejected are dropped."""
+    store: TokenStore = (
+        MemoryTokenStore() if kind == "memory" else FileTokenStore(str(tmp_path / "t"))
+    )
+    store.save("other", StoredToken("a", "b", 1, 0.0))
+    store.save("test", StoredToken("old", "revoked", 100, 0.0))
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", status=401, repeat=True)
+    yale = Client("test", "test", "test", token_store=store)
+    with pytest.raises(AuthenticationError):
+        await yale.login()
+    assert store.load("test") is None
+    assert store.load("other") == StoredToken("a", "b", 1, 0.0)
+    store.clear("test")
+    assert store.load("other") == StoredToken("a", "b", 1, 0.0)
+
+
+async def test_rejected_stored_refresh_token(mock_aioresponse: aioresponses) -> None:
+    """Verify falling back to the password grant for a revoked refresh token."""
+    store = MemoryTokenStore()
+    store.save("test", StoredToken("old", "revoked", 100, 0.0))
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", status=401)
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", payload=login_data)
+    yale = Client("test", "test", "test", token_store=store)
+    assert await yale.login() is True
+    grants = [
+        r.kwargs["data"]["grant_type"] for r in mock_aioresponse.requests[TOKEN_URL]
+    ]
+    assert grants == ["refresh_token", "password"]
+    assert yale.token == login_data["access_token"]
@@ -1,88 +1,24 @@
 """Tests for pyyaledoorman."""
+import asyncio
 import json
-from typing import Generator
 
 import pytest
 from aiohttp import ClientSession
 from aioresponses import aioresponses
 from pyyaledoorman import Client
 from pyyaledoorman.client import AuthenticationError
+from pyyaledoorman.config import DeviceConfig
+from pyyaledoorman.const import AUTOLOCK_DISABLE
 from pyyaledoorman.const import BASE_URL
+from pyyaledoorman.const import CONFIG_IDX_AUTOLOCK
 from pyyaledoorman.const import LANG_EN
+from pyyaledoorman.const import TOKEN_RENEW_RETRY
 from pyyaledoorman.const import VOLUME_OFF
 from pyyaledoorman.const import YALE_LOCK_STATE_LOCKED
+from pyyaledoorman.device import Change
+from yarl import URL
 
-login_data = {
-    "scope": "google_profile groups basic_profile write read",
-    "expires_in": 259200,
-    "access_token": "suchaccesstoken",
-    "refresh_token": "suchrefreshtoken",
-    "token_type": "Bearer",
-}
-
-
-@pytest.fixture
-def mock_aioresponse() -> Generator[aioresponses, None, None]:
-    """Setup for various mocked API calls."""
-    with aioresponses() as mocked:
-        mocked.post(
-            f"{BASE_URL}/o/token/",
-            status=200,
-            payload=login_data,
-            repeat=True,
-        )
-        mocked.post(f"{BASE_URL}/api/panel/", status=200, repeat=True)
-        mocked.post(f"{BASE_URL}/minigw/lock/config/", status=200)
-        mocked.post(
-            f"{BASE_URL}/api/minigw/lock/config/", status=200, payload={"code": "000"}
-        )
-        mocked.get(
-            f"{BASE_URL}/api/minigw/lock/config/",
-            status=200,
-            payload=json.load(open("tests/get_deviceconfig.json")),
-        )
-        mocked.get(
-            f"{BASE_URL}/api/panel/device_status/",
-            payload=json.load(open("tests/get_devices.json")),
-            status=200,
-            repeat=True,
-        )
-        mocked.get(
-            f"{BASE_URL}/api/panel/cycle/",
-            payload=json.load(open("tests/update_state.json")),
-            status=200,
-            repeat=False,
-        )
-        mocked.get(
-            f"{BASE_URL}/api/panel/cycle/",
-            payload={"message": "error"},
-            status=403,
-        )
-        mocked.post(
-            f"{BASE_URL}/api/panel/device_control/",
-            payload=json.load(open("tests/lock.json")),
-            status=200,
-            repeat=False,
-        )
-        mocked.post(
-            f"{BASE_URL}/api/panel/device_control/",
-            payload=json.load(open("tests/lock_fail.json")),
-            status=200,
-            repeat=False,
-        )
-        mocked.post(
-            f"{BASE_URL}/api/minigw/unlock/",
-            payload=json.load(open("tests/unlock.json")),
-            status=200,
-            repeat=False,
-        )
-        mocked.post(
-            f"{BASE_URL}/api/minigw/unlock/",
-            payload=json.load(open("tests/unlock_fail.json")),
-            status=200,
-            repeat=False,
-        )
-        yield mocked
+from .conftest import login_data
 
 
 async def test_login(mock_aioresponse: aioresponses) -> None:
@@ -102,6 +38,61 @@ async def test_login(mock_aioresponse: aioresponses) -> None:
         await yale._validate_access_token()
 
 
+async def test_single_flight_login(mock_aioresponse: aioresponses) -> None:
+    """Verify that concurrent token renewals share a single login."""
+    token_url = ("POST", URL(f"{BASE_URL}/o/token/"))
+    yale = Client("test", "test", "test")
+    await asyncio.gather(*(yale._validate_access_token() for _ in range(10)))
+    assert len(mock_aioresponse.requests[token_url]) == 1
+
+    yale.login_ts = yale.login_ts - yale.token_expires_in - 1
+    await asyncio.gather(*(yale._validate_access_token() for _ in range(10)))
+    assert len(mock_aioresponse.requests[token_url]) == 2
+
+
+async def test_background_token_renewal(mock_aioresponse: aioresponses) -> None:
+    """Verify that a token about to expire is renewed without blocking."""
+    token_url = ("POST", URL(f"{BASE_URL}/o/token/"))
+    yale = Client("test", "test", "test")
+    await yale.login()
+    yale.login_ts = yale.login_ts - yale.token_expires_in + 10
+    await yale._validate_access_token()
+    assert len(mock_aioresponse.requests[token_url]) == 1
+    assert yale._login_task is not None
+    await yale._login_task
+    assert len(mock_aioresponse.requests[token_url]) == 2
+
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", status=403, repeat=True)
+    yale.login_ts = yale.login_ts - yale.token_expires_in + 10
+    await yale._validate_access_token()
+    with pytest.raises(AuthenticationError):
+        await yale._login_task
+    assert len(mock_aioresponse.requests[token_url]) == 4
+
+    # Failed renewals are not retried on every request.
+    for _ in range(5):
+        await yale._validate_access_token()
+        await asyncio.sleep(0)
+    assert len(mock_aioresponse.requests[token_url]) == 4
+    assert yale._login_failed_ts is not None
+    yale._login_failed_ts -= TOKEN_RENEW_RETRY
+    mock_aioresponse.clear()
+    mock_aioresponse.post(f"{BASE_URL}/o/token/", payload=login_data)
+    await yale._validate_access_token()
+    await yale._login_task
+    assert len(mock_aioresponse.requests[token_url]) == 5
+    assert yale._login_failed_ts is None
+
+    # Closing the client cancels a renewal without counting it as failed.
+    yale.login_ts = yale.login_ts - yale.token_expires_in + 10
+    await yale._validate_access_token()
+    await yale.close()
+    await asyncio.sleep(0)
+    assert yale._login_task.cancelled()
+    assert yale._login_failed_ts is None
+
+
 async def test_yale_nosession(mock_aioresponse: aioresponses) -> None:
     """Test logging in and basic checks without creating a new `ClientSession`."""
     yale = Client("test", "test", "test")
@@ -117,7 +108,7 @@ async def test_yale_nosession(mock_aioresponse: aioresponses) -> None:
         assert device.volume_level == VOLUME_OFF
         assert device.autolock_enabled is True
         assert device.language == LANG_EN
-    await yale._session.close()
+    await yale.close()
 
 
 async def test_get_deviceconfig(mock_aioresponse: aioresponses) -> None:
@@ -162,6 +153,55 @@ async def test_update_twice(mock_aioresponse: aioresponses) -> None:
     assert len(yale.devices) == 2
 
 
+async def test_update_single_request(mock_aioresponse: aioresponses) -> None:
+    """Verify that refreshing known devices only fetches the panel snapshot."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    await yale.update_devices()
+    await yale.update_devices()
+    requests = mock_aioresponse.requests
+    assert len(requests[("GET", URL(f"{BASE_URL}/api/panel/device_status/"))]) == 3
+    assert ("GET", URL(f"{BASE_URL}/api/panel/cycle/")) not in requests
+    assert len(yale.devices) == 1
+
+
+async def test_device_registry(mock_aioresponse: aioresponses) -> None:
+    """Verify device lookups by ID, address and area."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    device = yale.get_device("RF:001234")
+    assert device is not None
+    assert yale.get_device_by_address("RF:001234") is device
+    assert yale.get_devices_by_area("1") == [device]
+    assert yale.get_device("nope") is None
+    assert yale.get_devices_by_area("2") == []
+
+    data = json.load(open("tests/get_devices.json"))
+    data["data"][0]["area"] = "2"
+    data["data"][0]["address"] = "RF:004321"
+    yale._apply_device_status(data["data"])
+    assert yale.get_devices_by_area("1") == []
+    assert yale.get_devices_by_area("2") == [device]
+    assert yale.get_device_by_address("RF:001234") is None
+    assert yale.get_device_by_address("RF:004321") is device
+    assert yale.devices == [device]
+
+    # A device taking over the address stays indexed when the other one moves.
+    other = dict(data["data"][0], device_id="RF:2")
+    yale._apply_device_status([other])
+    data["data"][0]["address"] = "RF:001234"
+    yale._apply_device_status(data["data"])
+    second = yale.get_device("RF:2")
+    assert yale.get_device_by_address("RF:004321") is second
+    assert yale.get_device_by_address("RF:001234") is device
+    data["data"][0]["area"] = "1"
+    yale._apply_device_status(data["data"])
+    assert yale.get_devices_by_area("1") == [device]
+    assert yale.get_devices_by_area("2") == [second]
+
+
 async def test_open(mock_aioresponse: aioresponses) -> None:
     """Test the `is_open` logic."""
     yale = Client("test", "test", "test")
@@ -250,7 +290,7 @@ async def test_update_device_fail(mock_aioresponse: aioresponses) -> None:
         assert device.state == YALE_LOCK_STATE_LOCKED
         with pytest.raises(Exception, match=r".*Unknown error.*"):
             await device.update_state()
-    await yale._session.close()
+    await yale.close()
 
 
 async def test_update_device(mock_aioresponse: aioresponses) -> None:
@@ -263,7 +303,7 @@ async def test_update_device(mock_aioresponse: aioresponses) -> None:
         assert device.state == YALE_LOCK_STATE_LOCKED
         await device.update_state()
         assert device.state == YALE_LOCK_STATE_LOCKED
-    await yale._session.close()
+    await yale.close()
 
 
 async def test_yale_session(mock_aioresponse: aioresponses) -> None:
@@ -280,4 +320,110 @@ async def test_yale_session(mock_aioresponse: aioresponses) -> None:
     assert len(yale.devices) == 1
     for device in yale.devices:
         assert device.name == "door"
-    await yale._session.close()
+    await session.close()
+
+
+def test_device_config() -> None:
+    """Verify decoding, in-place updates and encoding of the lock config."""
+    config = DeviceConfig("01FF000001000000000000000000001E000100")
+    assert len(config) == 19
+    assert config[2] == 0xFF
+    assert config.get(CONFIG_IDX_AUTOLOCK) == "FF"
+    config.set(CONFIG_IDX_AUTOLOCK, AUTOLOCK_DISABLE)
+    assert config[2] == 0
+    assert config.to_wire() == "0100000001000000000000000000001E000100"
+    assert len(DeviceConfig("not hex")) == 0
+    assert DeviceConfig("not hex").to_wire() == "not hex"
+
+    # Index 0 must not wrap around to the last option.
+    with pytest.raises(IndexError):
+        config.get("00")
+    with pytest.raises(IndexError):
+        config.set("00", "01")
+    assert config.to_wire() == "0100000001000000000000000000001E000100"
+    config.validate("19", "ff")
+    for idx, value in (("00", "01"), ("20", "01"), ("x1", "01"), ("01", "1FF")):
+        with pytest.raises(ValueError):
+            config.validate(idx, value)
+    with pytest.raises(ValueError):
+        config.validate("01", "G0")
+    DeviceConfig().validate("20", "01")
+
+
+async def test_device_compact(mock_aioresponse: aioresponses) -> None:
+    """Verify that devices are slotted and only keep raw payloads on request."""
+    yale = Client("test", "test", "test")
+    await yale.login()
+    await yale.update_devices()
+    device = yale.devices[0]
+    assert not hasattr(device, "__dict__")
+    assert device.raw_payload is None
+    await yale.close()
+
+    yale = Client("test", "test", "test", keep_raw_payload=True)
+    await yale.login()
+    await yale.update_devices()
+    payload = yale.devices[0].raw_payload
+    assert payload is not None
+    assert payload["name"] == "door"
+    await yale.close()
+
+
+async def test_parse_config_changes(mock_aioresponse: aioresponses) -> None:
+    """Verify the change mask and that unchanged fields are left alone."""
+    yale = Client("test", "test", "test")
+    await yale.update_devices()
+    device = yale.devices[0]
+    record = json.load(open("tests/get_devices.json"))["data"][0]
+    config = device._config
+    assert device.parse_config(record) == Change(0)
+    assert device._config is config
+
+    record["status_open"] = ["device_status.unlock"]
+    record["minigw_lock_status"] = "20"
+    assert device.parse_config(record) == Change.state | Change.lock_status
+    assert device.is_open
+    record["area"] = "2"
+    record["minigw_configuration_data"] = record["minigw_configuration_data"][:-2]
+    changed = device.parse_config(record)
+    assert changed == Change.area | Change.config
+    assert not changed & Change.state
+
+    record["area"] = "3"
+    yale._apply_device_status([record])
+    assert yale.get_devices_by_area("3") == [device]
+    assert yale.get_devices_by_area("2") == []
+
+    # Unparsable lock statuses keep the last one, without failing the refresh.
+    for lock_status in (None, 35, "unknown"):
+        record["minigw_lock_status"] = lock_status
+        assert device.parse_config(record) == Change.lock_status
+        assert device.parse_config(record) == Change(0)
+        assert device._mingw_status == 20
+    await yale.close()
+
+
+async def test_client_lifecycle(mock_aioresponse: aioresponses) -> None:
+    """Verify session ownership, connector tuning and per-operation timeouts."""
+    async with Client(
+        "test", "test", "test", limit=7, ttl_dns_cache=10, poll_timeout=3
+    ) as yale:
+        await yale.update_devices()
+        session = yale.session
+        assert session.connector.limit == 7  # type: ignore[union-attr]
+        await yale.devices[0].lock()
+    assert session.closed
+    assert yale._session is None
+
+    requests = mock_aioresponse.requests
+    token = requests[("POST", URL(f"{BASE_URL}/o/token/"))][0]
+    status = requests[("GET", URL(f"{BASE_URL}/api/panel/device_status/"))][0]
+    control = requests[("POST", URL(f"{BASE_URL}/api/panel/device_control/"))][0]
+    assert token.kwargs["timeout"].total == 30
+    assert status.kwargs["timeout"].total == 3
+    assert control.kwargs["timeout"].total == 30
+
+    async with ClientSession() as own_session:
+        async with Client("test", "test", "test", own_session) as yale:
+            await yale.update_devices()
+        assert not own_session.closed